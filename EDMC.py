@@ -7,28 +7,36 @@ import argparse
 import json
 import sys
 import os
-from typing import Any, Optional
+from datetime import datetime, timedelta
+from typing import Any, Optional, Tuple
 
 # workaround for https://github.com/EDCD/EDMarketConnector/issues/568
 os.environ["EDMC_NO_UI"] = "1"
 
-from os.path import getmtime, join
+from multiprocessing import freeze_support
+from os.path import basename, getmtime, join
 from time import time, sleep
 import re
 
 import l10n
 l10n.Translations.install_dummy()
 
+import backfill
 import collate
 import companion
 import commodity
 from commodity import COMMODITY_DEFAULT
 import outfitting
 import loadout
+import plug
+import edmc_json
+import EDMCLogging
 import edshipyard
+import headless
+import journal_index
 import shipyard
 import stats
-from config import appcmdname, appversion, config
+from config import appcmdname, appname, appversion, config
 from update import Updater, EDMCVersion
 from monitor import monitor
 
@@ -62,6 +70,121 @@ def deep_get(target: dict, *args: str, default=None) -> Any:
     return current
 
 
+def date_arg(value: str) -> datetime:
+    """Parse a YYYY-MM-DD command-line argument."""
+    try:
+        return datetime.strptime(value, '%Y-%m-%d')
+
+    except ValueError:
+        raise argparse.ArgumentTypeError(f'{value!r} is not a YYYY-MM-DD date')
+
+
+def journal_dir_arg(value: str) -> Tuple[str, str]:
+    """Parse a NAME=DIR command-line argument."""
+    name, _, logdir = value.partition('=')
+    if not name or not logdir:
+        raise argparse.ArgumentTypeError(f'{value!r} is not NAME=DIR')
+
+    return name, os.path.expanduser(logdir)
+
+
+def run_backfill(args: argparse.Namespace) -> None:
+    """
+    Write the entries from old Journal files to a file or stdout, one JSON object per line.
+
+    :param args: The parsed command-line arguments.
+    """
+    logdir = args.dir or config.get('journaldir') or config.default_journal_dir
+    end = args.end and args.end + timedelta(days=1, seconds=-1)  # Inclusive
+    history = backfill.Backfill(logdir, args.start, end, args.processes)
+    history.progress = lambda done, total, count: print(
+        f'\r{done}/{total} files, {count} entries', end='' if done < total else '\n', file=sys.stderr
+    )
+
+    if args.index:
+        for event in history:
+            journal_index.index.add(basename(event.logfile), event.offset, event.entry, event.cmdr)
+
+        journal_index.index.close()
+        return
+
+    out = open(args.o, 'w', encoding='utf-8') if args.o else sys.stdout
+    try:
+        for event in history:
+            out.write(edmc_json.dumps({
+                'logfile': basename(event.logfile),
+                'offset':  event.offset,
+                'cmdr':    event.cmdr,
+                'is_beta': event.is_beta,
+                'system':  event.system,
+                'station': event.station,
+                'entry':   event.entry,
+            }))
+            out.write('\n')
+
+    finally:
+        if args.o:
+            out.close()
+
+
+def run_query(args: argparse.Namespace) -> None:
+    """
+    Write matching entries from the journal index to stdout, one JSON object per line.
+
+    :param args: The parsed command-line arguments.
+    """
+    entries = journal_index.index.query(
+        event=args.event,
+        start=args.start and args.start.strftime('%Y-%m-%d'),
+        end=args.end and (args.end + timedelta(days=1, seconds=-1)).strftime('%Y-%m-%dT%H:%M:%SZ'),
+        system_address=args.system_address,
+        market_id=args.market_id,
+        cmdr=args.cmdr,
+        limit=args.limit,
+    )
+    journal_index.index.close()
+    for entry in entries:
+        print(edmc_json.dumps(entry))
+
+
+def run_plugin_stats(args: argparse.Namespace) -> None:
+    """
+    Print the plugin timings saved by the GUI app.
+
+    :param args: The parsed command-line arguments.
+    """
+    filename = join(config.app_dir, plug.PROFILE_FILE)
+    try:
+        with open(filename, 'rb') as h:
+            saved = edmc_json.load(h)
+
+    except FileNotFoundError:
+        sys.exit(f'No plugin timings in {filename} - turn on "Time plugins" on the Plugins tab of Settings')
+
+    if args.json:
+        print(edmc_json.dumps(saved))
+
+    else:
+        print(f'Plugin timings from {datetime.fromtimestamp(saved["since"]):%Y-%m-%d %H:%M:%S} '
+              f'to {datetime.fromtimestamp(saved["saved"]):%Y-%m-%d %H:%M:%S}')
+        print(plug.profile_report(saved['stats']))
+
+
+def run_serve(args: argparse.Namespace) -> None:
+    """
+    Monitor the journal and run the plugins, without a UI, until interrupted.
+
+    :param args: The parsed command-line arguments.
+    """
+    EDMCLogging.Logger(appname).get_logger()
+    journal_dirs = dict(args.journal_dir or [])
+    if len(journal_dirs) < len(args.journal_dir or []):
+        sys.exit('Each --journal-dir needs a different NAME')
+
+    if not headless.HeadlessApp(journal_dirs).run():
+        sys.exit(EXIT_SYS_ERR)
+
+
 def main():
     try:
         # arg parsing
@@ -84,6 +207,53 @@ def main():
         parser.add_argument('-n', action='store_true', help='send data to EDDN')
         parser.add_argument('-p', metavar='CMDR', help='Returns data from the specified player account')
         parser.add_argument('-j', help=argparse.SUPPRESS)  # Import JSON dump
+
+        subparsers = parser.add_subparsers(dest='command', metavar='COMMAND')
+        backfill_parser = subparsers.add_parser(
+            'backfill', help='write the entries from old Journal files as JSON lines',
+            description='Parses every Journal file in the date range, in parallel, and writes their entries in order '
+                        'to stdout or FILE, one JSON object per line.'
+        )
+        backfill_parser.add_argument('--from', dest='start', metavar='YYYY-MM-DD', type=date_arg,
+                                     help='earliest date (UTC) to include')
+        backfill_parser.add_argument('--to', dest='end', metavar='YYYY-MM-DD', type=date_arg,
+                                     help='latest date (UTC) to include')
+        backfill_parser.add_argument('--dir', metavar='DIR', help='read Journal files from DIR')
+        backfill_parser.add_argument('--processes', metavar='N', type=int, help='use N processes')
+        backfill_parser.add_argument('-o', metavar='FILE', help='write to FILE instead of stdout')
+        backfill_parser.add_argument('--index', action='store_true',
+                                     help='add the entries to the journal index instead')
+
+        query_parser = subparsers.add_parser(
+            'query', help='write entries from the journal index as JSON lines',
+            description='Writes the entries in the journal index that match all the given criteria to stdout, oldest '
+                        'first, one JSON object per line.'
+        )
+        query_parser.add_argument('--event', metavar='EVENT', help='entries of type EVENT, e.g. Docked')
+        query_parser.add_argument('--from', dest='start', metavar='YYYY-MM-DD', type=date_arg,
+                                  help='earliest date (UTC) to include')
+        query_parser.add_argument('--to', dest='end', metavar='YYYY-MM-DD', type=date_arg,
+                                  help='latest date (UTC) to include')
+        query_parser.add_argument('--system-address', metavar='ID', type=int, help='entries with this SystemAddress')
+        query_parser.add_argument('--market-id', metavar='ID', type=int, help='entries with this MarketID')
+        query_parser.add_argument('--cmdr', metavar='CMDR', help='entries for this Cmdr')
+        query_parser.add_argument('--limit', metavar='N', type=int, help='only the most recent N entries')
+
+        plugin_stats_parser = subparsers.add_parser(
+            'plugin-stats', help='print the plugin timings saved by the GUI app',
+            description='Prints how long each plugin took in each of its hooks, as last saved by the GUI app with '
+                        '"Time plugins" on.  The app saves them when it exits or when you press "Show timings".'
+        )
+        plugin_stats_parser.add_argument('--json', action='store_true', help='print the raw timings as JSON')
+
+        serve_parser = subparsers.add_parser(
+            'serve', help='monitor the Journal and run the plugins without a UI',
+            description='Monitors the Journal and Status files and passes them to the plugins, like the GUI app but '
+                        'without a display, until interrupted or terminated.  Uses the settings made in the GUI app.  '
+                        'Doesn\'t query the Companion API.'
+        )
+        serve_parser.add_argument('--journal-dir', metavar='NAME=DIR', type=journal_dir_arg, action='append',
+                                  help='monitor the Journal in DIR, calling it NAME. Repeat for several Cmdrs')
         args = parser.parse_args()
 
         if args.version:
@@ -95,6 +265,22 @@ def main():
                 print(appversion)
             sys.exit(EXIT_SUCCESS)
 
+        if args.command == 'backfill':
+            run_backfill(args)
+            sys.exit(EXIT_SUCCESS)
+
+        elif args.command == 'query':
+            run_query(args)
+            sys.exit(EXIT_SUCCESS)
+
+        elif args.command == 'plugin-stats':
+            run_plugin_stats(args)
+            sys.exit(EXIT_SUCCESS)
+
+        elif args.command == 'serve':
+            run_serve(args)
+            sys.exit(EXIT_SUCCESS)
+
         if args.j:
             # Import and collate from JSON dump
             data = json.load(open(args.j))
@@ -108,13 +294,8 @@ def main():
 
                 logfile = join(logdir, logfiles[-1])
 
-                with open(logfile, 'r') as loghandle:
-                    for line in loghandle:
-                        try:
-                            monitor.parse_entry(line)
-                        except Exception:
-                            if __debug__:
-                                print(f'Invalid journal entry {line!r}')
+                with open(logfile, 'rb', 0) as loghandle:
+                    monitor.catch_up(loghandle)
 
             except Exception as e:
                 print(f"Can't read Journal file: {str(e)}", file=sys.stderr)
@@ -299,4 +480,5 @@ def main():
 
 
 if __name__ == '__main__':
+    freeze_support()  # Backfill's worker processes in a frozen build
     main()
@@ -77,6 +77,8 @@ class AppWindow(object):
     EVENT_BUTTON = 4
     EVENT_VIRTUAL = 35
 
+    JOURNAL_SLICE = 50  # Max journal entries to handle before letting Tk process other events
+
     def __init__(self, master):
 
         self.holdofftime = config.getint('querytime') + companion.holdoff
@@ -351,14 +353,14 @@ class AppWindow(object):
         if not monitor.start(self.w):
             self.status['text'] = f'Error: Check {_("E:D journal file location")}'
 
-        if dologin and monitor.cmdr:
+        if dologin and monitor.snapshot['cmdr']:
             self.login()  # Login if not already logged in with this Cmdr
 
     # set main window labels, e.g. after language change
     def set_labels(self):
         self.cmdr_label['text'] = _('Cmdr') + ':'  # Main window
         # Multicrew role label in main window
-        self.ship_label['text'] = (monitor.state['Captain'] and _('Role') or _('Ship')) + ':'  # Main window
+        self.ship_label['text'] = (monitor.snapshot['state']['Captain'] and _('Role') or _('Ship')) + ':'  # Main window
         self.system_label['text'] = _('System') + ':'  # Main window
         self.station_label['text'] = _('Station') + ':'  # Main window
         self.button['text'] = self.theme_button['text'] = _('Update')  # Update button in main window
@@ -398,7 +400,9 @@ class AppWindow(object):
         # Edit menu
         self.edit_menu.entryconfigure(0, label=_('Copy'))  # As in Copy and Paste
 
-    def login(self):
+    def login(self, snapshot=None):
+        # The journal context to log in as, by default that of the last entry handled
+        snapshot = snapshot or monitor.snapshot
         if not self.status['text']:
             self.status['text'] = _('Logging in...')
         self.button['state'] = self.theme_button['state'] = tk.DISABLED
@@ -410,7 +414,7 @@ class AppWindow(object):
             self.file_menu.entryconfigure(1, state=tk.DISABLED)  # Save Raw Data
         self.w.update_idletasks()
         try:
-            if companion.session.login(monitor.cmdr, monitor.is_beta):
+            if companion.session.login(snapshot['cmdr'], snapshot['is_beta']):
                 # Successfully authenticated with the Frontier website
                 self.status['text'] = _('Authentication successful')
                 if platform == 'darwin':
@@ -432,7 +436,10 @@ class AppWindow(object):
         play_sound = (auto_update or int(event.type) == self.EVENT_VIRTUAL) and not config.getint('hotkey_mute')
         play_bad = False
 
-        if not monitor.cmdr or not monitor.mode or monitor.state['Captain'] or not monitor.system:
+        # The journal context as of the last entry handled, rather than wherever the journal worker has got to
+        snapshot = monitor.snapshot
+        state = snapshot['state']
+        if not snapshot['cmdr'] or not snapshot['mode'] or state['Captain'] or not snapshot['system']:
             return  # In CQC or on crew - do nothing
 
         if companion.session.state == companion.Session.STATE_AUTH:
@@ -466,15 +473,15 @@ class AppWindow(object):
                 self.status['text'] = _("Where are you?!")  # Shouldn't happen
             elif not data.get('ship', {}).get('name') or not data.get('ship', {}).get('modules'):
                 self.status['text'] = _("What are you flying?!")  # Shouldn't happen
-            elif monitor.cmdr and data['commander']['name'] != monitor.cmdr:
+            elif data['commander']['name'] != snapshot['cmdr']:
                 # Companion API return doesn't match Journal
                 raise companion.CmdrError()
             elif ((auto_update and not data['commander'].get('docked'))
-                  or (data['lastSystem']['name'] != monitor.system)
+                  or (data['lastSystem']['name'] != snapshot['system'])
                   or ((data['commander']['docked']
-                       and data['lastStarport']['name'] or None) != monitor.station)
-                  or (data['ship']['id'] != monitor.state['ShipID'])
-                  or (data['ship']['name'].lower() != monitor.state['ShipType'])):
+                       and data['lastStarport']['name'] or None) != snapshot['station'])
+                  or (data['ship']['id'] != state['ShipID'])
+                  or (data['ship']['name'].lower() != state['ShipType'])):
                 raise companion.ServerLagging()
 
             else:
@@ -491,17 +498,21 @@ class AppWindow(object):
                                                sort_keys=True,
                                                separators=(',', ': ')).encode('utf-8'))
 
-                if not monitor.state['ShipType']:  # Started game in SRV or fighter
+                # The journal worker owns the Cmdr state, so hand it the changes
+                ship = {}
+                if not state['ShipType']:  # Started game in SRV or fighter
                     self.ship['text'] = companion.ship_map.get(data['ship']['name'].lower(), data['ship']['name'])
-                    monitor.state['ShipID'] = data['ship']['id']
-                    monitor.state['ShipType'] = data['ship']['name'].lower()
+                    ship = {'ShipID': data['ship']['id'], 'ShipType': data['ship']['name'].lower()}
 
+                changes = {}
                 if data['commander'].get('credits') is not None:
-                    monitor.state['Credits'] = data['commander']['credits']
-                    monitor.state['Loan'] = data['commander'].get('debt', 0)
+                    changes = {'Credits': data['commander']['credits'], 'Loan': data['commander'].get('debt', 0)}
+
+                if ship or changes:
+                    monitor.update_state(snapshot['cmdr'], changes, ship)
 
                 # stuff we can do when not docked
-                err = plug.notify_newdata(data, monitor.is_beta)
+                err = plug.notify_newdata(data, snapshot['is_beta'])
                 self.status['text'] = err and err or ''
                 if err:
                     play_bad = True
@@ -575,17 +586,17 @@ class AppWindow(object):
             if not data['commander'].get('docked'):
                 # might have un-docked while we were waiting for retry in which case station data is unreliable
                 pass
-            elif (data.get('lastSystem',   {}).get('name') == monitor.system and
-                  data.get('lastStarport', {}).get('name') == monitor.station and
+            elif (data.get('lastSystem',   {}).get('name') == monitor.snapshot['system'] and
+                  data.get('lastStarport', {}).get('name') == monitor.snapshot['station'] and
                   data.get('lastStarport', {}).get('ships', {}).get('shipyard_list')):
-                self.eddn.export_shipyard(data, monitor.is_beta)
+                self.eddn.export_shipyard(data, monitor.snapshot['is_beta'])
             elif tries > 1:  # bogus data - retry
                 self.w.after(int(SERVER_RETRY * 1000), lambda: self.retry_for_shipyard(tries-1))
         except Exception:
             pass
 
     # Handle event(s) from the journal
-    def journal_event(self, event):
+    def journal_event(self, event=None):
 
         def crewroletext(role):
             # Return translated crew role. Needs to be dynamic to allow for changing language.
@@ -597,91 +608,111 @@ class AppWindow(object):
                 'FlightCon':  _('Helm'),  # Multicrew role
             }.get(role, role)
 
-        while True:
+        monitor.notify_pending.clear()  # Entries queued from now on need another <<JournalEvent>>
+
+        # Take a slice of the backlog, so that bursts of entries update the main window and plugins once per slice
+        batch = []
+        while len(batch) < self.JOURNAL_SLICE:
             entry = monitor.get_entry()
             if not entry:
-                return
+                break
 
-            # Update main window
-            self.cooldown()
-            if monitor.cmdr and monitor.state['Captain']:
-                self.cmdr['text'] = f'{monitor.cmdr} / {monitor.state["Captain"]}'
-                self.ship_label['text'] = _('Role') + ':'  # Multicrew role label in main window
-                self.ship.configure(state=tk.NORMAL, text=crewroletext(monitor.state['Role']), url=None)
-            elif monitor.cmdr:
-                if monitor.group:
-                    self.cmdr['text'] = f'{monitor.cmdr} / {monitor.group}'
-                else:
-                    self.cmdr['text'] = monitor.cmdr
-                self.ship_label['text'] = _('Ship') + ':'  # Main window
-                self.ship.configure(
-                    text=monitor.state['ShipName']
-                    or companion.ship_map.get(monitor.state['ShipType'], monitor.state['ShipType'])
-                    or '',
-                    url=self.shipyard_url)
+            # The journal context as of this entry. The journal worker may already have parsed further ahead.
+            batch.append((entry, monitor.snapshot))
+
+        if not batch:
+            return
+
+        # Update main window, as of the last entry
+        snapshot = monitor.snapshot
+        cmdr = snapshot['cmdr']
+        state = snapshot['state']
+        self.cooldown()
+        if cmdr and state['Captain']:
+            self.cmdr['text'] = f'{cmdr} / {state["Captain"]}'
+            self.ship_label['text'] = _('Role') + ':'  # Multicrew role label in main window
+            self.ship.configure(state=tk.NORMAL, text=crewroletext(state['Role']), url=None)
+        elif cmdr:
+            if snapshot['group']:
+                self.cmdr['text'] = f'{cmdr} / {snapshot["group"]}'
             else:
-                self.cmdr['text'] = ''
-                self.ship_label['text'] = _('Ship') + ':'  # Main window
-                self.ship['text'] = ''
-
-            self.edit_menu.entryconfigure(0, state=monitor.system and tk.NORMAL or tk.DISABLED)  # Copy
-
-            if entry['event'] in (
-                    'Undocked',
-                    'StartJump',
-                    'SetUserShipName',
-                    'ShipyardBuy',
-                    'ShipyardSell',
-                    'ShipyardSwap',
-                    'ModuleBuy',
-                    'ModuleSell',
-                    'MaterialCollected',
-                    'MaterialDiscarded',
-                    'ScientificResearch',
-                    'EngineerCraft',
-                    'Synthesis',
-                    'JoinACrew'):
-                self.status['text'] = ''  # Periodically clear any old error
-            self.w.update_idletasks()
+                self.cmdr['text'] = cmdr
+            self.ship_label['text'] = _('Ship') + ':'  # Main window
+            self.ship.configure(
+                text=state['ShipName']
+                or companion.ship_map.get(state['ShipType'], state['ShipType'])
+                or '',
+                url=self.shipyard_url)
+        else:
+            self.cmdr['text'] = ''
+            self.ship_label['text'] = _('Ship') + ':'  # Main window
+            self.ship['text'] = ''
+
+        self.edit_menu.entryconfigure(0, state=snapshot['system'] and tk.NORMAL or tk.DISABLED)  # Copy
+
+        if any(entry['event'] in (
+                'Undocked',
+                'StartJump',
+                'SetUserShipName',
+                'ShipyardBuy',
+                'ShipyardSell',
+                'ShipyardSwap',
+                'ModuleBuy',
+                'ModuleSell',
+                'MaterialCollected',
+                'MaterialDiscarded',
+                'ScientificResearch',
+                'EngineerCraft',
+                'Synthesis',
+                'JoinACrew') for entry, snapshot in batch):
+            self.status['text'] = ''  # Periodically clear any old error
+        self.w.update_idletasks()
+
+        # Runs of consecutive entries for the same Cmdr, for the plugins that take batches of entries
+        runs = []
+        for entry, snapshot in batch:
+            cmdr = snapshot['cmdr']
+            state = snapshot['state']
 
             # Companion login
-            if entry['event'] in [None, 'StartUp', 'NewCommander', 'LoadGame'] and monitor.cmdr:
-                if not config.get('cmdrs') or monitor.cmdr not in config.get('cmdrs'):
-                    config.set('cmdrs', (config.get('cmdrs') or []) + [monitor.cmdr])
-                self.login()
+            if entry['event'] in [None, 'StartUp', 'NewCommander', 'LoadGame'] and cmdr:
+                if not config.get('cmdrs') or cmdr not in config.get('cmdrs'):
+                    config.set('cmdrs', (config.get('cmdrs') or []) + [cmdr])
+                self.login(snapshot)
 
-            if not entry['event'] or not monitor.mode:
-                return  # Startup or in CQC
+            if not entry['event'] or not snapshot['mode']:
+                continue  # Startup or in CQC
 
-            if entry['event'] in ['StartUp', 'LoadGame'] and monitor.started:
+            if entry['event'] in ['StartUp', 'LoadGame'] and snapshot['started']:
                 # Disable WinSparkle automatic update checks, IFF configured to do so when in-game
                 if config.getint('disable_autoappupdatecheckingame') and 1:
                     self.updater.setAutomaticUpdatesCheck(False)
                     logger.info('Monitor: Disable WinSparkle automatic update checks')
                 # Can start dashboard monitoring
-                if not dashboard.start(self.w, monitor.started):
+                if not dashboard.start(self.w, snapshot['started']):
                     logger.info("Can't start Status monitoring")
 
             # Export loadout
-            if entry['event'] == 'Loadout' and not monitor.state['Captain']\
+            if entry['event'] == 'Loadout' and not state['Captain']\
                     and config.getint('output') & config.OUT_SHIP:
-                monitor.export_ship()
+                monitor.export_ship(state=state)
 
             # Plugins
-            err = plug.notify_journal_entry(monitor.cmdr,
-                                            monitor.is_beta,
-                                            monitor.system,
-                                            monitor.station,
-                                            entry,
-                                            monitor.state)
+            err = plug.notify_journal_entry(cmdr, snapshot['is_beta'], snapshot['system'], snapshot['station'], entry,
+                                            state)
             if err:
                 self.status['text'] = err
                 if not config.getint('hotkey_mute'):
                     hotkeymgr.play_bad()
 
+            if not runs or runs[-1][:2] != (cmdr, snapshot['is_beta']):
+                runs.append((cmdr, snapshot['is_beta'], []))
+
+            runs[-1][2].append((snapshot['system'], snapshot['station'], entry, state))
+
             # Auto-Update after docking, but not if auth callback is pending
             if entry['event'] in ('StartUp', 'Location', 'Docked')\
-                    and monitor.station\
+                    and snapshot['station']\
                     and not config.getint('output') & config.OUT_MKT_MANUAL\
                     and config.getint('output') & config.OUT_STATION_ANY\
                     and companion.session.state != companion.Session.STATE_AUTH:
@@ -693,6 +724,20 @@ class AppWindow(object):
                 self.updater.setAutomaticUpdatesCheck(True)
                 logger.info('Monitor: Enable WinSparkle automatic update checks')
 
+        # Plugins that take batches
+        for cmdr, is_beta, entries in runs:
+            err = plug.notify_journal_entries(cmdr, is_beta, entries)
+            if err:
+                self.status['text'] = err
+                if not config.getint('hotkey_mute'):
+                    hotkeymgr.play_bad()
+
+        if len(batch) == self.JOURNAL_SLICE:
+            # Backlog - carry on working it off once any pending UI events have been handled.
+            # Not after_idle(), since update_idletasks() above would then run it re-entrantly.
+            logger.debug(f'Journal backlog: {monitor.event_queue.stats()}')
+            self.w.after(0, self.journal_event)
+
     # cAPI auth
     def auth(self, event=None):
         try:
@@ -717,7 +762,7 @@ class AppWindow(object):
         entry = dashboard.status
         if entry:
             # Currently we don't do anything with these events
-            err = plug.notify_dashboard_entry(monitor.cmdr, monitor.is_beta, entry)
+            err = plug.notify_dashboard_entry(monitor.snapshot['cmdr'], monitor.snapshot['is_beta'], entry)
             if err:
                 self.status['text'] = err
                 if not config.getint('hotkey_mute'):
@@ -733,11 +778,15 @@ class AppWindow(object):
 
     def shipyard_url(self, shipname):
         if not bool(config.getint("use_alt_shipyard_open")):
-            return plug.invoke(config.get('shipyard_provider'), 'EDSY', 'shipyard_url', monitor.ship(), monitor.is_beta)
+            return plug.invoke(
+                config.get('shipyard_provider'), 'EDSY', 'shipyard_url', monitor.ship(), monitor.snapshot['is_beta']
+            )
 
         # Avoid file length limits if possible
         provider = config.get('shipyard_provider') or 'EDSY'
-        target = plug.invoke(config.get('shipyard_provider'), 'EDSY', 'shipyard_url', monitor.ship(), monitor.is_beta)
+        target = plug.invoke(
+            config.get('shipyard_provider'), 'EDSY', 'shipyard_url', monitor.ship(), monitor.snapshot['is_beta']
+        )
         file_name = join(config.app_dir, "last_shipyard.html")
 
         with open(file_name, 'w') as f:
@@ -750,10 +799,11 @@ class AppWindow(object):
         return f'file://localhost/{file_name}'
 
     def system_url(self, system):
-        return plug.invoke(config.get('system_provider'),   'EDSM', 'system_url', monitor.system)
+        return plug.invoke(config.get('system_provider'),   'EDSM', 'system_url', monitor.snapshot['system'])
 
     def station_url(self, station):
-        return plug.invoke(config.get('station_provider'),  'eddb', 'station_url', monitor.system, monitor.station)
+        system, station = monitor.snapshot['system'], monitor.snapshot['station']
+        return plug.invoke(config.get('station_provider'),  'eddb', 'station_url', system, station)
 
     def cooldown(self):
         if time() < self.holdofftime:
@@ -763,10 +813,11 @@ class AppWindow(object):
             self.w.after(1000, self.cooldown)
         else:
             self.button['text'] = self.theme_button['text'] = _('Update')  # Update button in main window
-            self.button['state'] = self.theme_button['state'] = (monitor.cmdr and
-                                                                 monitor.mode and
-                                                                 not monitor.state['Captain'] and
-                                                                 monitor.system and
+            snapshot = monitor.snapshot
+            self.button['state'] = self.theme_button['state'] = (snapshot['cmdr'] and
+                                                                 snapshot['mode'] and
+                                                                 not snapshot['state']['Captain'] and
+                                                                 snapshot['system'] and
                                                                  tk.NORMAL or tk.DISABLED)
 
     def ontop_changed(self, event=None):
@@ -774,9 +825,10 @@ class AppWindow(object):
         self.w.wm_attributes('-topmost', self.always_ontop.get())
 
     def copy(self, event=None):
-        if monitor.system:
+        system, station = monitor.snapshot['system'], monitor.snapshot['station']
+        if system:
             self.w.clipboard_clear()
-            self.w.clipboard_append(monitor.station and f'{monitor.system},{monitor.station}' or monitor.system)
+            self.w.clipboard_append(station and f'{system},{station}' or system)
 
     def help_general(self, event=None):
         webbrowser.open('https://github.com/EDCD/EDMarketConnector/wiki')
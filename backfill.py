@@ -0,0 +1,197 @@
+"""
+Parse historical journal files, in parallel, into a single ordered stream of events.
+
+Each game session is parsed in a separate process with its own `EDLogs`, so the context attached to each event is
+as of that point in that session.  Sessions are independent of each other - the game writes the Cmdr's state afresh at
+the start of each one - but a long session is split across several parts, Journal.*.01.log, Journal.*.02.log etc, and
+a continuation part only makes sense after the parts before it, so a session's parts are parsed in order together.
+"""
+
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from os import listdir
+from os.path import join
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from config import appname
+
+logger = logging.getLogger(appname)
+
+# Journal.<yymmddHHMMSS>.<part>.log, where the timestamp is the local time that the game started writing the file
+_RE_LOGFILE = re.compile(r'^Journal(Beta)?\.([0-9]{12})\.([0-9]{2})\.log$')
+# How far a file's name might be from the journal timestamps in it - local time vs UTC, and long sessions
+_SLACK = timedelta(days=1)
+
+
+class BackfillEvent(NamedTuple):
+    """A journal entry, with the journal context as of that entry."""
+
+    logfile: str
+    offset: int  # Of the entry within the journal file
+    cmdr: Optional[str]
+    is_beta: bool
+    system: Optional[str]
+    station: Optional[str]
+    entry: Dict[str, Any]
+
+
+def journal_sessions(
+        journal_dir: str, start: Optional[datetime] = None, end: Optional[datetime] = None
+) -> List[List[str]]:
+    """
+    Find the journal files that may contain entries in a date range, grouped by game session.
+
+    :param journal_dir: The directory containing the journal files.
+    :param start: Earliest timestamp of interest (UTC), or None for no limit.
+    :param end: Latest timestamp of interest (UTC), or None for no limit.
+    :return: Paths of each session's journal files in part order, oldest session first.
+    """
+    dated = []
+    for name in listdir(journal_dir):
+        match = _RE_LOGFILE.search(name)
+        if match:
+            dated.append((datetime.strptime(match.group(2), '%y%m%d%H%M%S'), int(match.group(3)), name))
+
+    dated.sort()
+    # (when the session started, its files)
+    sessions: List[Tuple[datetime, List[str]]] = []
+    for started, part, name in dated:
+        if part > 1 and sessions:
+            sessions[-1][1].append(join(journal_dir, name))  # Continues the session before
+
+        else:
+            sessions.append((started, [join(journal_dir, name)]))
+
+    chosen = []
+    for i, (started, files) in enumerate(sessions):
+        if end and started > end + _SLACK:
+            break
+
+        # Entries in this session run until the next session is started
+        if start and i + 1 < len(sessions) and sessions[i + 1][0] < start - _SLACK:
+            continue
+
+        chosen.append(files)
+
+    return chosen
+
+
+def _timestamp(when: Optional[datetime]) -> Optional[str]:
+    """Format a datetime like a journal entry's timestamp, so they can be compared as strings."""
+    return when and when.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def _session_lines(logfiles: List[str]) -> Iterator[Tuple[str, int, bytes]]:
+    """
+    Read a session's journal files, one after the other.
+
+    :param logfiles: Paths of the journal files.
+    :return: Iterator of (journal file, offset of the line within it, line).
+    """
+    for logfile in logfiles:
+        offset = 0
+        with open(logfile, 'rb') as loghandle:
+            for line in loghandle:
+                yield logfile, offset, line
+                offset += len(line)
+
+
+def parse_session(
+        logfiles: List[str], start: Optional[str] = None, end: Optional[str] = None
+) -> Tuple[List[BackfillEvent], Dict[str, Any]]:
+    """
+    Parse a game session's journal files.
+
+    Called in a worker process.
+
+    :param logfiles: Paths of the session's journal files, in part order.
+    :param start: Earliest journal timestamp of interest, or None for no limit.
+    :param end: Latest journal timestamp of interest, or None for no limit.
+    :return: The entries in the session within the timestamp range, and the Cmdr state as of the end of the range.
+    """
+    import edmc_json  # Not at module level, so that importing this module stays cheap
+    from monitor import EDLogs
+
+    logs = EDLogs()
+    events = []
+    for logfile, offset, line in _session_lines(logfiles):
+        if not offset and logfile != logfiles[0]:
+            # A continuation's Fileheader would reset the context that the parts before it have built up
+            try:
+                entry = edmc_json.loads(line)
+                entry['timestamp'], entry['event']  # Expected, as by parse_entry()
+
+            except Exception:
+                entry = {'event': None}
+
+        else:
+            entry = logs.parse_entry(line)
+
+        if not entry['event']:
+            pass  # Invalid
+
+        elif end and entry['timestamp'] > end:
+            break
+
+        elif not start or entry['timestamp'] >= start:
+            events.append(BackfillEvent(
+                logfile, offset, logs.cmdr, logs.is_beta, logs.system, logs.station, entry
+            ))
+
+    return events, dict(logs.state, Friends=sorted(logs.state['Friends']))
+
+
+class Backfill:
+    """
+    The journal entries in a date range, parsed in parallel across processes but iterated in journal order.
+
+    Events are yielded as soon as all the sessions before them have been parsed, while later sessions are parsed ahead.
+    """
+
+    def __init__(
+            self, journal_dir: str, start: Optional[datetime] = None, end: Optional[datetime] = None,
+            processes: Optional[int] = None
+    ):
+        """
+        Find the journal files to parse.
+
+        :param journal_dir: The directory containing the journal files.
+        :param start: Earliest timestamp of interest (UTC), or None for no limit.
+        :param end: Latest timestamp of interest (UTC), or None for no limit.
+        :param processes: Number of worker processes, or None for one per CPU.
+        """
+        self.sessions = journal_sessions(journal_dir, start, end)
+        self.files = [logfile for session in self.sessions for logfile in session]
+        self.start = _timestamp(start)
+        self.end = _timestamp(end)
+        self.processes = processes
+        self.files_done = 0
+        self.events_done = 0
+        # Cmdr state as of the end of the session most recently iterated, i.e. rebuilt state once iteration completes
+        self.state: Optional[Dict[str, Any]] = None
+        # Called with (files done, total files, events so far) as each session is reached
+        self.progress: Optional[Callable[[int, int, int], None]] = None
+
+    def __iter__(self) -> Iterator[BackfillEvent]:
+        """
+        Parse the journal files and iterate through their entries.
+
+        :return: Iterator of the events, oldest first.
+        """
+        logger.info(f'Backfilling {len(self.files)} journal files in {len(self.sessions)} sessions')
+        with ProcessPoolExecutor(self.processes) as executor:
+            # map() returns results in order, while working ahead on later sessions
+            n = len(self.sessions)
+            for session, (events, state) in zip(
+                    self.sessions, executor.map(parse_session, self.sessions, [self.start] * n, [self.end] * n)
+            ):
+                self.files_done += len(session)
+                self.events_done += len(events)
+                if self.progress:
+                    self.progress(self.files_done, len(self.files), self.events_done)
+
+                yield from events
+                if events:
+                    self.state = state
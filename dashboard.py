@@ -1,4 +1,3 @@
-import json
 from calendar import timegm
 from operator import itemgetter
 from os import listdir
@@ -10,6 +9,7 @@ if __debug__:
     from traceback import print_exc
 
 from config import config
+import edmc_json
 
 
 if platform=='darwin':
@@ -30,9 +30,10 @@ class Dashboard(FileSystemEventHandler):
 
     _POLL = 1		# Fallback polling interval
 
-    def __init__(self):
+    def __init__(self, journal_dir=None):
         FileSystemEventHandler.__init__(self)	# futureproofing - not need for current version of watchdog
         self.root = None
+        self.journal_dir = journal_dir		# Where to find Status.json, else the journal directory in the settings
         self.currentdir = None		# The actual logdir that we're monitoring
         self.observer = None
         self.observed = None		# a watchdog ObservedWatch, or None if polling
@@ -42,7 +43,7 @@ class Dashboard(FileSystemEventHandler):
         self.root = root
         self.session_start = started
 
-        logdir = config.get('journaldir') or config.default_journal_dir
+        logdir = self.journal_dir or config.get('journaldir') or config.default_journal_dir
         if not logdir or not isdir(logdir):
             self.stop()
             return False
@@ -120,7 +121,7 @@ class Dashboard(FileSystemEventHandler):
             with open(join(self.currentdir, 'Status.json'), 'rb') as h:
                 data = h.read().strip()
                 if data:	# Can be empty if polling while the file is being re-written
-                    entry = json.loads(data)
+                    entry = edmc_json.loads(data)
 
                     # Status file is shared between beta and live. So filter out status not in this game session.
                     if (timegm(time.strptime(entry['timestamp'], '%Y-%m-%dT%H:%M:%SZ')) >= self.session_start and
@@ -0,0 +1,224 @@
+"""
+A single asyncio event loop, run in a background thread, shared by plugins' async hooks and their network I/O.
+
+Plugins that do network I/O can define `async def journal_entry_async(...)` etc. and use the shared `http` client,
+rather than each running its own thread, queue and connection pool.  Uses aiohttp for HTTP if it is installed, else
+runs requests in a small thread pool shared by all plugins.
+"""
+
+import asyncio
+import functools
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Coroutine, Mapping, Optional
+
+import edmc_json
+import timeout_session
+from config import appname
+
+try:
+    import aiohttp
+
+except ImportError:
+    aiohttp = None
+
+logger = logging.getLogger(appname)
+
+backend = 'aiohttp' if aiohttp else 'requests'
+
+
+class HTTPError(Exception):
+    """An HTTP response with an error status."""
+
+
+class HTTPResponse:
+    """An HTTP response, whichever library fetched it."""
+
+    def __init__(self, status: int, headers: Mapping[str, str], content: bytes, url: str):
+        self.status = status
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def ok(self) -> bool:
+        """Whether the status is a success."""
+        return self.status < 400
+
+    @property
+    def text(self) -> str:
+        """The body, decoded as UTF-8."""
+        return self.content.decode('utf-8', errors='replace')
+
+    def json(self) -> Any:
+        """
+        Decode the body as JSON.
+
+        :return: The decoded object.
+        """
+        return edmc_json.loads(self.content)
+
+    def raise_for_status(self) -> None:
+        """Raise HTTPError if the status is an error."""
+        if not self.ok:
+            raise HTTPError(f'{self.status} for {self.url}')
+
+
+class HTTPClient:
+    """An HTTP client for use on the shared event loop, with one connection pool for all plugins."""
+
+    CONNECTIONS = 8  # Maximum concurrent requests
+
+    def __init__(self):
+        self._session: Any = None  # aiohttp.ClientSession or requests.Session, made on first use
+        self._executor: Optional[ThreadPoolExecutor] = None  # For requests
+
+    async def request(
+            self, method: str, url: str, *, params: Optional[Mapping[str, Any]] = None, data: Any = None,
+            json: Any = None, headers: Optional[Mapping[str, str]] = None,
+            timeout: float = timeout_session.REQUEST_TIMEOUT
+    ) -> HTTPResponse:
+        """
+        Make an HTTP request.
+
+        Must be awaited on the shared event loop.
+
+        :param method: e.g. 'GET'.
+        :param url: The URL.
+        :param params: Query string parameters.
+        :param data: Body, as bytes, str or a form's fields.
+        :param json: Body, as an object to be encoded as JSON.
+        :param headers: Extra request headers.
+        :param timeout: In seconds.
+        :return: The response, whatever its status.
+        """
+        if json is not None:
+            data = edmc_json.dumpb(json)
+            headers = dict(headers or {}, **{'Content-Type': 'application/json'})
+
+        if aiohttp:
+            if not self._session:
+                self._session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=self.CONNECTIONS))
+
+            async with self._session.request(
+                    method, url, params=params, data=data, headers=headers,
+                    timeout=aiohttp.ClientTimeout(total=timeout)
+            ) as r:
+                return HTTPResponse(r.status, r.headers, await r.read(), str(r.url))
+
+        if not self._session:
+            self._session = timeout_session.new_session()
+            self._executor = ThreadPoolExecutor(self.CONNECTIONS, thread_name_prefix='Async HTTP')
+
+        r = await asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(
+            self._session.request, method, url, params=params, data=data, headers=headers, timeout=timeout
+        ))
+        return HTTPResponse(r.status_code, r.headers, r.content, r.url)
+
+    async def get(self, url: str, **kwargs) -> HTTPResponse:
+        """
+        Make a GET request.
+
+        :param url: The URL.
+        :param kwargs: As for `request()`.
+        :return: The response.
+        """
+        return await self.request('GET', url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> HTTPResponse:
+        """
+        Make a POST request.
+
+        :param url: The URL.
+        :param kwargs: As for `request()`.
+        :return: The response.
+        """
+        return await self.request('POST', url, **kwargs)
+
+    async def close(self) -> None:
+        """Close the connection pool."""
+        if aiohttp and self._session:
+            await self._session.close()
+
+        elif self._session:
+            self._session.close()
+            self._executor.shutdown(wait=False)
+
+        self._session = None
+
+
+class EventLoop:
+    """An asyncio event loop running in its own thread, started on first use."""
+
+    def __init__(self):
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.stopping = False  # Set once the loop starts stopping, so that long-running coroutines can finish early
+
+    def _start(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if not self._loop:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._run, args=(self._loop,), name='Async loop', daemon=True)
+                self._thread.start()
+
+        return self._loop
+
+    @staticmethod
+    def _run(loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """
+        Run a coroutine on the loop.  May be called from any thread.
+
+        Coroutines are started in the order submitted, but run concurrently.
+
+        :param coro: The coroutine.
+        :return: Its result.
+        :raises RuntimeError: If the loop is stopping, and so might never run it.
+        """
+        if self.stopping:
+            coro.close()  # Else it warns that it was never awaited
+            raise RuntimeError('The async loop is stopping')
+
+        return asyncio.run_coroutine_threadsafe(coro, self._loop or self._start())
+
+    def stop(self, timeout: float) -> None:
+        """
+        Wait for running coroutines to finish, cancel any that don't, close the HTTP client and stop the loop.
+
+        Nothing more can be submitted after this is called.
+
+        :param timeout: Maximum time to wait for running coroutines, in seconds.
+        """
+        self.stopping = True
+        if not self._loop:
+            return
+
+        async def shutdown() -> None:
+            tasks = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+            if tasks:
+                done, pending = await asyncio.wait(tasks, timeout=timeout)
+                for task in pending:
+                    logger.warning(f'Cancelling {task!r}')
+                    task.cancel()
+
+            await http.close()
+
+        try:
+            asyncio.run_coroutine_threadsafe(shutdown(), self._loop).result(timeout + 1)
+
+        except Exception:
+            logger.exception('Failed shutting down async loop')
+
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(1)  # type: ignore
+
+
+# singletons
+loop = EventLoop()
+http = HTTPClient()
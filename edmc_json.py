@@ -0,0 +1,95 @@
+"""
+JSON encoding and decoding for the hot paths - journal, dashboard, EDDN replay, EDSM and Inara.
+
+Decodes to plain dicts, which keep insertion order, rather than OrderedDicts.  Uses orjson if it is installed,
+else the standard library.  Output is always compact.  For pretty-printed or otherwise customised output use the
+standard library `json` module directly.
+"""
+
+import json
+from typing import IO, Any, AnyStr
+
+try:
+    import orjson
+
+except ImportError:
+    orjson = None
+
+# So callers can catch decoding errors without caring which backend is in use. orjson's is a subclass of this.
+JSONDecodeError = json.JSONDecodeError
+
+backend = 'orjson' if orjson else 'json'
+
+if orjson:
+    _OPTIONS = orjson.OPT_NON_STR_KEYS  # Like the standard library, rather than raising TypeError
+
+    def loads(s: AnyStr) -> Any:
+        """
+        Decode a JSON document.
+
+        :param s: The document, as str or UTF-8 encoded bytes.
+        :return: The decoded object.
+        """
+        return orjson.loads(s)
+
+    def dumpb(obj: Any) -> bytes:
+        """
+        Encode an object as a compact JSON document.
+
+        :param obj: The object to encode.
+        :return: The UTF-8 encoded document.
+        """
+        return orjson.dumps(obj, option=_OPTIONS)
+
+    def dumps(obj: Any) -> str:
+        """
+        Encode an object as a compact JSON document.
+
+        :param obj: The object to encode.
+        :return: The document.
+        """
+        return orjson.dumps(obj, option=_OPTIONS).decode('utf-8')
+
+else:
+    _decoder = json.JSONDecoder()
+    _encoder = json.JSONEncoder(ensure_ascii=False, separators=(',', ':'))
+
+    def loads(s: AnyStr) -> Any:  # noqa: F811 # See above
+        """
+        Decode a JSON document.
+
+        :param s: The document, as str or UTF-8 encoded bytes.
+        :return: The decoded object.
+        """
+        if isinstance(s, (bytes, bytearray)):
+            s = s.decode('utf-8')
+
+        return _decoder.decode(s)
+
+    def dumpb(obj: Any) -> bytes:  # noqa: F811 # See above
+        """
+        Encode an object as a compact JSON document.
+
+        :param obj: The object to encode.
+        :return: The UTF-8 encoded document.
+        """
+        return _encoder.encode(obj).encode('utf-8')
+
+    def dumps(obj: Any) -> str:  # noqa: F811 # See above
+        """
+        Encode an object as a compact JSON document.
+
+        :param obj: The object to encode.
+        :return: The document.
+        """
+        return _encoder.encode(obj)
+
+
+def load(fp: IO) -> Any:
+    """
+    Decode a JSON document from a file.
+
+    :param fp: The file, opened in text or binary mode.
+    :return: The decoded object.
+    """
+    return loads(fp.read())
@@ -0,0 +1,377 @@
+"""
+Run the journal and dashboard monitors and all the plugins without a display, e.g. as a service.
+
+Tk's main loop is replaced by `Scheduler`, which provides the parts of the Tk interface that `monitor`, `dashboard`,
+`plug` and the plugins use to get work onto the main thread.  The main window's widgets are replaced by
+`HeadlessWidget`s, which log their text instead of showing it.  Companion API queries need the user to log in through
+a browser, so aren't made.
+
+Can monitor several journal directories, e.g. for several Cmdrs whose journals are synced to this machine, all tailed
+by one `JournalScheduler` thread.  Plugins can tell them apart by `state['Source']`.
+"""
+
+import heapq
+import itertools
+import logging
+import os
+import queue
+import signal
+import threading
+from time import monotonic
+from typing import Any, Callable, Dict, List, Mapping, Optional, Set, Tuple
+
+import plug
+from config import appname, config
+from dashboard import Dashboard, dashboard
+from monitor import EDLogs, JournalScheduler, monitor
+
+logger = logging.getLogger(appname)
+
+
+class Scheduler:
+    """
+    A stand-in for the Tk main loop and root window.
+
+    Runs `bind_all()` handlers for events raised with `event_generate()`, which may be called from any thread, and
+    callbacks scheduled with `after()`, all on the thread that calls `mainloop()`.
+    """
+
+    def __init__(self):
+        self._bindings: Dict[str, List[Callable]] = {}
+        self._events: queue.Queue = queue.Queue()  # Event sequences, or None just to wake mainloop()
+        self._timers: List[Tuple[float, int, Callable, tuple]] = []  # heap of (monotonic() due, id, func, args)
+        self._cancelled: Set[int] = set()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()  # For _timers, in case after() is called from another thread
+        self._running = False
+
+    def bind_all(self, sequence: str, func: Callable, add: Optional[str] = None) -> None:
+        """
+        Handle an event.
+
+        :param sequence: The event, e.g. '<<JournalEvent>>'.
+        :param func: Called with an event argument, which is always None.
+        :param add: '+' to add to the existing handlers, else replace them.
+        """
+        if add:
+            self._bindings.setdefault(sequence, []).append(func)
+
+        else:
+            self._bindings[sequence] = [func]
+
+    def event_generate(self, sequence: str, **kwargs) -> None:
+        """
+        Raise an event, to be handled on the main thread.  May be called from any thread.
+
+        :param sequence: The event, e.g. '<<JournalEvent>>'.
+        :param kwargs: Ignored.  Events are always handled in the order raised, like Tk's when='tail'.
+        """
+        self._events.put(sequence)
+
+    def after(self, ms: int, func: Optional[Callable] = None, *args) -> str:
+        """
+        Call a function after a delay, on the main thread.
+
+        :param ms: The delay, in milliseconds.
+        :param func: The function.
+        :param args: Its arguments.
+        :return: An id for `after_cancel()`.
+        """
+        timer_id = next(self._ids)
+        if func:
+            with self._lock:
+                heapq.heappush(self._timers, (monotonic() + ms / 1000, timer_id, func, args))
+
+            self._events.put(None)  # In case the main loop is waiting for something later
+
+        return f'after#{timer_id}'
+
+    def after_idle(self, func: Callable, *args) -> str:
+        """
+        Call a function as soon as possible, on the main thread.
+
+        :param func: The function.
+        :param args: Its arguments.
+        :return: An id for `after_cancel()`.
+        """
+        return self.after(0, func, *args)
+
+    def after_cancel(self, after_id: str) -> None:
+        """
+        Cancel a call scheduled with `after()`.
+
+        :param after_id: The id returned by `after()`.
+        """
+        self._cancelled.add(int(after_id.split('#')[1]))
+
+    def update_idletasks(self) -> None:
+        """Nothing to update without a display."""
+
+    def quit(self) -> None:
+        """Make `mainloop()` return.  May be called from any thread or a signal handler."""
+        self._running = False
+        self._events.put(None)
+
+    def mainloop(self) -> None:
+        """Handle events and scheduled calls until `quit()`."""
+        self._running = True
+        while self._running:
+            with self._lock:
+                due = []
+                now = monotonic()
+                while self._timers and self._timers[0][0] <= now:
+                    due.append(heapq.heappop(self._timers))
+
+                wait = self._timers[0][0] - now if self._timers else None
+
+            for _, timer_id, func, args in due:
+                if timer_id in self._cancelled:
+                    self._cancelled.discard(timer_id)
+
+                else:
+                    self._call(func, *args)
+
+            if due:
+                continue  # They may have scheduled more
+
+            try:
+                # Wake regularly so that signal handlers get a chance to run
+                sequence = self._events.get(timeout=min(wait, 1) if wait is not None else 1)
+
+            except queue.Empty:
+                continue
+
+            for func in list(self._bindings.get(sequence, [])) if sequence else []:
+                self._call(func, None)
+
+    @staticmethod
+    def _call(func: Callable, *args) -> None:
+        try:
+            func(*args)
+
+        except Exception:
+            logger.exception(f'Failed in {func!r}')
+
+
+class HeadlessWidget:
+    """
+    A stand-in for one of the main window's widgets, for plugins that update them.
+
+    Options such as 'text' are remembered but not shown.  Text set on the 'status' widget is logged.  Child widgets
+    are made on demand, so e.g. `parent.children['system']` works.
+    """
+
+    # Widget methods that don't do anything without a display
+    _NOOPS = {'bind', 'columnconfigure', 'destroy', 'grid', 'grid_forget', 'pack', 'place', 'rowconfigure'}
+
+    def __init__(self, scheduler: Scheduler, name: str):
+        """
+        Make a widget.
+
+        :param scheduler: The scheduler, for `event_generate()`, `after()` and so on.
+        :param name: The widget's name, e.g. 'status'.
+        """
+        self.scheduler = scheduler
+        self.name = name
+        self.options: Dict[str, Any] = {}
+        self.children = _Children(scheduler)
+
+    def __getitem__(self, key: str) -> Any:
+        return self.options.get(key, '')
+
+    def __setitem__(self, key: str, value: Any) -> None:
+        self.configure(**{key: value})
+
+    def cget(self, key: str) -> Any:
+        """Get an option."""
+        return self[key]
+
+    def configure(self, **kwargs) -> None:
+        """Set options."""
+        text = kwargs.get('text')
+        if text and text != self.options.get('text'):
+            if self.name == 'status':
+                logger.info(f'Status: {text}')
+
+            else:
+                logger.debug(f'{self.name}: {text}')
+
+        self.options.update(kwargs)
+
+    config = configure
+
+    def __getattr__(self, name: str) -> Any:
+        if name in ('after', 'after_cancel', 'after_idle', 'bind_all', 'event_generate', 'update_idletasks'):
+            return getattr(self.scheduler, name)
+
+        if name in self._NOOPS:
+            return lambda *args, **kwargs: None
+
+        raise AttributeError(name)
+
+
+class _Children(dict):
+    """A widget's children, made on demand."""
+
+    def __init__(self, scheduler: Scheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def __missing__(self, key: str) -> HeadlessWidget:
+        child = self[key] = HeadlessWidget(self.scheduler, key)
+        return child
+
+
+class HeadlessApp:
+    """Monitors the journal and dashboard and drives the plugins, like `AppWindow` but without a display."""
+
+    JOURNAL_SLICE = 50  # Max journal entries to handle before letting other events and callbacks run
+
+    def __init__(self, journal_dirs: Optional[Mapping[str, str]] = None, load_plugins: bool = True):
+        """
+        Load the plugins.
+
+        :param journal_dirs: Journal directories to monitor, by name.  If not given, monitors the journal directory in
+            the settings.
+        :param load_plugins: Whether to load the installed plugins.  If not, plugins can be added to `plug.PLUGINS`.
+        """
+        os.environ['EDMC_NO_UI'] = '1'  # For plugins that check
+        self.w = Scheduler()
+        self.scheduler: Optional[JournalScheduler] = None
+        # The Status file monitor for each journal directory
+        self.dashboards: Dict[EDLogs, Dashboard] = {monitor: dashboard}
+        if journal_dirs:
+            self.scheduler = JournalScheduler()
+            self.dashboards = {
+                self.scheduler.add(journal_dir, source): Dashboard(journal_dir)
+                for source, journal_dir in journal_dirs.items()
+            }
+
+        self.monitors = list(self.dashboards)
+        self._status: Dict[Dashboard, dict] = {}  # The last status passed to plugins from each Status file
+
+        self.frame = HeadlessWidget(self.w, 'frame')  # Stands in for the main window's frame, for plugin_app()
+        if load_plugins:
+            plug.load_plugins(self.w)
+            for plugin in plug.PLUGINS:
+                plugin.get_app(self.frame)  # Plugins may keep references to the main window's widgets
+
+        self.w.bind_all('<<JournalEvent>>', self.journal_event)
+        self.w.bind_all('<<DashboardEvent>>', self.dashboard_event)
+        self.w.bind_all('<<PluginError>>', self.plugin_error)
+
+    def run(self) -> bool:
+        """
+        Run until interrupted or terminated.
+
+        :return: False if none of the journal directories could be monitored.
+        """
+        started = 0
+        for journal in self.monitors:
+            if journal.start(self.w):
+                logger.info(f'Monitoring {journal.currentdir}')
+                started += 1
+
+            elif journal.source:
+                logger.error(f'Can\'t monitor the journal in {journal.journal_dir!r}')
+
+            else:
+                logger.error('Can\'t monitor the journal - check the journal file location with the GUI app')
+
+        if not started:
+            self.close()
+            return False
+
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(signum, lambda *args: self.w.quit())
+
+        self.w.mainloop()
+        logger.info('Stopping')
+        self.close()
+        return True
+
+    def close(self) -> None:
+        """Stop monitoring and stop the plugins."""
+        for board in self.dashboards.values():
+            board.close()
+
+        if self.scheduler:
+            self.scheduler.close()
+
+        else:
+            monitor.close()
+
+        plug.notify_stop()
+        config.close()
+
+    def journal_event(self, event=None) -> None:
+        """Handle a slice of the queued journal entries from each journal directory."""
+        backlog = False
+        for journal in self.monitors:
+            backlog = self.journal_slice(journal) or backlog
+
+        if backlog:
+            self.w.after(0, self.journal_event)  # Carry on after any other pending events
+
+    def journal_slice(self, journal: EDLogs) -> bool:
+        """
+        Handle a slice of the queued journal entries from one journal directory.
+
+        :param journal: The journal monitor.
+        :return: Whether there are more entries queued.
+        """
+        journal.notify_pending.clear()  # Entries queued from now on need another <<JournalEvent>>
+
+        batch = []
+        while len(batch) < self.JOURNAL_SLICE:
+            entry = journal.get_entry()
+            if not entry:
+                break
+
+            batch.append((entry, journal.snapshot))
+
+        # Runs of consecutive entries for the same Cmdr, for the plugins that take batches of entries
+        runs: List[Tuple[Optional[str], bool, list]] = []
+        for entry, snapshot in batch:
+            if not entry['event'] or not snapshot['mode']:
+                continue  # Startup or in CQC
+
+            if entry['event'] in ('StartUp', 'LoadGame') and snapshot['started']:
+                if not self.dashboards[journal].start(self.w, snapshot['started']):
+                    logger.info("Can't start Status monitoring")
+
+            if entry['event'] == 'Loadout' and not snapshot['state']['Captain'] \
+                    and config.getint('output') & config.OUT_SHIP:
+                journal.export_ship(state=snapshot['state'])
+
+            err = plug.notify_journal_entry(snapshot['cmdr'], snapshot['is_beta'], snapshot['system'],
+                                            snapshot['station'], entry, snapshot['state'])
+            if err:
+                self.frame.children['status']['text'] = err
+
+            if not runs or runs[-1][:2] != (snapshot['cmdr'], snapshot['is_beta']):
+                runs.append((snapshot['cmdr'], snapshot['is_beta'], []))
+
+            runs[-1][2].append((snapshot['system'], snapshot['station'], entry, snapshot['state']))
+
+        for cmdr, is_beta, entries in runs:
+            err = plug.notify_journal_entries(cmdr, is_beta, entries)
+            if err:
+                self.frame.children['status']['text'] = err
+
+        return len(batch) == self.JOURNAL_SLICE
+
+    def dashboard_event(self, event=None) -> None:
+        """Handle Status.json updates."""
+        for journal, board in self.dashboards.items():
+            entry = board.status
+            if entry and entry is not self._status.get(board):
+                self._status[board] = entry
+                err = plug.notify_dashboard_entry(journal.snapshot['cmdr'], journal.snapshot['is_beta'], entry)
+                if err:
+                    self.frame.children['status']['text'] = err
+
+    def plugin_error(self, event=None) -> None:
+        """Handle an error message from a plugin."""
+        if plug.last_error.get('msg'):
+            self.frame.children['status']['text'] = plug.last_error['msg']
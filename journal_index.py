@@ -0,0 +1,194 @@
+"""
+Optional index of journal events in a local SQLite database, for answering questions about the Cmdr's history.
+
+The journal worker thread writes each event as it is parsed, a batch per transaction.  `EDMC.py backfill --index`
+adds older journals.  The database is in WAL mode, so any thread or process can query it while it is being written.
+"""
+
+import logging
+import sqlite3
+import threading
+from os.path import exists, join
+from pathlib import Path
+from typing import Any, Dict, List, Mapping, Optional
+
+import edmc_json
+from config import appname, config
+
+logger = logging.getLogger(appname)
+
+
+class JournalIndex:
+    """An index of journal events, keyed by journal file and the offset of the event within it."""
+
+    _SCHEMA_VERSION = 2
+    _SCHEMA = """
+        CREATE TABLE IF NOT EXISTS events (
+            logfile        TEXT NOT NULL,
+            offset         INTEGER NOT NULL,
+            timestamp      TEXT NOT NULL,
+            event          TEXT NOT NULL,
+            cmdr           TEXT,
+            system_address INTEGER,
+            market_id      INTEGER,
+            entry          TEXT NOT NULL,
+            PRIMARY KEY (logfile, offset)
+        );
+        CREATE INDEX IF NOT EXISTS events_timestamp ON events (timestamp);
+        CREATE INDEX IF NOT EXISTS events_event ON events (event, timestamp);
+        CREATE INDEX IF NOT EXISTS events_system_address ON events (system_address, timestamp);
+        CREATE INDEX IF NOT EXISTS events_market_id ON events (market_id, timestamp);
+        CREATE INDEX IF NOT EXISTS events_cmdr ON events (cmdr, timestamp);
+    """
+
+    BATCH = 1000  # Maximum events per transaction
+
+    def __init__(self, filename: str):
+        """
+        Prepare to use an index.
+
+        Nothing is opened until the index is first written or queried.
+
+        :param filename: Path of the SQLite database.
+        """
+        self.filename = filename
+        self._writer: Optional[sqlite3.Connection] = None
+        self._pending: List[tuple] = []
+        self._lock = threading.Lock()  # Writes normally come from the journal worker, but it may be replaced
+        # Connections for querying, by thread - a sqlite3 connection mustn't be shared between threads
+        self._readers: Dict[int, sqlite3.Connection] = {}
+        self._readers_lock = threading.Lock()  # Not _lock, so that queries don't wait for writes
+
+    def _open_writer(self) -> sqlite3.Connection:
+        """Open the database for writing, creating it if necessary."""
+        db = sqlite3.connect(self.filename, check_same_thread=False)  # See _lock
+        db.execute('PRAGMA journal_mode=WAL')
+        db.execute('PRAGMA synchronous=NORMAL')  # Durable enough in WAL mode - a crash may lose only the last batch
+        if db.execute('PRAGMA user_version').fetchone()[0] != self._SCHEMA_VERSION:
+            db.executescript(self._SCHEMA)
+            db.execute(f'PRAGMA user_version={self._SCHEMA_VERSION}')
+
+        return db
+
+    def add(self, logfile: str, offset: int, entry: Mapping[str, Any], cmdr: Optional[str]) -> None:
+        """
+        Queue an event for writing by the next `commit()`.
+
+        Events that are already in the index are ignored, so a journal may safely be indexed again.
+
+        :param logfile: Name of the journal file.
+        :param offset: Offset of the event within the journal file.
+        :param entry: The journal entry.
+        :param cmdr: The Cmdr as of the entry.
+        """
+        with self._lock:
+            self._pending.append((
+                logfile, offset, entry['timestamp'], entry['event'], cmdr,
+                entry.get('SystemAddress'), entry.get('MarketID'), edmc_json.dumps(entry)
+            ))
+            if len(self._pending) >= self.BATCH:
+                self._commit()
+
+    def commit(self) -> None:
+        """Write the queued events in a single transaction."""
+        with self._lock:
+            self._commit()
+
+    def _commit(self) -> None:
+        if not self._pending:
+            return
+
+        try:
+            if not self._writer:
+                self._writer = self._open_writer()
+
+            with self._writer:
+                self._writer.executemany('INSERT OR IGNORE INTO events VALUES (?, ?, ?, ?, ?, ?, ?, ?)', self._pending)
+
+        except sqlite3.Error:
+            logger.exception(f'Failed writing {len(self._pending)} events to the journal index')
+
+        self._pending = []
+
+    def close(self) -> None:
+        """Write any queued events and close the database, including every thread's connection for querying."""
+        with self._lock:
+            self._commit()
+            if self._writer:
+                self._writer.close()
+                self._writer = None
+
+        with self._readers_lock:
+            for db in self._readers.values():
+                db.close()
+
+            self._readers.clear()
+
+    def query(
+            self, event: Optional[str] = None, start: Optional[str] = None, end: Optional[str] = None,
+            system_address: Optional[int] = None, market_id: Optional[int] = None, cmdr: Optional[str] = None,
+            limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find journal entries.
+
+        May be called from any thread.  Events still queued by `add()` are not visible until committed.
+
+        :param event: Only entries of this event type.
+        :param start: Only entries with this timestamp or later, as "YYYY-MM-DDTHH:MM:SSZ" or a prefix of that.
+        :param end: Only entries with this timestamp or earlier, as "YYYY-MM-DDTHH:MM:SSZ".
+        :param system_address: Only entries with this SystemAddress.
+        :param market_id: Only entries with this MarketID.
+        :param cmdr: Only entries for this Cmdr.
+        :param limit: Return at most this many entries - the most recent.
+        :return: The journal entries, oldest first.
+        """
+        clauses = []
+        params: List[Any] = []
+        for clause, value in (
+                ('event = ?', event),
+                ('timestamp >= ?', start),
+                ('timestamp <= ?', end),
+                ('system_address = ?', system_address),
+                ('market_id = ?', market_id),
+                ('cmdr = ?', cmdr),
+        ):
+            if value is not None:
+                clauses.append(clause)
+                params.append(value)
+
+        sql = 'SELECT entry FROM events'
+        if clauses:
+            sql += ' WHERE ' + ' AND '.join(clauses)
+
+        sql += ' ORDER BY timestamp DESC, logfile DESC, offset DESC'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+
+        db = self._reader()
+        if not db:
+            return []
+
+        rows = db.execute(sql, params).fetchall()
+        return [edmc_json.loads(row[0]) for row in reversed(rows)]
+
+    def _reader(self) -> Optional[sqlite3.Connection]:
+        """Get this thread's connection for querying, or None if there's no index yet."""
+        thread = threading.get_ident()
+        with self._readers_lock:
+            db = self._readers.get(thread)
+            if not db:
+                if not exists(self.filename):
+                    return None
+
+                # Only used by this thread, or a later one with the same ident, but may be closed by any thread
+                db = self._readers[thread] = sqlite3.connect(
+                    f'{Path(self.filename).resolve().as_uri()}?mode=ro', uri=True, check_same_thread=False
+                )
+
+        return db
+
+
+# singleton
+index = JournalIndex(join(config.app_dir, 'journal_index.db'))
@@ -1,14 +1,19 @@
-from collections import defaultdict, OrderedDict
+from collections import defaultdict, deque, OrderedDict
 import json
+import logging
 import re
 import threading
 from operator import itemgetter
-from os import listdir, SEEK_SET, SEEK_END
+from os import fstat, listdir, replace, SEEK_SET, SEEK_END
 from os.path import basename, expanduser, isdir, join
 from sys import platform
-from time import gmtime, localtime, sleep, strftime, strptime, time
+from time import gmtime, localtime, monotonic, sleep, strftime, strptime, time
 from calendar import timegm
-from typing import Any, Optional, OrderedDict as OrderedDictT, Tuple, TYPE_CHECKING
+from types import MappingProxyType
+from typing import (
+    Any, BinaryIO, Callable, Deque, Dict, Generic, List, Mapping, MutableMapping, Optional, OrderedDict as OrderedDictT,
+    Tuple, TypeVar, TYPE_CHECKING
+)
 
 if TYPE_CHECKING:
     import tkinter
@@ -16,8 +21,12 @@ if TYPE_CHECKING:
 if __debug__:
     from traceback import print_exc
 
-from config import config
+from config import appname, config
 from companion import ship_file_name
+import edmc_json
+import journal_index
+
+logger = logging.getLogger(appname)
 
 
 if platform == 'darwin':
@@ -44,11 +53,332 @@ elif platform == 'win32':
 
     GetProcessHandleFromHwnd = ctypes.windll.oleacc.GetProcessHandleFromHwnd
 
+elif platform == 'linux':
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+    import ctypes
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+
+    # statfs(2) f_type values of filesystems on which inotify doesn't see changes made by other machines
+    NETWORK_FS_MAGIC = {
+        0x00C36400,  # CEPH_SUPER_MAGIC
+        0x01021997,  # V9FS_MAGIC
+        0x0BD00BD0,  # LL_SUPER_MAGIC (Lustre)
+        0x5346414F,  # AFS_SUPER_MAGIC
+        0x517B,      # SMB_SUPER_MAGIC
+        0x6969,      # NFS_SUPER_MAGIC
+        0x65735546,  # FUSE_SUPER_MAGIC (sshfs etc.)
+        0x6B414653,  # AFS_FS_MAGIC
+        0x73757245,  # CODA_SUPER_MAGIC
+        0xFE534D42,  # SMB2_MAGIC_NUMBER
+        0xFF534D42,  # CIFS_MAGIC_NUMBER
+    }
+
+    def is_network_mount(path: str) -> bool:
+        """
+        Determine whether a directory is on a network filesystem, on which inotify is unreliable.
+
+        :param path: The directory to check.
+        :return: True if on a network filesystem, or if that can't be determined.
+        """
+        buf = ctypes.create_string_buffer(256)  # Larger than struct statfs on any architecture
+        if libc.statfs(path.encode(), buf):
+            logger.warning(f'statfs({path!r}) failed: {ctypes.get_errno()}')
+            return True
+
+        # f_type is the first member, and is a long on all Linux architectures we care about
+        f_type = ctypes.c_long.from_buffer(buf).value & 0xFFFFFFFF
+        return f_type in NETWORK_FS_MAGIC
+
 else:
-    # Linux's inotify doesn't work over CIFS or NFS, so poll
+    # No inotify here, so poll
     FileSystemEventHandler = object  # dummy
 
 
+_T = TypeVar('_T')
+_F = TypeVar('_F', bound=Callable[..., Any])
+
+
+def _read_only(self, *args, **kwargs):
+    raise TypeError(f"'{type(self).__name__}' object is read-only")
+
+
+class FrozenDict(dict):
+    """A read-only dict. Use dict(...) or .copy() to get a mutable copy."""
+
+    __setitem__ = __delitem__ = __ior__ = clear = pop = popitem = setdefault = update = _read_only  # type: ignore
+
+    def __reduce__(self):
+        return type(self), (dict(self),)
+
+
+class FrozenCounts(FrozenDict):
+    """A read-only defaultdict(int)."""
+
+    def __missing__(self, key: Any) -> int:
+        return 0
+
+
+class FrozenList(list):
+    """A read-only list. Use list(...) or .copy() to get a mutable copy."""
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _read_only  # type: ignore
+    append = clear = extend = insert = pop = remove = reverse = sort = _read_only  # type: ignore
+
+    def __reduce__(self):
+        return type(self), (list(self),)
+
+
+class FrozenState(FrozenDict):
+    """The Cmdr state as of a journal entry. Its `version` increases whenever anything in the state changes."""
+
+    def __init__(self, state: Mapping[str, Any], version: int):
+        super().__init__(state)
+        self.version = version
+
+    def __reduce__(self):
+        return type(self), (dict(self), self.version)
+
+
+def freeze(value: Any, previous: Any = None) -> Any:
+    """
+    Make a read-only copy of a nested structure of dicts, lists and sets.
+
+    Any part of the structure that is unchanged from a previous copy is shared with it, rather than copied again.
+
+    :param value: The structure to copy.
+    :param previous: The result of freezing an earlier version of the structure, if any.
+    :return: The read-only copy.
+    """
+    if previous is not None and previous == value:
+        return previous
+
+    if isinstance(value, dict):
+        if not isinstance(previous, dict):
+            previous = {}
+
+        frozen = {k: freeze(v, previous.get(k)) for k, v in value.items()}
+        return FrozenCounts(frozen) if isinstance(value, defaultdict) else FrozenDict(frozen)
+
+    elif isinstance(value, list):
+        return FrozenList(freeze(v) for v in value)
+
+    elif isinstance(value, tuple):
+        return tuple(freeze(v) for v in value)
+
+    elif isinstance(value, set):
+        return frozenset(value)
+
+    return value
+
+
+def _journal_event(*events: str) -> Callable[[_F], _F]:
+    """
+    Mark an EDLogs method as the parser for the given journal event(s).
+
+    The method is called with the decoded entry and may return a replacement entry, else None.
+
+    :param events: Journal event names handled by the decorated method.
+    :return: The decorator.
+    """
+    def decorate(func: _F) -> _F:
+        func._journal_events = events  # type: ignore
+        return func
+
+    return decorate
+
+
+def _journal_parsers(namespace: Mapping[str, Any]) -> Dict[str, Callable[..., Any]]:
+    """
+    Build the event name -> parser dispatch table from the methods marked with `_journal_event`.
+
+    :param namespace: The class body namespace.
+    :return: The dispatch table.
+    """
+    parsers: Dict[str, Callable[..., Any]] = {}
+    for func in namespace.values():
+        for event in getattr(func, '_journal_events', ()):
+            assert event not in parsers, f'Duplicate parser for journal event {event}'
+            parsers[event] = func
+
+    return parsers
+
+
+class JournalQueue(Generic[_T]):
+    """
+    FIFO for passing parsed journal entries from the journal worker thread to the main thread.
+
+    The high-water mark is advisory: the worker stops reading the journal while the queue is at or above it, and
+    resumes once the main thread has drained it to half that depth.  Counters are kept so that the depth of any
+    backlog can be inspected.
+    """
+
+    HIGHWATER = 1000  # Default high-water mark, overridden by the 'journal_queue_highwater' setting
+
+    def __init__(self, highwater: int = HIGHWATER):
+        self.highwater = highwater
+        self._queue: Deque[_T] = deque()
+        self._space = threading.Event()  # Set while there is room below the low-water mark
+        self._space.set()
+        self.max_depth = 0  # Deepest the queue has been
+        self.enqueued = 0  # Total items ever put
+        self.dequeued = 0  # Total items ever got
+
+    def __len__(self) -> int:
+        return len(self._queue)
+
+    def put(self, item: _T) -> None:
+        """Add an item. Called from the worker thread."""
+        self._queue.append(item)
+        self.enqueued += 1
+        depth = len(self._queue)
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def get(self) -> Optional[_T]:
+        """Remove and return the oldest item, or None if empty. Called from the main thread."""
+        try:
+            item = self._queue.popleft()
+
+        except IndexError:
+            return None
+
+        self.dequeued += 1
+        if not self._space.is_set() and len(self._queue) <= self.highwater // 2:
+            self._space.set()
+
+        return item
+
+    def full(self) -> bool:
+        """Whether the worker should stop reading the journal for now."""
+        if len(self._queue) < self.highwater:
+            return False
+
+        self._space.clear()
+        if len(self._queue) <= self.highwater // 2:  # Drained while we were clearing
+            self._space.set()
+            return False
+
+        return True
+
+    def wait_for_space(self, timeout: float) -> bool:
+        """
+        Block until the main thread has drained the queue to its low-water mark.
+
+        :param timeout: Maximum time to wait, in seconds.
+        :return: Whether there is now space.
+        """
+        return self._space.wait(timeout)
+
+    def clear(self) -> None:
+        """Discard any queued items."""
+        self._queue.clear()
+        self._space.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Backpressure counters, for diagnostics."""
+        return {
+            'depth':     len(self._queue),
+            'max_depth': self.max_depth,
+            'highwater': self.highwater,
+            'enqueued':  self.enqueued,
+            'dequeued':  self.dequeued,
+        }
+
+
+class SideFiles:
+    """
+    Reads the files that the game writes alongside the journal, e.g. Market.json, once for everything that wants them.
+
+    Each version of a file is parsed once, keyed by its path, mtime and size, and everyone gets the same read-only copy.
+    The last few versions of each file are also kept by their timestamp, so that the version that goes with a journal
+    entry can still be had after the game has replaced it.  Thread-safe.
+    """
+
+    HISTORY = 4  # Versions of each file to keep by timestamp
+    RETRIES = 10  # Times to re-read a file that's partly written, or older than the journal entry that it goes with
+    RETRY_DELAY = 0.05  # [s]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current: Dict[str, Tuple[int, int, Any]] = {}  # path -> (mtime_ns, size, content)
+        self._versions: Dict[str, OrderedDictT[str, Any]] = {}  # path -> timestamp -> content, oldest first
+
+    def read(self, path: str, timestamp: Optional[str] = None) -> Optional[Mapping[str, Any]]:
+        """
+        Read a side file.
+
+        :param path: The file.
+        :param timestamp: The timestamp of the journal entry that the file goes with, if any.  If that version of the
+            file has been read it's returned, even if the file has since been replaced.  Else the file is re-read for a
+            while until it's at least as new.
+        :return: The file's content, read-only, or None if there's no such file, or if it never caught up with the
+            timestamp.
+        :raises OSError, ValueError: If the file can't be read or parsed.
+        """
+        with self._lock:
+            if timestamp and timestamp in self._versions.get(path, {}):
+                return self._versions[path][timestamp]
+
+        # Not holding the lock, so that waiting for this file doesn't hold up readers of the others
+        for attempt in range(self.RETRIES + 1):
+            if attempt:
+                sleep(self.RETRY_DELAY)
+
+            try:
+                content = self._read(path)
+
+            except FileNotFoundError:
+                return None
+
+            except (ValueError, PermissionError):
+                # Being written, or locked by the game on Windows
+                if attempt == self.RETRIES:
+                    raise
+
+                continue
+
+            if not timestamp or content.get('timestamp', '') >= timestamp:
+                return content
+
+        # Probably written for a different journal, so not to be trusted as the content of this entry
+        logger.debug(f'{path} is older than the journal entry at {timestamp}')
+        return None
+
+    def _read(self, path: str) -> Any:
+        with open(path, 'rb') as h:
+            st = fstat(h.fileno())
+            key = (st.st_mtime_ns, st.st_size)
+            with self._lock:
+                current = self._current.get(path)
+
+            if current and current[:2] == key:
+                return current[2]
+
+            data = h.read()
+
+        if len(data) != st.st_size:
+            raise ValueError(f'{path} changed while being read')
+
+        content = freeze(edmc_json.loads(data))
+        with self._lock:
+            current = self._current.get(path)
+            if current and current[:2] == key:
+                return current[2]  # Another thread got there first, so share its copy
+
+            self._current[path] = (*key, content)
+            if isinstance(content, Mapping) and content.get('timestamp'):
+                versions = self._versions.setdefault(path, OrderedDict())
+                versions[content['timestamp']] = content
+                versions.move_to_end(content['timestamp'])
+                while len(versions) > self.HISTORY:
+                    versions.popitem(last=False)
+
+        return content
+
+
 # Journal handler
 class EDLogs(FileSystemEventHandler):  # type: ignore # See below
     # Magic with FileSystemEventHandler can confuse type checkers when they do not have access to every import
@@ -57,17 +387,49 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
     _RE_CANONICALISE = re.compile(r'\$(.+)_name;')
     _RE_CATEGORY = re.compile(r'\$MICRORESOURCE_CATEGORY_(.+);')
     _RE_LOGFILE = re.compile(r'^Journal(Beta)?\.[0-9]{12}\.[0-9]{2}\.log$')
-
-    def __init__(self):
+    _RE_UNSAFE = re.compile(r'[^\w.-]')  # Characters not to use in a file name
+    _SIDE_FILE_EVENTS = {'Market', 'Outfitting', 'Shipyard'}  # Whose content the game writes to e.g. Market.json
+    _started: Dict[Optional[str], 'EDLogs'] = {}  # The journal monitors that have been started, by source
+
+    # Where we remember how far through the current journal we got, so startup needn't re-parse all of it
+    _CHECKPOINT = 'journal_checkpoint.json'
+    _CHECKPOINT_VERSION = 1
+    _CHECKPOINT_INTERVAL = 10  # Minimum time between checkpoints while tailing [s]
+    # Journal context that is saved to the checkpoint and published alongside each entry
+    _CONTEXT_FIELDS = (
+        'version', 'is_beta', 'mode', 'group', 'cmdr', 'planet', 'system', 'station', 'station_marketid',
+        'stationtype', 'stationservices', 'coordinates', 'systemaddress', 'systempopulation', 'started', 'live',
+    )
+
+    def __init__(self, journal_dir: Optional[str] = None, source: Optional[str] = None):
+        """
+        Set up, but don't yet monitor, a journal directory.
+
+        :param journal_dir: The journal directory, else the one in the settings or the game's default.
+        :param source: A name for this journal directory, passed to plugins as `state['Source']`.  None for the app's
+            own journal directory.
+        """
         # TODO(A_D): A bunch of these should be switched to default values (eg '' for strings) and no longer be Optional
         FileSystemEventHandler.__init__(self)  # futureproofing - not need for current version of watchdog
         self.root = None
+        self.journal_dir = journal_dir
+        self.source = source
         self.currentdir: Optional[str] = None		# The actual logdir that we're monitoring
         self.logfile: Optional[str] = None
         self.observer = None
         self.observed = None		# a watchdog ObservedWatch, or None if polling
         self.thread: Optional[threading.Thread] = None
-        self.event_queue = []		# For communicating journal entries back to main thread
+        self.scheduler: Optional['JournalScheduler'] = None  # Tails this journal, on a thread shared with others
+        # Set by watchdog callbacks to wake the worker as soon as the journal changes
+        self.journal_changed = threading.Event()
+        # Set while a <<JournalEvent>> is outstanding, so that a burst of entries generates only one
+        self.notify_pending = threading.Event()
+        # Optional index of journal events, written by the worker thread
+        self.index: Optional[journal_index.JournalIndex] = None
+        # For communicating parsed journal entries, and the context as of each entry, back to main thread
+        self.event_queue: JournalQueue[Tuple[Mapping[str, Any], Mapping[str, Any]]] = JournalQueue(
+            config.getint('journal_queue_highwater') or JournalQueue.HIGHWATER
+        )
 
         # On startup we might be:
         # 1) Looking at an old journal file because the game isn't running or the user has exited to the main menu.
@@ -90,13 +452,16 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
         self.station: Optional[str] = None
         self.station_marketid: Optional[int] = None
         self.stationtype: Optional[str] = None
+        self.stationservices: Optional[list] = None
         self.coordinates: Optional[Tuple[int, int, int]] = None
         self.systemaddress: Optional[int] = None
+        self.systempopulation: Optional[int] = None
         self.started: Optional[int] = None  # Timestamp of the LoadGame event
 
         # Cmdr state shared with EDSM and plugins
         # If you change anything here update PLUGINS.md documentation!
         self.state = {
+            'Source':       source,  # Name of the journal directory
             'Captain':      None,  # On a crew
             'Cargo':        defaultdict(int),
             'Credits':      None,
@@ -122,9 +487,37 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
             'Modules':      None,
         }
 
+        # Changes to the Cmdr state from elsewhere, e.g. the cAPI, for the worker thread to apply. See update_state().
+        self._state_updates: Deque[Tuple[str, Mapping[str, Any], Mapping[str, Any]]] = deque()
+
+        # Read-only copy of the state as of the entry most recently parsed, shared by all the snapshots it's valid for
+        self.state_snapshot = FrozenState({}, 0)
+        self.state_changed = True  # The state may differ from state_snapshot. Set this after changing the state.
+
+        # The journal context as of the entry most recently returned by get_entry().
+        # The worker thread carries on parsing ahead of the main thread, so the main thread should use this rather
+        # than the attributes above when handling an entry.
+        self.snapshot: Mapping[str, Any] = self._snapshot()
+
+        # Where the worker thread has got to in the journal
+        self._tailed: Optional[str] = None  # The journal file being read
+        self._loghandle: Optional[BinaryIO] = None
+        self._log_pos = 0
+        self._header: Optional[bytes] = None  # First line of the journal file being read, once it's been read
+        self._checkpointed: Tuple[Optional[str], int] = (None, 0)  # Journal file and offset last checkpointed
+        self._checkpoint_due = 0.0  # When to next checkpoint the worker's progress [monotonic s]
+        self._emitter = None  # The watchdog emitter for currentdir, or None if polling
+        self._notified = False  # Whether to rely on watchdog notifications rather than always re-reading the journal
+        self._reread = True  # Whether to re-read the journal even without a notification
+
+        # Where we remember how far through the current journal we got. One per journal directory.
+        self.checkpoint = self._CHECKPOINT if source is None else \
+            f'journal_checkpoint.{self._RE_UNSAFE.sub("_", source)}.json'
+
     def start(self, root: 'tkinter.Tk'):
         self.root = root
-        journal_dir = config.get('journaldir') or config.default_journal_dir
+        EDLogs._started[self.source] = self
+        journal_dir = self.journal_dir or config.get('journaldir') or config.default_journal_dir
 
         if journal_dir is None:
             journal_dir = ''
@@ -141,6 +534,7 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
             self.stop()
 
         self.currentdir = logdir
+        self.index = journal_index.index if config.getint('journal_index') else None
 
         # Latest pre-existing logfile - e.g. if E:D is already running. Assumes logs sort alphabetically.
         # Do this before setting up the observer in case the journal directory has gone away
@@ -158,10 +552,22 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
 
         # Set up a watchdog observer.
         # File system events are unreliable/non-existent over network drives on Linux.
-        # We can't easily tell whether a path points to a network drive, so assume
-        # any non-standard logdir might be on a network drive and poll instead.
-        polling = bool(config.get('journaldir')) and platform != 'win32'
-        if not polling and not self.observer:
+        # On Linux statfs tells us whether the logdir is on a network drive. Elsewhere we can't easily tell, so
+        # assume any non-standard logdir might be on a network drive and poll instead.
+        if platform == 'linux':
+            polling = is_network_mount(logdir)
+
+        else:
+            polling = bool(self.journal_dir or config.get('journaldir')) and platform != 'win32'
+
+        if self.scheduler:
+            if polling and self.observed:
+                self.observer.unschedule(self.observed)
+                self.observed = None
+
+            self.observer = None if polling else self.scheduler.observer()
+
+        elif not polling and not self.observer:
             self.observer = Observer()
             self.observer.daemon = True
             self.observer.start()
@@ -177,7 +583,10 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
             print('{} Journal {!r}'.format('Polling' if polling else 'Monitoring', self.currentdir))
             print('Start logfile {!r}'.format(self.logfile))
 
-        if not self.running():
+        if self.scheduler:
+            self.scheduler.tail(self)
+
+        elif not self.running():
             self.thread = threading.Thread(target=self.worker, name='Journal worker')
             self.thread.daemon = True
             self.thread.start()
@@ -188,6 +597,12 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
         if __debug__:
             print('Stopping monitoring Journal')
 
+        thread = self.thread
+        self.thread = None  # Orphan the worker thread - will terminate at next poll
+        self._wake()  # ... which is now
+        if thread and thread is not threading.current_thread():
+            thread.join(self._POLL)  # Let it checkpoint its progress before the context is cleared below
+
         self.currentdir = None
         self.version = None
         self.mode = None
@@ -203,16 +618,20 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
         self.systemaddress = None
         self.is_beta = False
         if self.observed:
+            self.observer.unschedule(self.observed)
             self.observed = None
-            self.observer.unschedule_all()
-
-        self.thread = None  # Orphan the worker thread - will terminate at next poll
 
     def close(self):
         self.stop()
+        if self.scheduler:
+            self.observer = None  # Shared - the scheduler stops it
+
         if self.observer:
             self.observer.stop()
 
+        if self.index:
+            self.index.close()
+
         if self.observer:
             self.observer.join()
             self.observer = None
@@ -225,31 +644,53 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
         if not event.is_directory and self._RE_LOGFILE.search(basename(event.src_path)):
 
             self.logfile = event.src_path
+            self._wake()
+
+    def on_modified(self, event):
+        # watchdog callback, e.g. new journal entries written.
+        if not event.is_directory and self._RE_LOGFILE.search(basename(event.src_path)):
+            self._wake()
+
+    def _wake(self) -> None:
+        """Wake whichever thread is tailing this journal."""
+        self.journal_changed.set()
+        if self.scheduler:
+            self.scheduler.wake.set()
 
     def worker(self):
         # Tk isn't thread-safe in general.
         # event_generate() is the only safe way to poke the main thread from this thread:
         # https://mail.python.org/pipermail/tkinter-discuss/2013-November/003522.html
+        self._tail_open()
+        while True:
+            self._tail()
 
-        # Seek to the end of the latest log file
-        logfile = self.logfile
-        if logfile:
-            loghandle = open(logfile, 'rb', 0)  # unbuffered
-            if platform == 'darwin':
-                fcntl(loghandle, F_GLOBAL_NOCACHE, -1)  # required to avoid corruption on macOS over SMB
+            if self.event_queue.full():
+                self.event_queue.wait_for_space(self._POLL)
 
-            for line in loghandle:
-                try:
-                    self.parse_entry(line)  # Some events are of interest even in the past
+            else:
+                self.journal_changed.wait(self._POLL)
 
-                except Exception:
-                    if __debug__:
-                        print('Invalid journal entry {!r}'.format(line))
+            # Check whether we're still supposed to be running
+            if threading.current_thread() != self.thread:
+                self._tail_close()
+                return  # Terminate
+
+            self._check_game()
+
+    def _tail_open(self) -> None:
+        """Start tailing the latest journal file, catching up with what's already in it.  On the worker thread."""
+        # Seek to the end of the latest log file
+        self._tailed = self.logfile
+        if self._tailed:
+            self._loghandle = open(self._tailed, 'rb', 0)  # unbuffered
+            if platform == 'darwin':
+                fcntl(self._loghandle, F_GLOBAL_NOCACHE, -1)  # required to avoid corruption on macOS over SMB
 
-            log_pos = loghandle.tell()
+            self._log_pos = self.catch_up(self._loghandle)  # Some events are of interest even in the past
 
         else:
-            loghandle = None
+            self._loghandle = None
 
         self.game_was_running = self.game_running()
 
@@ -275,508 +716,389 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
                     entry['StationType'] = self.stationtype
                     entry['MarketID'] = self.station_marketid
 
-                self.event_queue.append(json.dumps(entry, separators=(', ', ':')))
+                self._publish(entry)
 
             else:
                 # Generate null event to update the display (with possibly out-of-date info)
-                self.event_queue.append(None)
                 self.live = False
+                self._publish(self.parse_entry(None))
 
         # Watchdog thread -- there is a way to get this by using self.observer.emitters and checking for an attribute:
         # watch, but that may have unforseen differences in behaviour.
-        emitter = self.observed and self.observer._emitter_for_watch[self.observed]  # Note: Uses undocumented attribute
+        # Note: Uses undocumented attribute
+        self._emitter = self.observed and self.observer._emitter_for_watch[self.observed]
 
-        while True:
+        # inotify reliably reports every write, so there's no need to touch the journal until it does.
+        # Other platforms' notifications can lag for files that are held open, so always re-read those.
+        self._notified = platform == 'linux' and bool(self._emitter)
+        self._reread = True
 
-            # Check whether new log file started, e.g. client (re)started.
-            if emitter and emitter.is_alive():
-                newlogfile = self.logfile  # updated by on_created watchdog callback
-            else:
-                # Poll
-                try:
-                    logfiles = sorted(
-                        (x for x in listdir(self.currentdir) if self._RE_LOGFILE.search(x)),
-                        key=lambda x: x.split('.')[1:]
-                    )
+    def _tail_close(self, save: bool = True) -> None:
+        """
+        Stop tailing the journal file.  On the worker thread.
 
-                    newlogfile = join(self.currentdir, logfiles[-1]) if logfiles else None  # type: ignore
+        :param save: Checkpoint how far we got, unless stopped.
+        """
+        if save and self.currentdir:  # Else stop() may be clearing the context
+            self._save_progress(force=True)
 
-                except Exception:
-                    if __debug__:
-                        print_exc()
+        if self._loghandle:
+            self._loghandle.close()
+            self._loghandle = None
 
-                    newlogfile = None
+        self._header = None
 
-            if logfile != newlogfile:
-                logfile = newlogfile
-                if loghandle:
-                    loghandle.close()
+    def _save_progress(self, force: bool = False) -> None:
+        """
+        Checkpoint how far the worker has got through the journal file, if it has moved on since last time.
 
-                if logfile:
-                    loghandle = open(logfile, 'rb', 0)  # unbuffered
-                    if platform == 'darwin':
-                        fcntl(loghandle, F_GLOBAL_NOCACHE, -1)  # required to avoid corruption on macOS over SMB
+        On the worker thread.  At most every `_CHECKPOINT_INTERVAL` seconds, unless forced.
 
-                    log_pos = 0
+        :param force: Save now, e.g. when switching journal files.
+        """
+        progress = (self._tailed, self._log_pos)
+        if not (self._tailed and self._header) or progress == self._checkpointed:
+            return
 
-                if __debug__:
-                    print('New logfile {!r}'.format(logfile))
+        now = monotonic()
+        if force or now >= self._checkpoint_due:
+            self.save_checkpoint(self._tailed, self._header, self._log_pos)
+            self._checkpointed = progress
+            self._checkpoint_due = now + self._CHECKPOINT_INTERVAL
+
+    def _tail(self) -> None:
+        """Read and publish any new journal entries, switching to any new journal file.  On the worker thread."""
+        changed = self._reread or self.journal_changed.is_set()
+        self.journal_changed.clear()
+        self._apply_state_updates()
+        emitter = self._emitter
+
+        # Check whether new log file started, e.g. client (re)started.
+        if emitter and emitter.is_alive():
+            newlogfile = self.logfile  # updated by on_created watchdog callback
+        else:
+            # Poll
+            try:
+                logfiles = sorted(
+                    (x for x in listdir(self.currentdir) if self._RE_LOGFILE.search(x)),
+                    key=lambda x: x.split('.')[1:]
+                )
 
-            if logfile:
-                loghandle.seek(0, SEEK_END)		  # required to make macOS notice log change over SMB
-                loghandle.seek(log_pos, SEEK_SET)  # reset EOF flag # TODO: log_pos reported as possibly unbound
-                for line in loghandle:
-                    self.event_queue.append(line)
+                newlogfile = join(self.currentdir, logfiles[-1]) if logfiles else None  # type: ignore
 
-                if self.event_queue:
-                    self.root.event_generate('<<JournalEvent>>', when="tail")
+            except Exception:
+                if __debug__:
+                    print_exc()
 
-                log_pos = loghandle.tell()
+                newlogfile = None
 
-            sleep(self._POLL)
+        if self._tailed != newlogfile:
+            self._tail_close()
+            self._tailed = newlogfile
+            self._checkpoint_due = 0  # Checkpoint the new file as soon as there's something to resume from
+            if self._tailed:
+                self._loghandle = open(self._tailed, 'rb', 0)  # unbuffered
+                if platform == 'darwin':
+                    fcntl(self._loghandle, F_GLOBAL_NOCACHE, -1)  # required to avoid corruption on macOS over SMB
 
-            # Check whether we're still supposed to be running
-            if threading.current_thread() != self.thread:
-                return  # Terminate
+                self._log_pos = 0
 
-            if self.game_was_running:
-                if not self.game_running():
-                    self.event_queue.append(
-                        '{{ "timestamp":"{}", "event":"ShutDown" }}'.format(strftime('%Y-%m-%dT%H:%M:%SZ', gmtime()))
-                    )
+            if __debug__:
+                print('New logfile {!r}'.format(self._tailed))
+
+        loghandle = self._loghandle
+        if loghandle and (changed or not self._notified or not emitter.is_alive()):
+            loghandle.seek(0, SEEK_END)		  # required to make macOS notice log change over SMB
+            lines, _ = self._read_lines(loghandle, self._log_pos)
+            for line in lines:
+                if self.event_queue.full():
+                    # Leave the rest in the journal until the main thread has caught up
+                    logger.debug(f'Journal queue full: {self.event_queue.stats()}')
+                    break
+
+                if not self._log_pos:
+                    self._header = line
+
+                entry = self._parse_and_publish(line)
+                if self.index and entry['event']:
+                    self.index.add(basename(self._tailed), self._log_pos, entry, self.cmdr)
+
+                self._log_pos += len(line)
+
+            if self.index:
+                self.index.commit()
+
+            if self.event_queue:
+                self._notify()
+
+        self._save_progress()  # Also catches up with progress that was too soon after the last checkpoint to save
+        self._reread = self.event_queue.full()  # Pick up the lines left in the journal once there's space
+
+    def _apply_state_updates(self) -> None:
+        """Apply the changes queued by update_state(), unless the Cmdr has changed since.  On the worker thread."""
+        while self._state_updates:
+            cmdr, changes, defaults = self._state_updates.popleft()
+            if cmdr != self.cmdr:
+                logger.debug(f'Discarding state update for {cmdr!r}, now {self.cmdr!r}')
+                continue
+
+            self.state.update(changes)
+            self.state.update({k: v for k, v in defaults.items() if self.state.get(k) is None})
+            self.state_changed = True
+
+    def _check_game(self) -> None:
+        """Publish a 'ShutDown' event if the game has stopped running.  On the worker thread."""
+        if self.game_was_running:
+            if not self.game_running():
+                self._publish_shutdown()
+                self._notify()
+                self.game_was_running = False
 
-                    self.root.event_generate('<<JournalEvent>>', when="tail")
-                    self.game_was_running = False
+        else:
+            self.game_was_running = self.game_running()
+
+    def catch_up(self, loghandle: BinaryIO) -> int:
+        """
+        Parse a journal file from the start up to its current end.
+
+        If the checkpoint from a previous run matches this file then the saved context is restored and only the
+        lines written since are parsed.  A new checkpoint is saved afterwards, and again by the worker thread as it
+        tails the file.
+
+        :param loghandle: The journal file, opened in binary mode.
+        :return: The offset of the end of the last complete line parsed.
+        """
+        loghandle.seek(0, SEEK_SET)
+        header = loghandle.readline()
+        log_pos = self.restore_checkpoint(loghandle.name, header, fstat(loghandle.fileno()).st_size)
+        lines, _ = self._read_lines(loghandle, log_pos)
+        for line in lines:
+            try:
+                entry = self.parse_entry(line)
+                if self.index and entry['event']:
+                    self.index.add(basename(loghandle.name), log_pos, entry, self.cmdr)
+
+            except Exception:
+                if __debug__:
+                    print('Invalid journal entry {!r}'.format(line))
+
+            log_pos += len(line)
+
+        if self.index:
+            self.index.commit()
+
+        self.save_checkpoint(loghandle.name, header, log_pos)
+        self._header = header if log_pos else None
+        self._checkpointed = (loghandle.name, log_pos)
+        self._checkpoint_due = monotonic() + self._CHECKPOINT_INTERVAL
+        self.snapshot = self._snapshot()
+        return log_pos
+
+    @staticmethod
+    def _read_lines(loghandle: BinaryIO, log_pos: int) -> Tuple[List[bytes], int]:
+        """
+        Read the complete lines written to a journal file since the given offset.
+
+        Any partially written last line is left to be read next time.
+
+        :param loghandle: The journal file, opened in binary mode.
+        :param log_pos: Offset to read from.
+        :return: The lines read, including their line endings, and the offset to read from next time.
+        """
+        loghandle.seek(log_pos, SEEK_SET)  # also resets EOF flag
+        data = loghandle.read()
+        end = data.rfind(b'\n') + 1
+        return data[:end].splitlines(keepends=True), log_pos + end
+
+    def _snapshot(self) -> Mapping[str, Any]:
+        """
+        Return a read-only copy of the journal context, for handing to the main thread and plugins.
+
+        The Cmdr state is only copied if it has changed since the last snapshot, and then only the parts that changed.
+        """
+        if self.state_changed and self.state_snapshot != self.state:
+            self.state_snapshot = FrozenState(
+                {k: freeze(v, self.state_snapshot.get(k)) for k, v in self.state.items()},
+                self.state_snapshot.version + 1
+            )
+
+        self.state_changed = False
+
+        snapshot = {field: getattr(self, field) for field in self._CONTEXT_FIELDS}
+        snapshot['state'] = self.state_snapshot
+        return MappingProxyType(snapshot)
+
+    def _publish(self, entry: Mapping[str, Any]) -> None:
+        """Queue a parsed entry, along with the current journal context, for the main thread."""
+        self.event_queue.put((entry, self._snapshot()))
+
+    def _publish_shutdown(self) -> None:
+        self._publish(OrderedDict([
+            ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
+            ('event', 'ShutDown'),
+        ]))
+
+    def _notify(self) -> None:
+        """Wake the main thread to consume the event queue, unless it has yet to act on a previous wakeup."""
+        if not self.notify_pending.is_set():
+            self.notify_pending.set()
+            self.root.event_generate('<<JournalEvent>>', when="tail")
+
+    def _parse_and_publish(self, line: bytes) -> MutableMapping[str, Any]:
+        """
+        Parse a new journal line and queue the resulting entry for the main thread.
+
+        Called from the worker thread.  Also synthesises 'StartUp' and 'ShutDown' events where the game's running
+        state has to be inferred from the journal.
+
+        :param line: A line read from the journal.
+        :return: The entry as parsed from the journal.
+        """
+        entry = self.parse_entry(line)
+        if entry['event'] in self._SIDE_FILE_EVENTS:
+            try:
+                self.side_file(entry)  # Read it now, before the game replaces it, for whatever wants it later
+
+            except Exception:
+                logger.debug(f'Failed reading {entry["event"]}.json', exc_info=True)
+
+        if not self.live and entry['event'] not in (None, 'Fileheader'):
+            # Game not running locally, but Journal has been updated
+            self.live = True
+            if self.station:
+                startup = OrderedDict([
+                    ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
+                    ('event', 'StartUp'),
+                    ('Docked', True),
+                    ('MarketID', self.station_marketid),
+                    ('StationName', self.station),
+                    ('StationType', self.stationtype),
+                    ('StarSystem', self.system),
+                    ('StarPos', self.coordinates),
+                    ('SystemAddress', self.systemaddress),
+                ])
 
             else:
-                self.game_was_running = self.game_running()
+                startup = OrderedDict([
+                    ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
+                    ('event', 'StartUp'),
+                    ('Docked', False),
+                    ('StarSystem', self.system),
+                    ('StarPos', self.coordinates),
+                    ('SystemAddress', self.systemaddress),
+                ])
+
+            self._publish(startup)
+
+        elif self.live and entry['event'] == 'Music' and entry.get('MusicTrack') == 'MainMenu':
+            self._publish(entry)
+            self._publish_shutdown()
+
+        else:
+            self._publish(entry)
+
+        return entry
+
+    def restore_checkpoint(self, logfile: str, header: bytes, size: int) -> int:
+        """
+        Restore the journal context saved by save_checkpoint(), if it is still valid for this journal file.
+
+        The checkpoint is ignored if it is for a different file, if the file's Fileheader line has changed or if the
+        file is now shorter than the saved offset.
+
+        :param logfile: Path of the journal file about to be parsed.
+        :param header: The first line of the journal file.
+        :param size: The current size of the journal file.
+        :return: The offset to resume parsing from, or 0 to parse the whole file.
+        """
+        try:
+            with open(join(config.app_dir, self.checkpoint), 'rb') as h:
+                checkpoint: Dict[str, Any] = edmc_json.load(h)
+
+            if (
+                checkpoint['checkpoint'] != self._CHECKPOINT_VERSION or
+                checkpoint['logfile'] != logfile or
+                checkpoint['header'] != header.decode('utf-8', errors='replace') or
+                not 0 < checkpoint['offset'] <= size
+            ):
+                return 0
+
+            context = checkpoint['context']
+            for field in self._CONTEXT_FIELDS:
+                setattr(self, field, context[field])
+
+            if self.coordinates is not None:
+                self.coordinates = tuple(self.coordinates)
+
+            self.state = self._thaw_state(checkpoint['state'])
+            self.state['Source'] = self.source
+            self.state_changed = True
+
+        except FileNotFoundError:
+            return 0
+
+        except Exception:
+            logger.exception('Ignoring unusable journal checkpoint')
+            return 0
+
+        logger.debug(f'Resuming {logfile!r} from offset {checkpoint["offset"]}')
+        return checkpoint['offset']
+
+    def save_checkpoint(self, logfile: str, header: bytes, log_pos: int) -> None:
+        """
+        Save the current journal context and how far through the journal file it reflects.
+
+        :param logfile: Path of the journal file that has been parsed.
+        :param header: The first line of the journal file.
+        :param log_pos: Offset of the end of the last parsed line.
+        """
+        checkpoint = {
+            'checkpoint': self._CHECKPOINT_VERSION,
+            'logfile':    logfile,
+            'header':     header.decode('utf-8', errors='replace'),
+            'offset':     log_pos,
+            'context':    {field: getattr(self, field) for field in self._CONTEXT_FIELDS},
+            'state':      dict(self.state, Friends=sorted(self.state['Friends'])),
+        }
+
+        filename = join(config.app_dir, self.checkpoint)
+        try:
+            # Write then rename so a crash can't leave a truncated checkpoint behind
+            with open(f'{filename}.tmp', 'wb') as h:
+                h.write(edmc_json.dumpb(checkpoint))
+
+            replace(f'{filename}.tmp', filename)
+
+        except Exception:
+            logger.exception('Failed saving journal checkpoint')
+
+    @staticmethod
+    def _thaw_state(saved: Dict[str, Any]) -> Dict[str, Any]:
+        """Recreate the types in the Cmdr state that JSON doesn't preserve."""
+        state = dict(saved)
+        for category in ('Cargo', 'Raw', 'Manufactured', 'Encoded'):
+            state[category] = defaultdict(int, saved[category])
+
+        state['Friends'] = set(saved['Friends'])
+        state['Rank'] = {k: tuple(v) for k, v in saved['Rank'].items()}
+        state['Engineers'] = {k: tuple(v) if isinstance(v, list) else v for k, v in saved['Engineers'].items()}
+        return state
 
     def parse_entry(self, line: str):
-        # TODO(A_D): a bunch of these can be simplified to use if itertools.product and filters
         if line is None:
             return {'event': None}  # Fake startup event
 
         try:
-            # Preserve property order because why not?
-            entry: OrderedDictT[str, Any] = json.loads(line, object_pairs_hook=OrderedDict)
+            entry: Dict[str, Any] = edmc_json.loads(line)
             entry['timestamp']  # we expect this to exist # TODO: replace with assert? or an if key in check
 
-            event_type = entry['event']
-            if event_type == 'Fileheader':
-                self.live = False
-                self.version = entry['gameversion']
-                self.is_beta = 'beta' in entry['gameversion'].lower()
-                self.cmdr = None
-                self.mode = None
-                self.group = None
-                self.planet = None
-                self.system = None
-                self.station = None
-                self.station_marketid = None
-                self.stationtype = None
-                self.stationservices = None
-                self.coordinates = None
-                self.systemaddress = None
-                self.started = None
-                self.state = {
-                    'Captain':      None,
-                    'Cargo':        defaultdict(int),
-                    'Credits':      None,
-                    'FID':          None,
-                    'Horizons':     None,
-                    'Loan':         None,
-                    'Raw':          defaultdict(int),
-                    'Manufactured': defaultdict(int),
-                    'Encoded':      defaultdict(int),
-                    'Engineers':    {},
-                    'Rank':         {},
-                    'Reputation':   {},
-                    'Statistics':   {},
-                    'Role':         None,
-                    'Friends':      set(),
-                    'ShipID':       None,
-                    'ShipIdent':    None,
-                    'ShipName':     None,
-                    'ShipType':     None,
-                    'HullValue':    None,
-                    'ModulesValue': None,
-                    'Rebuy':        None,
-                    'Modules':      None,
-                }
-
-            elif event_type == 'Commander':
-                self.live = True  # First event in 3.0
-
-            elif event_type == 'LoadGame':
-                self.cmdr = entry['Commander']
-                # 'Open', 'Solo', 'Group', or None for CQC (and Training - but no LoadGame event)
-                self.mode = entry.get('GameMode')
-                self.group = entry.get('Group')
-                self.planet = None
-                self.system = None
-                self.station = None
-                self.station_marketid = None
-                self.stationtype = None
-                self.stationservices = None
-                self.coordinates = None
-                self.systemaddress = None
-                self.started = timegm(strptime(entry['timestamp'], '%Y-%m-%dT%H:%M:%SZ'))
-                # Don't set Ship, ShipID etc since this will reflect Fighter or SRV if starting in those
-                self.state.update({
-                    'Captain':    None,
-                    'Credits':    entry['Credits'],
-                    'FID':        entry.get('FID'),   # From 3.3
-                    'Horizons':   entry['Horizons'],  # From 3.0
-                    'Loan':       entry['Loan'],
-                    'Engineers':  {},
-                    'Rank':       {},
-                    'Reputation': {},
-                    'Statistics': {},
-                    'Role':       None,
-                })
-
-            elif event_type == 'NewCommander':
-                self.cmdr = entry['Name']
-                self.group = None
-
-            elif event_type == 'SetUserShipName':
-                self.state['ShipID'] = entry['ShipID']
-                if 'UserShipId' in entry:  # Only present when changing the ship's ident
-                    self.state['ShipIdent'] = entry['UserShipId']
-
-                self.state['ShipName'] = entry.get('UserShipName')
-                self.state['ShipType'] = self.canonicalise(entry['Ship'])
-
-            elif event_type == 'ShipyardBuy':
-                self.state['ShipID'] = None
-                self.state['ShipIdent'] = None
-                self.state['ShipName'] = None
-                self.state['ShipType'] = self.canonicalise(entry['ShipType'])
-                self.state['HullValue'] = None
-                self.state['ModulesValue'] = None
-                self.state['Rebuy'] = None
-                self.state['Modules'] = None
-
-            elif event_type == 'ShipyardSwap':
-                self.state['ShipID'] = entry['ShipID']
-                self.state['ShipIdent'] = None
-                self.state['ShipName'] = None
-                self.state['ShipType'] = self.canonicalise(entry['ShipType'])
-                self.state['HullValue'] = None
-                self.state['ModulesValue'] = None
-                self.state['Rebuy'] = None
-                self.state['Modules'] = None
-
-            elif (event_type == 'Loadout' and
-                  'fighter' not in self.canonicalise(entry['Ship']) and
-                  'buggy' not in self.canonicalise(entry['Ship'])):
-                self.state['ShipID'] = entry['ShipID']
-                self.state['ShipIdent'] = entry['ShipIdent']
-
-                # Newly purchased ships can show a ShipName of "" initially,
-                # and " " after a game restart/relog.
-                # Players *can* also purposefully set " " as the name, but anyone
-                # doing that gets to live with EDMC showing ShipType instead.
-                if entry['ShipName'] and entry['ShipName'] not in ('', ' '):
-                    self.state['ShipName']  = entry['ShipName']
-
-                self.state['ShipType'] = self.canonicalise(entry['Ship'])
-                self.state['HullValue'] = entry.get('HullValue')  # not present on exiting Outfitting
-                self.state['ModulesValue'] = entry.get('ModulesValue')  #   "
-                self.state['Rebuy'] = entry.get('Rebuy')
-                # Remove spurious differences between initial Loadout event and subsequent
-                self.state['Modules'] = {}
-                for module in entry['Modules']:
-                    module = dict(module)
-                    module['Item'] = self.canonicalise(module['Item'])
-                    if ('Hardpoint' in module['Slot'] and
-                        not module['Slot'].startswith('TinyHardpoint') and
-                            module.get('AmmoInClip') == module.get('AmmoInHopper') == 1):  # lasers
-                        module.pop('AmmoInClip')
-                        module.pop('AmmoInHopper')
-
-                    self.state['Modules'][module['Slot']] = module
-
-            elif event_type == 'ModuleBuy':
-                self.state['Modules'][entry['Slot']] = {
-                    'Slot':     entry['Slot'],
-                    'Item':     self.canonicalise(entry['BuyItem']),
-                    'On':       True,
-                    'Priority': 1,
-                    'Health':   1.0,
-                    'Value':    entry['BuyPrice'],
-                }
-
-            elif event_type == 'ModuleSell':
-                self.state['Modules'].pop(entry['Slot'], None)
-
-            elif event_type == 'ModuleSwap':
-                to_item = self.state['Modules'].get(entry['ToSlot'])
-                to_slot = entry['ToSlot']
-                from_slot = entry['FromSlot']
-                modules = self.state['Modules']
-                modules[to_slot] = modules[from_slot]
-                if to_item:
-                    modules[from_slot] = to_item
-
-                else:
-                    modules.pop(from_slot, None)
-
-            elif event_type == 'Undocked':
-                self.station = None
-                self.station_marketid = None
-                self.stationtype = None
-                self.stationservices = None
-
-            elif event_type in ('Location', 'FSDJump', 'Docked', 'CarrierJump'):
-                if event_type in ('Location', 'CarrierJump'):
-                    self.planet = entry.get('Body') if entry.get('BodyType') == 'Planet' else None
-
-                elif event_type == 'FSDJump':
-                    self.planet = None
-
-                if 'StarPos' in entry:
-                    self.coordinates = tuple(entry['StarPos'])
-
-                elif self.system != entry['StarSystem']:
-                    self.coordinates = None  # Docked event doesn't include coordinates
-
-                self.systemaddress = entry.get('SystemAddress')
-
-                if event_type in ('Location', 'FSDJump', 'CarrierJump'):
-                    self.systempopulation = entry.get('Population')
-
-                self.system = 'CQC' if entry['StarSystem'] == 'ProvingGround' else entry['StarSystem']
-                self.station = entry.get('StationName')  # May be None
-                self.station_marketid = entry.get('MarketID')  # May be None
-                self.stationtype = entry.get('StationType')  # May be None
-                self.stationservices = entry.get('StationServices')  # None under E:D < 2.4
-
-            elif event_type == 'ApproachBody':
-                self.planet = entry['Body']
-
-            elif event_type in ('LeaveBody', 'SupercruiseEntry'):
-                self.planet = None
-
-            elif event_type in ('Rank', 'Promotion'):
-                payload = dict(entry)
-                payload.pop('event')
-                payload.pop('timestamp')
-
-                self.state['Rank'].update({k: (v, 0) for k, v in payload.items()})
-
-            elif event_type == 'Progress':
-                rank = self.state['Rank']
-                for k, v in entry.items():
-                    if k in rank:
-                        # perhaps not taken promotion mission yet
-                        rank[k] = (rank[k][0], min(v, 100))
-
-            elif event_type in ('Reputation', 'Statistics'):
-                payload = OrderedDict(entry)
-                payload.pop('event')
-                payload.pop('timestamp')
-                self.state[event_type] = payload
-
-            elif event_type == 'EngineerProgress':
-                engineers = self.state['Engineers']
-                if 'Engineers' in entry:  # Startup summary
-                    self.state['Engineers'] = {
-                        e['Engineer']: ((e['Rank'], e.get('RankProgress', 0)) if 'Rank' in e else e['Progress'])
-                        for e in entry['Engineers']
-                    }
-
-                else:  # Promotion
-                    engineer = entry['Engineer']
-                    if 'Rank' in entry:
-                        engineers[engineer] = (entry['Rank'], entry.get('RankProgress', 0))
-
-                    else:
-                        engineers[engineer] = entry['Progress']
-
-            elif event_type == 'Cargo' and entry.get('Vessel') == 'Ship':
-                self.state['Cargo'] = defaultdict(int)
-                # From 3.3 full Cargo event (after the first one) is written to a separate file
-                if 'Inventory' not in entry:
-                    with open(join(self.currentdir, 'Cargo.json'), 'rb') as h:  # type: ignore
-                        entry = json.load(h, object_pairs_hook=OrderedDict)  # Preserve property order because why not?
-
-                self.state['Cargo'].update({self.canonicalise(x['Name']): x['Count'] for x in entry['Inventory']})
-
-            elif event_type in ('CollectCargo', 'MarketBuy', 'BuyDrones', 'MiningRefined'):
-                commodity = self.canonicalise(entry['Type'])
-                self.state['Cargo'][commodity] += entry.get('Count', 1)
-
-            elif event_type in ('EjectCargo', 'MarketSell', 'SellDrones'):
-                commodity = self.canonicalise(entry['Type'])
-                cargo = self.state['Cargo']
-                cargo[commodity] -= entry.get('Count', 1)
-                if cargo[commodity] <= 0:
-                    cargo.pop(commodity)
-
-            elif event_type == 'SearchAndRescue':
-                for item in entry.get('Items', []):
-                    commodity = self.canonicalise(item['Name'])
-                    cargo = self.state['Cargo']
-                    cargo[commodity] -= item.get('Count', 1)
-                    if cargo[commodity] <= 0:
-                        cargo.pop(commodity)
-
-            elif event_type == 'Materials':
-                for category in ('Raw', 'Manufactured', 'Encoded'):
-                    self.state[category] = defaultdict(int)
-                    self.state[category].update({
-                        self.canonicalise(x['Name']): x['Count'] for x in entry.get(category, [])
-                    })
-
-            elif event_type == 'MaterialCollected':
-                material = self.canonicalise(entry['Name'])
-                self.state[entry['Category']][material] += entry['Count']
-
-            elif event_type in ('MaterialDiscarded', 'ScientificResearch'):
-                material = self.canonicalise(entry['Name'])
-                state_category = self.state[entry['Category']]
-                state_category[material] -= entry['Count']
-                if state_category[material] <= 0:
-                    state_category.pop(material)
-
-            elif event_type == 'Synthesis':
-                for category in ('Raw', 'Manufactured', 'Encoded'):
-                    for x in entry['Materials']:
-                        material = self.canonicalise(x['Name'])
-                        if material in self.state[category]:
-                            self.state[category][material] -= x['Count']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
-
-            elif event_type == 'MaterialTrade':
-                category = self.category(entry['Paid']['Category'])
-                state_category = self.state[category]
-                paid = entry['Paid']
-                received = entry['Received']
-
-                state_category[paid['Material']] -= paid['Quantity']
-                if state_category[paid['Material']] <= 0:
-                    state_category.pop(paid['Material'])
-
-                category = self.category(received['Category'])
-                state_category[received['Material']] += received['Quantity']
-
-            elif event_type == 'EngineerCraft' or (
-                event_type == 'EngineerLegacyConvert' and not entry.get('IsPreview')
-            ):
-
-                for category in ('Raw', 'Manufactured', 'Encoded'):
-                    for x in entry.get('Ingredients', []):
-                        material = self.canonicalise(x['Name'])
-                        if material in self.state[category]:
-                            self.state[category][material] -= x['Count']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
-
-                module = self.state['Modules'][entry['Slot']]
-                assert(module['Item'] == self.canonicalise(entry['Module']))
-                module['Engineering'] = {
-                    'Engineer':      entry['Engineer'],
-                    'EngineerID':    entry['EngineerID'],
-                    'BlueprintName': entry['BlueprintName'],
-                    'BlueprintID':   entry['BlueprintID'],
-                    'Level':         entry['Level'],
-                    'Quality':       entry['Quality'],
-                    'Modifiers':     entry['Modifiers'],
-                }
-
-                if 'ExperimentalEffect' in entry:
-                    module['Engineering']['ExperimentalEffect'] = entry['ExperimentalEffect']
-                    module['Engineering']['ExperimentalEffect_Localised'] = entry['ExperimentalEffect_Localised']
-
-                else:
-                    module['Engineering'].pop('ExperimentalEffect', None)
-                    module['Engineering'].pop('ExperimentalEffect_Localised', None)
-
-            elif event_type == 'MissionCompleted':
-                for reward in entry.get('CommodityReward', []):
-                    commodity = self.canonicalise(reward['Name'])
-                    self.state['Cargo'][commodity] += reward.get('Count', 1)
-
-                for reward in entry.get('MaterialsReward', []):
-                    if 'Category' in reward:  # Category not present in E:D 3.0
-                        category = self.category(reward['Category'])
-                        material = self.canonicalise(reward['Name'])
-                        self.state[category][material] += reward.get('Count', 1)
-
-            elif event_type == 'EngineerContribution':
-                commodity = self.canonicalise(entry.get('Commodity'))
-                if commodity:
-                    self.state['Cargo'][commodity] -= entry['Quantity']
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
-
-                material = self.canonicalise(entry.get('Material'))
-                if material:
-                    for category in ('Raw', 'Manufactured', 'Encoded'):
-                        if material in self.state[category]:
-                            self.state[category][material] -= entry['Quantity']
-                            if self.state[category][material] <= 0:
-                                self.state[category].pop(material)
-
-            elif event_type == 'TechnologyBroker':
-                for thing in entry.get('Ingredients', []):  # 3.01
-                    for category in ('Cargo', 'Raw', 'Manufactured', 'Encoded'):
-                        item = self.canonicalise(thing['Name'])
-                        if item in self.state[category]:
-                            self.state[category][item] -= thing['Count']
-                            if self.state[category][item] <= 0:
-                                self.state[category].pop(item)
-
-                for thing in entry.get('Commodities', []):  # 3.02
-                    commodity = self.canonicalise(thing['Name'])
-                    self.state['Cargo'][commodity] -= thing['Count']
-                    if self.state['Cargo'][commodity] <= 0:
-                        self.state['Cargo'].pop(commodity)
-
-                for thing in entry.get('Materials', []):  # 3.02
-                    material = self.canonicalise(thing['Name'])
-                    category = thing['Category']
-                    self.state[category][material] -= thing['Count']
-                    if self.state[category][material] <= 0:
-                        self.state[category].pop(material)
-
-            elif event_type == 'JoinACrew':
-                self.state['Captain'] = entry['Captain']
-                self.state['Role'] = 'Idle'
-                self.planet = None
-                self.system = None
-                self.station = None
-                self.station_marketid = None
-                self.stationtype = None
-                self.stationservices = None
-                self.coordinates = None
-                self.systemaddress = None
-
-            elif event_type == 'ChangeCrewRole':
-                self.state['Role'] = entry['Role']
-
-            elif event_type == 'QuitACrew':
-                self.state['Captain'] = None
-                self.state['Role'] = None
-                self.planet = None
-                self.system = None
-                self.station = None
-                self.station_marketid = None
-                self.stationtype = None
-                self.stationservices = None
-                self.coordinates = None
-                self.systemaddress = None
-
-            elif event_type == 'Friends':
-                if entry['Status'] in ('Online', 'Added'):
-                    self.state['Friends'].add(entry['Name'])
-
-                else:
-                    self.state['Friends'].discard(entry['Name'])
+            parser = self._PARSERS.get(entry['event'])
+            if parser:
+                self.state_changed = True
+                entry = parser(self, entry) or entry
 
             return entry
+
         except Exception:
             if __debug__:
                 print('Invalid journal entry {!r}'.format(line))
@@ -784,6 +1106,467 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
 
             return {'event': None}
 
+    @_journal_event('Fileheader')
+    def _parse_fileheader(self, entry: MutableMapping[str, Any]) -> None:
+        self.live = False
+        self.version = entry['gameversion']
+        self.is_beta = 'beta' in entry['gameversion'].lower()
+        self.cmdr = None
+        self.mode = None
+        self.group = None
+        self.planet = None
+        self.system = None
+        self.station = None
+        self.station_marketid = None
+        self.stationtype = None
+        self.stationservices = None
+        self.coordinates = None
+        self.systemaddress = None
+        self.started = None
+        self.state = {
+            'Source':       self.source,
+            'Captain':      None,
+            'Cargo':        defaultdict(int),
+            'Credits':      None,
+            'FID':          None,
+            'Horizons':     None,
+            'Loan':         None,
+            'Raw':          defaultdict(int),
+            'Manufactured': defaultdict(int),
+            'Encoded':      defaultdict(int),
+            'Engineers':    {},
+            'Rank':         {},
+            'Reputation':   {},
+            'Statistics':   {},
+            'Role':         None,
+            'Friends':      set(),
+            'ShipID':       None,
+            'ShipIdent':    None,
+            'ShipName':     None,
+            'ShipType':     None,
+            'HullValue':    None,
+            'ModulesValue': None,
+            'Rebuy':        None,
+            'Modules':      None,
+        }
+
+    @_journal_event('Commander')
+    def _parse_commander(self, entry: MutableMapping[str, Any]) -> None:
+        self.live = True  # First event in 3.0
+
+    @_journal_event('LoadGame')
+    def _parse_loadgame(self, entry: MutableMapping[str, Any]) -> None:
+        self.cmdr = entry['Commander']
+        # 'Open', 'Solo', 'Group', or None for CQC (and Training - but no LoadGame event)
+        self.mode = entry.get('GameMode')
+        self.group = entry.get('Group')
+        self.planet = None
+        self.system = None
+        self.station = None
+        self.station_marketid = None
+        self.stationtype = None
+        self.stationservices = None
+        self.coordinates = None
+        self.systemaddress = None
+        self.started = timegm(strptime(entry['timestamp'], '%Y-%m-%dT%H:%M:%SZ'))
+        # Don't set Ship, ShipID etc since this will reflect Fighter or SRV if starting in those
+        self.state.update({
+            'Captain':    None,
+            'Credits':    entry['Credits'],
+            'FID':        entry.get('FID'),   # From 3.3
+            'Horizons':   entry['Horizons'],  # From 3.0
+            'Loan':       entry['Loan'],
+            'Engineers':  {},
+            'Rank':       {},
+            'Reputation': {},
+            'Statistics': {},
+            'Role':       None,
+        })
+
+    @_journal_event('NewCommander')
+    def _parse_newcommander(self, entry: MutableMapping[str, Any]) -> None:
+        self.cmdr = entry['Name']
+        self.group = None
+
+    @_journal_event('SetUserShipName')
+    def _parse_setusershipname(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['ShipID'] = entry['ShipID']
+        if 'UserShipId' in entry:  # Only present when changing the ship's ident
+            self.state['ShipIdent'] = entry['UserShipId']
+
+        self.state['ShipName'] = entry.get('UserShipName')
+        self.state['ShipType'] = self.canonicalise(entry['Ship'])
+
+    @_journal_event('ShipyardBuy')
+    def _parse_shipyardbuy(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['ShipID'] = None
+        self.state['ShipIdent'] = None
+        self.state['ShipName'] = None
+        self.state['ShipType'] = self.canonicalise(entry['ShipType'])
+        self.state['HullValue'] = None
+        self.state['ModulesValue'] = None
+        self.state['Rebuy'] = None
+        self.state['Modules'] = None
+
+    @_journal_event('ShipyardSwap')
+    def _parse_shipyardswap(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['ShipID'] = entry['ShipID']
+        self.state['ShipIdent'] = None
+        self.state['ShipName'] = None
+        self.state['ShipType'] = self.canonicalise(entry['ShipType'])
+        self.state['HullValue'] = None
+        self.state['ModulesValue'] = None
+        self.state['Rebuy'] = None
+        self.state['Modules'] = None
+
+    @_journal_event('Loadout')
+    def _parse_loadout(self, entry: MutableMapping[str, Any]) -> None:
+        if 'fighter' in self.canonicalise(entry['Ship']) or 'buggy' in self.canonicalise(entry['Ship']):
+            return
+
+        self.state['ShipID'] = entry['ShipID']
+        self.state['ShipIdent'] = entry['ShipIdent']
+
+        # Newly purchased ships can show a ShipName of "" initially,
+        # and " " after a game restart/relog.
+        # Players *can* also purposefully set " " as the name, but anyone
+        # doing that gets to live with EDMC showing ShipType instead.
+        if entry['ShipName'] and entry['ShipName'] not in ('', ' '):
+            self.state['ShipName']  = entry['ShipName']
+
+        self.state['ShipType'] = self.canonicalise(entry['Ship'])
+        self.state['HullValue'] = entry.get('HullValue')  # not present on exiting Outfitting
+        self.state['ModulesValue'] = entry.get('ModulesValue')  #   "
+        self.state['Rebuy'] = entry.get('Rebuy')
+        # Remove spurious differences between initial Loadout event and subsequent
+        self.state['Modules'] = {}
+        for module in entry['Modules']:
+            module = dict(module)
+            module['Item'] = self.canonicalise(module['Item'])
+            if ('Hardpoint' in module['Slot'] and
+                not module['Slot'].startswith('TinyHardpoint') and
+                    module.get('AmmoInClip') == module.get('AmmoInHopper') == 1):  # lasers
+                module.pop('AmmoInClip')
+                module.pop('AmmoInHopper')
+
+            self.state['Modules'][module['Slot']] = module
+
+    @_journal_event('ModuleBuy')
+    def _parse_modulebuy(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['Modules'][entry['Slot']] = {
+            'Slot':     entry['Slot'],
+            'Item':     self.canonicalise(entry['BuyItem']),
+            'On':       True,
+            'Priority': 1,
+            'Health':   1.0,
+            'Value':    entry['BuyPrice'],
+        }
+
+    @_journal_event('ModuleSell')
+    def _parse_modulesell(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['Modules'].pop(entry['Slot'], None)
+
+    @_journal_event('ModuleSwap')
+    def _parse_moduleswap(self, entry: MutableMapping[str, Any]) -> None:
+        to_item = self.state['Modules'].get(entry['ToSlot'])
+        to_slot = entry['ToSlot']
+        from_slot = entry['FromSlot']
+        modules = self.state['Modules']
+        modules[to_slot] = modules[from_slot]
+        if to_item:
+            modules[from_slot] = to_item
+
+        else:
+            modules.pop(from_slot, None)
+
+    @_journal_event('Undocked')
+    def _parse_undocked(self, entry: MutableMapping[str, Any]) -> None:
+        self.station = None
+        self.station_marketid = None
+        self.stationtype = None
+        self.stationservices = None
+
+    @_journal_event('Location', 'FSDJump', 'Docked', 'CarrierJump')
+    def _parse_location(self, entry: MutableMapping[str, Any]) -> None:
+        event_type = entry['event']
+        if event_type in ('Location', 'CarrierJump'):
+            self.planet = entry.get('Body') if entry.get('BodyType') == 'Planet' else None
+
+        elif event_type == 'FSDJump':
+            self.planet = None
+
+        if 'StarPos' in entry:
+            self.coordinates = tuple(entry['StarPos'])
+
+        elif self.system != entry['StarSystem']:
+            self.coordinates = None  # Docked event doesn't include coordinates
+
+        self.systemaddress = entry.get('SystemAddress')
+
+        if event_type in ('Location', 'FSDJump', 'CarrierJump'):
+            self.systempopulation = entry.get('Population')
+
+        self.system = 'CQC' if entry['StarSystem'] == 'ProvingGround' else entry['StarSystem']
+        self.station = entry.get('StationName')  # May be None
+        self.station_marketid = entry.get('MarketID')  # May be None
+        self.stationtype = entry.get('StationType')  # May be None
+        self.stationservices = entry.get('StationServices')  # None under E:D < 2.4
+
+    @_journal_event('ApproachBody')
+    def _parse_approachbody(self, entry: MutableMapping[str, Any]) -> None:
+        self.planet = entry['Body']
+
+    @_journal_event('LeaveBody', 'SupercruiseEntry')
+    def _parse_leavebody(self, entry: MutableMapping[str, Any]) -> None:
+        self.planet = None
+
+    @_journal_event('Rank', 'Promotion')
+    def _parse_rank(self, entry: MutableMapping[str, Any]) -> None:
+        payload = dict(entry)
+        payload.pop('event')
+        payload.pop('timestamp')
+
+        self.state['Rank'].update({k: (v, 0) for k, v in payload.items()})
+
+    @_journal_event('Progress')
+    def _parse_progress(self, entry: MutableMapping[str, Any]) -> None:
+        rank = self.state['Rank']
+        for k, v in entry.items():
+            if k in rank:
+                # perhaps not taken promotion mission yet
+                rank[k] = (rank[k][0], min(v, 100))
+
+    @_journal_event('Reputation', 'Statistics')
+    def _parse_reputation(self, entry: MutableMapping[str, Any]) -> None:
+        event_type = entry['event']
+        payload = OrderedDict(entry)
+        payload.pop('event')
+        payload.pop('timestamp')
+        self.state[event_type] = payload
+
+    @_journal_event('EngineerProgress')
+    def _parse_engineerprogress(self, entry: MutableMapping[str, Any]) -> None:
+        engineers = self.state['Engineers']
+        if 'Engineers' in entry:  # Startup summary
+            self.state['Engineers'] = {
+                e['Engineer']: ((e['Rank'], e.get('RankProgress', 0)) if 'Rank' in e else e['Progress'])
+                for e in entry['Engineers']
+            }
+
+        else:  # Promotion
+            engineer = entry['Engineer']
+            if 'Rank' in entry:
+                engineers[engineer] = (entry['Rank'], entry.get('RankProgress', 0))
+
+            else:
+                engineers[engineer] = entry['Progress']
+
+    @_journal_event('Cargo')
+    def _parse_cargo(self, entry: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        if entry.get('Vessel') != 'Ship':
+            return entry
+
+        self.state['Cargo'] = defaultdict(int)
+        # From 3.3 full Cargo event (after the first one) is written to a separate file
+        if 'Inventory' not in entry:
+            if not self.currentdir:
+                return entry  # Not monitoring a journal directory, e.g. reading old journals, so no Cargo.json
+
+            with open(join(self.currentdir, 'Cargo.json'), 'rb') as h:
+                entry = edmc_json.load(h)
+
+        self.state['Cargo'].update({self.canonicalise(x['Name']): x['Count'] for x in entry['Inventory']})
+        return entry  # The full Cargo event, if it had to be read from Cargo.json
+
+    @_journal_event('CollectCargo', 'MarketBuy', 'BuyDrones', 'MiningRefined')
+    def _parse_cargo_gained(self, entry: MutableMapping[str, Any]) -> None:
+        commodity = self.canonicalise(entry['Type'])
+        self.state['Cargo'][commodity] += entry.get('Count', 1)
+
+    @_journal_event('EjectCargo', 'MarketSell', 'SellDrones')
+    def _parse_cargo_lost(self, entry: MutableMapping[str, Any]) -> None:
+        commodity = self.canonicalise(entry['Type'])
+        cargo = self.state['Cargo']
+        cargo[commodity] -= entry.get('Count', 1)
+        if cargo[commodity] <= 0:
+            cargo.pop(commodity)
+
+    @_journal_event('SearchAndRescue')
+    def _parse_searchandrescue(self, entry: MutableMapping[str, Any]) -> None:
+        for item in entry.get('Items', []):
+            commodity = self.canonicalise(item['Name'])
+            cargo = self.state['Cargo']
+            cargo[commodity] -= item.get('Count', 1)
+            if cargo[commodity] <= 0:
+                cargo.pop(commodity)
+
+    @_journal_event('Materials')
+    def _parse_materials(self, entry: MutableMapping[str, Any]) -> None:
+        for category in ('Raw', 'Manufactured', 'Encoded'):
+            self.state[category] = defaultdict(int)
+            self.state[category].update({
+                self.canonicalise(x['Name']): x['Count'] for x in entry.get(category, [])
+            })
+
+    @_journal_event('MaterialCollected')
+    def _parse_materialcollected(self, entry: MutableMapping[str, Any]) -> None:
+        material = self.canonicalise(entry['Name'])
+        self.state[entry['Category']][material] += entry['Count']
+
+    @_journal_event('MaterialDiscarded', 'ScientificResearch')
+    def _parse_materialdiscarded(self, entry: MutableMapping[str, Any]) -> None:
+        material = self.canonicalise(entry['Name'])
+        state_category = self.state[entry['Category']]
+        state_category[material] -= entry['Count']
+        if state_category[material] <= 0:
+            state_category.pop(material)
+
+    @_journal_event('Synthesis')
+    def _parse_synthesis(self, entry: MutableMapping[str, Any]) -> None:
+        for category in ('Raw', 'Manufactured', 'Encoded'):
+            for x in entry['Materials']:
+                material = self.canonicalise(x['Name'])
+                if material in self.state[category]:
+                    self.state[category][material] -= x['Count']
+                    if self.state[category][material] <= 0:
+                        self.state[category].pop(material)
+
+    @_journal_event('MaterialTrade')
+    def _parse_materialtrade(self, entry: MutableMapping[str, Any]) -> None:
+        category = self.category(entry['Paid']['Category'])
+        state_category = self.state[category]
+        paid = entry['Paid']
+        received = entry['Received']
+
+        state_category[paid['Material']] -= paid['Quantity']
+        if state_category[paid['Material']] <= 0:
+            state_category.pop(paid['Material'])
+
+        category = self.category(received['Category'])
+        state_category[received['Material']] += received['Quantity']
+
+    @_journal_event('EngineerCraft', 'EngineerLegacyConvert')
+    def _parse_engineercraft(self, entry: MutableMapping[str, Any]) -> None:
+        if entry['event'] == 'EngineerLegacyConvert' and entry.get('IsPreview'):
+            return
+
+        for category in ('Raw', 'Manufactured', 'Encoded'):
+            for x in entry.get('Ingredients', []):
+                material = self.canonicalise(x['Name'])
+                if material in self.state[category]:
+                    self.state[category][material] -= x['Count']
+                    if self.state[category][material] <= 0:
+                        self.state[category].pop(material)
+
+        module = self.state['Modules'][entry['Slot']]
+        assert(module['Item'] == self.canonicalise(entry['Module']))
+        module['Engineering'] = {
+            'Engineer':      entry['Engineer'],
+            'EngineerID':    entry['EngineerID'],
+            'BlueprintName': entry['BlueprintName'],
+            'BlueprintID':   entry['BlueprintID'],
+            'Level':         entry['Level'],
+            'Quality':       entry['Quality'],
+            'Modifiers':     entry['Modifiers'],
+        }
+
+        if 'ExperimentalEffect' in entry:
+            module['Engineering']['ExperimentalEffect'] = entry['ExperimentalEffect']
+            module['Engineering']['ExperimentalEffect_Localised'] = entry['ExperimentalEffect_Localised']
+
+        else:
+            module['Engineering'].pop('ExperimentalEffect', None)
+            module['Engineering'].pop('ExperimentalEffect_Localised', None)
+
+    @_journal_event('MissionCompleted')
+    def _parse_missioncompleted(self, entry: MutableMapping[str, Any]) -> None:
+        for reward in entry.get('CommodityReward', []):
+            commodity = self.canonicalise(reward['Name'])
+            self.state['Cargo'][commodity] += reward.get('Count', 1)
+
+        for reward in entry.get('MaterialsReward', []):
+            if 'Category' in reward:  # Category not present in E:D 3.0
+                category = self.category(reward['Category'])
+                material = self.canonicalise(reward['Name'])
+                self.state[category][material] += reward.get('Count', 1)
+
+    @_journal_event('EngineerContribution')
+    def _parse_engineercontribution(self, entry: MutableMapping[str, Any]) -> None:
+        commodity = self.canonicalise(entry.get('Commodity'))
+        if commodity:
+            self.state['Cargo'][commodity] -= entry['Quantity']
+            if self.state['Cargo'][commodity] <= 0:
+                self.state['Cargo'].pop(commodity)
+
+        material = self.canonicalise(entry.get('Material'))
+        if material:
+            for category in ('Raw', 'Manufactured', 'Encoded'):
+                if material in self.state[category]:
+                    self.state[category][material] -= entry['Quantity']
+                    if self.state[category][material] <= 0:
+                        self.state[category].pop(material)
+
+    @_journal_event('TechnologyBroker')
+    def _parse_technologybroker(self, entry: MutableMapping[str, Any]) -> None:
+        for thing in entry.get('Ingredients', []):  # 3.01
+            for category in ('Cargo', 'Raw', 'Manufactured', 'Encoded'):
+                item = self.canonicalise(thing['Name'])
+                if item in self.state[category]:
+                    self.state[category][item] -= thing['Count']
+                    if self.state[category][item] <= 0:
+                        self.state[category].pop(item)
+
+        for thing in entry.get('Commodities', []):  # 3.02
+            commodity = self.canonicalise(thing['Name'])
+            self.state['Cargo'][commodity] -= thing['Count']
+            if self.state['Cargo'][commodity] <= 0:
+                self.state['Cargo'].pop(commodity)
+
+        for thing in entry.get('Materials', []):  # 3.02
+            material = self.canonicalise(thing['Name'])
+            category = thing['Category']
+            self.state[category][material] -= thing['Count']
+            if self.state[category][material] <= 0:
+                self.state[category].pop(material)
+
+    @_journal_event('JoinACrew')
+    def _parse_joinacrew(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['Captain'] = entry['Captain']
+        self.state['Role'] = 'Idle'
+        self.planet = None
+        self.system = None
+        self.station = None
+        self.station_marketid = None
+        self.stationtype = None
+        self.stationservices = None
+        self.coordinates = None
+        self.systemaddress = None
+
+    @_journal_event('ChangeCrewRole')
+    def _parse_changecrewrole(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['Role'] = entry['Role']
+
+    @_journal_event('QuitACrew')
+    def _parse_quitacrew(self, entry: MutableMapping[str, Any]) -> None:
+        self.state['Captain'] = None
+        self.state['Role'] = None
+        self.planet = None
+        self.system = None
+        self.station = None
+        self.station_marketid = None
+        self.stationtype = None
+        self.stationservices = None
+        self.coordinates = None
+        self.systemaddress = None
+
+    @_journal_event('Friends')
+    def _parse_friends(self, entry: MutableMapping[str, Any]) -> None:
+        if entry['Status'] in ('Online', 'Added'):
+            self.state['Friends'].add(entry['Name'])
+
+        else:
+            self.state['Friends'].discard(entry['Name'])
+
     # Commodities, Modules and Ships can appear in different forms e.g. "$HNShockMount_Name;", "HNShockMount",
     # and "hnshockmount", "$int_cargorack_size6_class1_name;" and "Int_CargoRack_Size6_Class1",
     # "python" and "Python", etc.
@@ -808,46 +1591,50 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
 
         return item.capitalize()
 
-    def get_entry(self):
-        if not self.event_queue:
+    def side_file(self, entry: Mapping[str, Any], source: Optional[str] = None) -> Optional[Mapping[str, Any]]:
+        """
+        Get the full content of a Market, Outfitting or Shipyard entry, which the game writes to a separate file.
+
+        :param entry: The journal entry.
+        :param source: The journal directory that the entry came from, as `state['Source']`, if not this one.
+        :return: The file's content as of the entry, read-only, or None if not monitoring that journal directory, if
+            there's no such file, or if the file isn't the version that goes with the entry.
+        :raises OSError, ValueError: If the file can't be read or parsed.
+        """
+        journal = self if source == self.source else self._started.get(source)
+        if not journal or not journal.currentdir or entry['event'] not in self._SIDE_FILE_EVENTS:
             return None
 
-        else:
-            entry = self.parse_entry(self.event_queue.pop(0))
-            if not self.live and entry['event'] not in (None, 'Fileheader'):
-                # Game not running locally, but Journal has been updated
-                self.live = True
-                if self.station:
-                    entry = OrderedDict([
-                        ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
-                        ('event', 'StartUp'),
-                        ('Docked', True),
-                        ('MarketID', self.station_marketid),
-                        ('StationName', self.station),
-                        ('StationType', self.stationtype),
-                        ('StarSystem', self.system),
-                        ('StarPos', self.coordinates),
-                        ('SystemAddress', self.systemaddress),
-                    ])
-
-                else:
-                    entry = OrderedDict([
-                        ('timestamp', strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())),
-                        ('event', 'StartUp'),
-                        ('Docked', False),
-                        ('StarSystem', self.system),
-                        ('StarPos', self.coordinates),
-                        ('SystemAddress', self.systemaddress),
-                    ])
-
-                self.event_queue.append(json.dumps(entry, separators=(', ', ':')))
-
-            elif self.live and entry['event'] == 'Music' and entry.get('MusicTrack') == 'MainMenu':
-                self.event_queue.append(
-                    '{{ "timestamp":"{}", "event":"ShutDown" }}'.format(strftime('%Y-%m-%dT%H:%M:%SZ', gmtime()))
-                )
+        return side_files.read(join(journal.currentdir, f'{entry["event"]}.json'), entry['timestamp'])
 
-            return entry
+    def update_state(
+            self, cmdr: str, changes: Mapping[str, Any], defaults: Optional[Mapping[str, Any]] = None
+    ) -> None:
+        """
+        Change the Cmdr state from outside the journal, e.g. from the cAPI.
+
+        The worker thread owns the state, so it makes the change before it next reads the journal, and later entries'
+        snapshots include it.  The change is dropped if the journal has moved on to another Cmdr by then.
+
+        :param cmdr: The Cmdr that the change is for.
+        :param changes: Values to set.
+        :param defaults: Values to set only where the state has none yet.
+        """
+        self._state_updates.append((cmdr, changes, defaults or {}))
+        self._wake()
+
+    def get_entry(self) -> Optional[Mapping[str, Any]]:
+        """
+        Return the next journal entry parsed by the worker thread, or None if there isn't one.
+
+        Also updates self.snapshot to the journal context as of that entry.
+        """
+        item = self.event_queue.get()
+        if not item:
+            return None
+
+        entry, self.snapshot = item
+        return entry
 
     def game_running(self):
         if platform == 'darwin':
@@ -878,9 +1665,11 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
 
         return False
 
-    # Return a subset of the received data describing the current ship as a Loadout event
-    def ship(self, timestamped=True):
-        if not self.state['Modules']:
+    # Return a subset of the received data describing the current ship as a Loadout event - by default the ship as of
+    # the last entry handled, else that in the state passed in, e.g. from an entry's own snapshot
+    def ship(self, timestamped=True, state=None):
+        state = state or self.snapshot['state']
+        if not state['Modules']:
             return None
 
         standard_order = (
@@ -893,20 +1682,20 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
             d['timestamp'] = strftime('%Y-%m-%dT%H:%M:%SZ', gmtime())
 
         d['event'] = 'Loadout'
-        d['Ship'] = self.state['ShipType']
-        d['ShipID'] = self.state['ShipID']
+        d['Ship'] = state['ShipType']
+        d['ShipID'] = state['ShipID']
 
-        if self.state['ShipName']:
-            d['ShipName'] = self.state['ShipName']
+        if state['ShipName']:
+            d['ShipName'] = state['ShipName']
 
-        if self.state['ShipIdent']:
-            d['ShipIdent'] = self.state['ShipIdent']
+        if state['ShipIdent']:
+            d['ShipIdent'] = state['ShipIdent']
 
         # sort modules by slot - hardpoints, standard, internal
         d['Modules'] = []
 
         for slot in sorted(
-            self.state['Modules'],
+            state['Modules'],
             key=lambda x: (
                 'Hardpoint' not in x,
                 len(standard_order) if x not in standard_order else standard_order.index(x),
@@ -915,7 +1704,7 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
             )
         ):
 
-            module = dict(self.state['Modules'][slot])
+            module = dict(state['Modules'][slot])
             module.pop('Health', None)
             module.pop('Value', None)
             d['Modules'].append(module)
@@ -923,16 +1712,18 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
         return d
 
     # Export ship loadout as a Loadout event
-    def export_ship(self, filename=None):
+    def export_ship(self, filename=None, state=None):
         # TODO(A_D): Some type checking has been disabled in here due to config.get getting weird outputs
-        string = json.dumps(self.ship(False), ensure_ascii=False, indent=2, separators=(',', ': '))  # pretty print
+        state = state or self.snapshot['state']
+        # pretty print
+        string = json.dumps(self.ship(False, state), ensure_ascii=False, indent=2, separators=(',', ': '))
         if filename:
             with open(filename, 'wt') as h:
                 h.write(string)
 
             return
 
-        ship = ship_file_name(self.state['ShipName'], self.state['ShipType'])
+        ship = ship_file_name(state['ShipName'], state['ShipType'])
         regexp = re.compile(re.escape(ship) + r'\.\d{4}\-\d\d\-\d\dT\d\d\.\d\d\.\d\d\.txt')
         oldfiles = sorted((x for x in listdir(config.get('outdir')) if regexp.match(x)))  # type: ignore
         if oldfiles:
@@ -948,6 +1739,128 @@ class EDLogs(FileSystemEventHandler):  # type: ignore # See below
         with open(filename, 'wt') as h:
             h.write(string)
 
+    # Journal event -> parser method, built once rather than walking an if/elif chain for every entry
+    _PARSERS = _journal_parsers(locals())
+
+
+class JournalScheduler:
+    """
+    Tails several journal directories on one thread, e.g. for several Cmdrs whose journals are synced to this machine.
+
+    Each directory has its own `EDLogs`, with its own journal context, checkpoint and queue of entries for the main
+    thread, but they share this one worker thread and one watchdog observer.
+    """
+
+    _BACKLOG_POLL = 0.1  # How often to check for space while any journal's queue is full
+
+    def __init__(self):
+        self.monitors: List[EDLogs] = []
+        self.wake = threading.Event()  # Set when any of the journals changes
+        self.thread: Optional[threading.Thread] = None
+        self._observer = None  # Shared watchdog Observer, made on first use
+        self._starting: List[EDLogs] = []  # Journals to start tailing, handed to the worker thread
+        self._lock = threading.Lock()  # For _starting and _observer
+
+    def add(self, journal_dir: str, source: str) -> EDLogs:
+        """
+        Add a journal directory.  Call `start()` on the result to start monitoring it.
+
+        :param journal_dir: The journal directory.
+        :param source: A name for it, passed to plugins as `state['Source']`.
+        :return: The journal monitor for the directory.
+        """
+        monitor = EDLogs(journal_dir, source)
+        monitor.scheduler = self
+        self.monitors.append(monitor)
+        return monitor
+
+    def observer(self):
+        """Get the shared watchdog observer, starting it if need be."""
+        with self._lock:
+            if not self._observer:
+                self._observer = Observer()
+                self._observer.daemon = True
+                self._observer.start()
+
+            return self._observer
+
+    def tail(self, monitor: EDLogs) -> None:
+        """
+        Start tailing a journal, or start again after its directory has changed.  Called by `EDLogs.start()`.
+
+        :param monitor: The journal monitor.
+        """
+        with self._lock:
+            self._starting.append(monitor)
+
+        if not (self.thread and self.thread.is_alive()):
+            self.thread = threading.Thread(target=self.worker, name='Journal scheduler')
+            self.thread.daemon = True
+            self.thread.start()
+
+        self.wake.set()
+
+    def worker(self) -> None:
+        """Tail each journal in turn whenever any of them changes, or at least every `EDLogs._POLL` seconds."""
+        tailing: List[EDLogs] = []
+        while threading.current_thread() == self.thread:
+            self.wake.clear()
+            with self._lock:
+                starting, self._starting = self._starting, []
+
+            for monitor in starting:
+                if monitor in tailing:
+                    monitor._tail_close()
+                    tailing.remove(monitor)
+
+                try:
+                    monitor._tail_open()
+
+                except Exception:
+                    logger.exception(f'Failed starting to tail {monitor.currentdir!r}')
+                    monitor._tail_close(save=False)  # Its progress is unknown
+                    continue  # Skip this journal, rather than stop tailing all of them
+
+                tailing.append(monitor)
+
+            backlog = False
+            for monitor in list(tailing):
+                if not monitor.currentdir:  # Stopped
+                    monitor._tail_close()
+                    tailing.remove(monitor)
+                    continue
+
+                try:
+                    monitor._tail()
+                    monitor._check_game()
+
+                except Exception:
+                    logger.exception(f'Failed tailing {monitor.currentdir!r}')
+
+                backlog = backlog or monitor._reread
+
+            self.wake.wait(self._BACKLOG_POLL if backlog else EDLogs._POLL)
+
+        for monitor in tailing:
+            monitor._tail_close()
+
+    def close(self) -> None:
+        """Stop monitoring all the journal directories."""
+        # Stop the worker first, so that it checkpoints each journal before close() clears its context
+        thread, self.thread = self.thread, None
+        self.wake.set()
+        if thread:
+            thread.join()
+
+        for monitor in self.monitors:
+            monitor.close()
+
+        if self._observer:
+            self._observer.stop()
+            self._observer.join()
+            self._observer = None
+
 
-# singleton
+# singletons
+side_files = SideFiles()
 monitor = EDLogs()
@@ -3,15 +3,25 @@ Plugin hooks for EDMC - Ian Norton, Jonathan Harris
 """
 from builtins import str
 from builtins import object
+import ast
+import functools
 import os
 import importlib
+import re
 import sys
 import operator
-import threading  # noqa: F401 - We don't use it, but plugins might
-from typing import Optional
+import queue
+import threading
+import traceback
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from time import monotonic, perf_counter, time
+from typing import Any, Callable, Deque, Dict, FrozenSet, List, Mapping, NamedTuple, Optional, Set, Tuple, Union
 import logging
 import tkinter as tk
 
+import edmc_async
+import edmc_json
 import myNotebook as nb  # noqa: N813
 
 from config import config, appname
@@ -72,6 +82,12 @@ GuiFocusCodex = 11
 PLUGINS = []
 PLUGINS_not_py3 = []
 
+# Hooks that are looked up on every notification, so are tabled up front by rebuild_hooks()
+HOOKS = (
+    'plugin_stop', 'prefs_cmdr_changed', 'prefs_changed', 'journal_entry', 'journal_entries', 'dashboard_entry',
+    'cmdr_data', 'journal_entry_async', 'dashboard_entry_async', 'cmdr_data_async',
+)
+
 # For asynchronous error display
 last_error = {
     'msg':  None,
@@ -79,13 +95,376 @@ last_error = {
 }
 
 
+class PluginWorker:
+    """
+    A thread that calls a plugin's event hooks in order, so that a slow plugin doesn't freeze the UI.
+
+    The watchdog logs calls that take longer than TIMEOUT, and drops calls queued for the plugin until the slow call
+    returns.  After STRIKES such calls the plugin gets no more calls.
+    """
+
+    TIMEOUT = 10  # seconds
+    STRIKES = 3
+
+    def __init__(self, name: str):
+        """
+        Start the thread.
+
+        :param name: The plugin's name, for logging.
+        """
+        self.name = name
+        self.queue: queue.Queue = queue.Queue()
+        self.started: Optional[float] = None  # monotonic() time the current call started, or None if idle
+        self.current = ''  # Name of the function being called
+        self.stuck = False  # Whether the current call has taken longer than TIMEOUT
+        self.strikes = 0
+        self.demoted = False
+        self.dropped = 0  # Calls dropped since the plugin got stuck
+        self.thread = threading.Thread(target=self._run, name=f'Plugin {name} worker', daemon=True)
+        self.thread.start()
+        _start_watchdog()
+
+    def submit(self, hook: str, func: Callable, *args) -> None:
+        """
+        Queue a call to one of the plugin's functions.
+
+        :param hook: The name of the hook.
+        :param func: The function.
+        :param args: Its arguments.
+        """
+        if self.stuck or self.demoted:
+            self.dropped += 1
+
+        else:
+            self.queue.put((hook, func, args))
+
+    def _run(self) -> None:
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+
+            self.current, func, args = item
+            self.started = monotonic()
+            timer = profiler
+            start = perf_counter()
+            try:
+                # Any error message is shown in the status line, via the <<PluginError>> event
+                show_error(func(*args))
+
+            except Exception:
+                logger.exception(f'Plugin "{self.name}" failed')
+
+            if timer:
+                timer.record(self.name, self.current, perf_counter() - start)
+
+            if self.stuck:
+                logger.info(
+                    f'Plugin "{self.name}" {self.current}() returned after {monotonic() - self.started:.1f}s, '
+                    f'{self.dropped} calls dropped'
+                )
+                self.stuck = False
+                self.dropped = 0
+
+            self.started = None
+
+    def check(self, now: float) -> None:
+        """
+        Log the current call if it has taken too long.  Called by the watchdog.
+
+        :param now: monotonic() time.
+        """
+        started = self.started
+        if self.stuck or started is None or now - started < self.TIMEOUT:
+            return
+
+        self.stuck = True
+        self.strikes += 1
+        frame = sys._current_frames().get(self.thread.ident)  # type: ignore
+        logger.warning(
+            f'Plugin "{self.name}" {self.current}() has taken more than {self.TIMEOUT}s, in:\n'
+            + ''.join(traceback.format_stack(frame) if frame else [])
+        )
+        if self.strikes >= self.STRIKES and not self.demoted:
+            self.demoted = True
+            logger.error(f'Plugin "{self.name}" timed out {self.strikes} times, so will get no more events')
+            show_error(_('Plugin {PLUGIN} is not responding').format(PLUGIN=self.name))  # Status line
+
+    def stop(self) -> None:
+        """Stop the thread once the queued calls are done."""
+        self.queue.put(None)
+
+    def join(self, deadline: float) -> None:
+        """
+        Wait for the thread to stop.
+
+        :param deadline: monotonic() time to give up waiting.
+        """
+        self.thread.join(max(deadline - monotonic(), 0))
+        if self.thread.is_alive():
+            logger.warning(f'Plugin "{self.name}" {self.current}() still hasn\'t returned')
+
+
+class HookStats:
+    """Timings of one plugin's calls to one hook."""
+
+    SAMPLES = 1000  # Recent call times kept for percentiles
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.samples: Deque[float] = deque(maxlen=self.SAMPLES)
+
+    def add(self, elapsed: float) -> None:
+        """
+        Record a call.
+
+        :param elapsed: How long the call took, in seconds.
+        """
+        self.count += 1
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.samples.append(elapsed)
+
+    def summary(self) -> Dict[str, Any]:
+        """
+        Summarise the calls.
+
+        :returns: count, and total, p50, p99 and max time in seconds.  Percentiles are of the most recent calls.
+        """
+        samples = sorted(self.samples)
+        return {
+            'count': self.count,
+            'total': self.total,
+            'p50': samples[len(samples) // 2] if samples else 0.0,
+            'p99': samples[min(len(samples) * 99 // 100, len(samples) - 1)] if samples else 0.0,
+            'max': self.max,
+        }
+
+
+class Profiler:
+    """Times every call to every plugin hook, and logs slow calls."""
+
+    def __init__(self, slow: float):
+        """
+        Start profiling.
+
+        :param slow: Log calls that take at least this long, in seconds.
+        """
+        self.slow = slow
+        self.since = time()
+        self.stats: Dict[Tuple[str, str], HookStats] = {}  # (plugin name, hook) -> HookStats
+        self._lock = threading.Lock()  # Calls may be made on plugin worker threads
+
+    def record(self, plugin_name: str, hook: str, elapsed: float) -> None:
+        """
+        Record a call.
+
+        :param plugin_name: The plugin's name.
+        :param hook: The hook that was called.
+        :param elapsed: How long the call took, in seconds.
+        """
+        with self._lock:
+            stats = self.stats.get((plugin_name, hook))
+            if not stats:
+                stats = self.stats[(plugin_name, hook)] = HookStats()
+
+            stats.add(elapsed)
+
+        if elapsed >= self.slow:
+            logger.warning(f'Plugin "{plugin_name}" {hook}() took {elapsed * 1000:.0f}ms')
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        Summarise the calls.
+
+        :returns: `HookStats.summary()` with 'plugin' and 'hook' added, for each plugin and hook, most total time first.
+        """
+        with self._lock:
+            summary = [dict(stats.summary(), plugin=p, hook=h) for (p, h), stats in self.stats.items()]
+
+        return sorted(summary, key=lambda x: x['total'], reverse=True)
+
+    def save(self, filename: str) -> None:
+        """
+        Write the summary as JSON, for `EDMC.py plugin-stats`.
+
+        :param filename: The file to write.
+        """
+        with open(filename, 'wb') as h:
+            h.write(edmc_json.dumpb({'since': self.since, 'saved': time(), 'stats': self.summary()}))
+
+
+def profile_report(summary: List[Dict[str, Any]]) -> str:
+    """
+    Format a `Profiler.summary()` as a table.
+
+    :param summary: The summary.
+    :returns: The table.
+    """
+    lines = [f'{"Plugin":<24} {"Hook":<16} {"Calls":>8} {"Total ms":>10} {"p50 ms":>8} {"p99 ms":>8} {"Max ms":>8}']
+    for s in summary:
+        lines.append(
+            f'{s["plugin"][:24]:<24} {s["hook"]:<16} {s["count"]:>8} {s["total"] * 1000:>10.1f} '
+            f'{s["p50"] * 1000:>8.3f} {s["p99"] * 1000:>8.3f} {s["max"] * 1000:>8.3f}'
+        )
+
+    return '\n'.join(lines)
+
+
+# Set by set_profiling()
+profiler: Optional[Profiler] = None
+PROFILE_SLOW_MS = 100  # Default for logging slow calls
+PROFILE_FILE = 'plugin_stats.json'  # In config.app_dir
+
+
+def set_profiling(enabled: bool, slow_ms: int = 0) -> None:
+    """
+    Start or stop profiling plugin hooks.
+
+    Stats are kept if profiling is already running.
+
+    :param enabled: Whether to profile.
+    :param slow_ms: Log calls that take at least this long, in milliseconds.  0 for the default.
+    """
+    global profiler
+    slow = (slow_ms or PROFILE_SLOW_MS) / 1000
+    if not enabled:
+        profiler = None
+
+    elif profiler:
+        profiler.slow = slow
+
+    else:
+        profiler = Profiler(slow)
+
+
+def save_profile() -> Optional[str]:
+    """
+    Save the profile of plugin hooks, if profiling.
+
+    :returns: The file written, or None.
+    """
+    if not profiler:
+        return None
+
+    filename = os.path.join(config.app_dir, PROFILE_FILE)
+    try:
+        profiler.save(filename)
+
+    except OSError:
+        logger.exception(f'Failed writing {filename}')
+        return None
+
+    return filename
+
+
+_watchdog: Optional[threading.Thread] = None
+_watchdog_stop = threading.Event()
+
+
+def _start_watchdog() -> None:
+    global _watchdog
+    if not _watchdog:
+        _watchdog = threading.Thread(target=_watch, name='Plugin watchdog', daemon=True)
+        _watchdog.start()
+
+
+def _watch() -> None:
+    """Check on the plugin workers every second."""
+    while not _watchdog_stop.wait(1):
+        now = monotonic()
+        for plugin in PLUGINS:
+            if plugin.worker:
+                plugin.worker.check(now)
+
+
+class PluginManifest(NamedTuple):
+    """What a plugin's load.py declares, found without importing it."""
+
+    functions: FrozenSet[str]  # Names of the module-level functions
+    constants: Dict[str, Any]  # Module-level LAZY, THREADED and JOURNAL_EVENTS
+
+
+_DECLARATIONS = ('LAZY', 'THREADED', 'JOURNAL_EVENTS')
+# Whether a load.py might provide UI hooks, so must be imported on the main thread
+_RE_UI_HOOK = re.compile(rb'^\s*(?:async\s+)?(?:def\s+)?(?:plugin_app|plugin_prefs)\b', re.MULTILINE)
+# Whether a load.py might declare LAZY
+_RE_LAZY = re.compile(rb'^LAZY\b', re.MULTILINE)
+
+
+def _scan(source: bytes, loadfile: str) -> Optional[PluginManifest]:
+    """
+    Find what a plugin's load.py declares, without running it.
+
+    :param source: The contents of load.py.
+    :param loadfile: The path of load.py, for error messages.
+    :returns: The declarations, or None if load.py can't be parsed.
+    """
+    try:
+        tree = ast.parse(source, loadfile)
+
+    except (SyntaxError, ValueError):
+        return None
+
+    functions = set()
+    constants = {}
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            functions.add(node.name)
+
+        elif (isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name)
+              and node.targets[0].id in _DECLARATIONS):
+            try:
+                constants[node.targets[0].id] = ast.literal_eval(node.value)
+
+            except ValueError:
+                logger.error(f'{loadfile}: {node.targets[0].id} should be a constant')
+
+    return PluginManifest(frozenset(functions), constants)
+
+
+def _import(name: str, loadfile: str) -> Any:
+    """
+    Import a plugin's load.py.
+
+    :param name: The plugin's folder name.
+    :param loadfile: The path of load.py.
+    :returns: The module.
+    """
+    return importlib.machinery.SourceFileLoader('plugin_{}'.format(
+        name.encode(encoding='ascii', errors='replace').decode('utf-8').replace('.', '_')),
+        loadfile).load_module()
+
+
+class PluginTiming(NamedTuple):
+    """How long a plugin took to load."""
+
+    name: str
+    how: str  # 'main', 'background' or 'lazy' - where load.py was imported
+    start: float  # When the import started, in seconds since load_plugins() started
+    load: float  # Time taken to import load.py, in seconds
+    start3: float  # Time taken by plugin_start3(), in seconds
+
+
+# The plugins in the order they were loaded by load_plugins(), then as lazy plugins were loaded
+startup_timeline: List[PluginTiming] = []
+_startup_time = 0.0  # perf_counter() when load_plugins() started
+
+
 class Plugin(object):
 
-    def __init__(self, name: str, loadfile: str, plugin_logger: Optional[logging.Logger]):
+    def __init__(
+            self, name: str, loadfile: str, plugin_logger: Optional[logging.Logger],
+            module: Union[None, Future, PluginManifest] = None
+    ):
         """
         Load a single plugin
         :param name: module name
         :param loadfile: the main .py file
+        :param module: None to import loadfile now, a Future of its (start time, import time, module) if it is being
+           imported in the background, or its PluginManifest to import it on first use
         :raises Exception: Typically ImportError or OSError
         """
 
@@ -93,36 +472,142 @@ class Plugin(object):
         self.folder = name  # basename of plugin folder. None for internal plugins.
         self.module = None  # None for disabled plugins.
         self.logger = plugin_logger
+        self.loadfile = loadfile
+        self.lazy: Optional[PluginManifest] = None  # Set until the plugin is imported on first use
+        self._lazy_lock = threading.Lock()
+        self.journal_events: Optional[FrozenSet[str]] = None  # Journal events the plugin wants. None for all.
+        self.worker: Optional[PluginWorker] = None  # Calls the plugin's event hooks, if the plugin wants THREADED.
+
+        if isinstance(module, PluginManifest):
+            logger.info(f'plugin "{name}" will be loaded on first use from "{loadfile}"')
+            self.lazy = module
+            self._declared()
 
-        if loadfile:
+        elif loadfile:
             logger.info(f'loading plugin "{name.replace(".", "_")}" from "{loadfile}"')
             try:
-                module = importlib.machinery.SourceFileLoader('plugin_{}'.format(
-                    name.encode(encoding='ascii', errors='replace').decode('utf-8').replace('.', '_')),
-                    loadfile).load_module()
-                if getattr(module, 'plugin_start3', None):
-                    newname = module.plugin_start3(os.path.dirname(loadfile))
-                    self.name = newname and str(newname) or name
-                    self.module = module
-                elif getattr(module, 'plugin_start', None):
-                    logger.warning(f'plugin {name} needs migrating\n')
-                    PLUGINS_not_py3.append(self)
+                if module:
+                    how = 'background'
+                    started, load, module = module.result()
+
                 else:
-                    logger.error(f'plugin {name} has no plugin_start3() function')
+                    how = 'main'
+                    started = perf_counter()
+                    module = _import(name, loadfile)
+                    load = perf_counter() - started
+
+                self._start(module, how, started, load)
+
             except Exception as e:
                 logger.exception(f': Failed for Plugin "{name}"')
                 raise
         else:
             logger.info(f'plugin {name} disabled')
 
+    def _start(self, module: Any, how: str, started: float, load: float) -> None:
+        """
+        Start the plugin, once load.py is imported.
+
+        :param module: The imported load.py.
+        :param how: Where load.py was imported, for the startup timeline.
+        :param started: perf_counter() when the import started.
+        :param load: Time taken to import load.py, in seconds.
+        """
+        start3 = 0.0
+        if getattr(module, 'plugin_start3', None):
+            start = perf_counter()
+            newname = module.plugin_start3(os.path.dirname(self.loadfile))
+            start3 = perf_counter() - start
+            if profiler:
+                profiler.record(self.name, 'plugin_start3', start3)
+
+            if not self.lazy:  # Lazy plugins are already in the hook tables under their folder name
+                self.name = newname and str(newname) or self.name
+
+            self.module = module
+            self._declared()
+        elif getattr(module, 'plugin_start', None):
+            logger.warning(f'plugin {self.name} needs migrating\n')
+            PLUGINS_not_py3.append(self)
+        else:
+            logger.error(f'plugin {self.name} has no plugin_start3() function')
+
+        startup_timeline.append(PluginTiming(self.name, how, started - _startup_time, load, start3))
+
+    def _declared(self) -> None:
+        """Act on what the plugin declares at module level."""
+        self.journal_events = self._get_journal_events()
+        if self._get_declaration('THREADED') and not self.worker:
+            self.worker = PluginWorker(self.name)
+
+    def _get_declaration(self, name: str) -> Any:
+        """
+        Get one of the plugin's module-level declarations.
+
+        :param name: The name, e.g. 'JOURNAL_EVENTS'.
+        :returns: Its value, or None if it isn't declared.
+        """
+        if self.lazy:
+            return self.lazy.constants.get(name)
+
+        return getattr(self.module, name, None)
+
     def _get_func(self, funcname):
         """
         Get a function from a plugin
         :param funcname:
         :returns: The function, or None if it isn't implemented.
         """
+        if self.lazy:
+            # Import the plugin when the function is first called
+            return functools.partial(self._call_lazily, funcname) if funcname in self.lazy.functions else None
+
         return getattr(self.module, funcname, None)
 
+    def _call_lazily(self, funcname: str, *args) -> Any:
+        """
+        Import a lazy plugin if necessary, then call one of its functions.
+
+        :param funcname: The function.
+        :param args: Its arguments.
+        :returns: The function's return value.
+        """
+        with self._lazy_lock:
+            if self.lazy:
+                logger.info(f'loading plugin "{self.name}" from "{self.loadfile}"')
+                started = perf_counter()
+                try:
+                    module = _import(self.folder, self.loadfile)
+                    self._start(module, 'lazy', started, perf_counter() - started)
+
+                except Exception:
+                    logger.exception(f'Failed for Plugin "{self.name}"')
+
+                self.lazy = None
+
+        func = getattr(self.module, funcname, None)
+        return func and func(*args)
+
+    def _get_journal_events(self) -> Optional[FrozenSet[str]]:
+        """
+        Get the journal events that the plugin has declared it wants in `JOURNAL_EVENTS`.
+
+        :returns: The event names, or None if the plugin wants all events.
+        """
+        events = self._get_declaration('JOURNAL_EVENTS')
+        if events is None:
+            return None
+
+        if isinstance(events, str):
+            events = (events,)
+
+        try:
+            return frozenset(str(event) for event in events)
+
+        except TypeError:
+            logger.error(f'Plugin "{self.name}" JOURNAL_EVENTS should be a set of event names, not {events!r}')
+            return None
+
     def get_app(self, parent):
         """
         If the plugin provides mainwindow content create and return it.
@@ -132,7 +617,11 @@ class Plugin(object):
         plugin_app = self._get_func('plugin_app')
         if plugin_app:
             try:
+                start = perf_counter()
                 appitem = plugin_app(parent)
+                if profiler:
+                    profiler.record(self.name, 'plugin_app', perf_counter() - start)
+
                 if appitem is None:
                     return None
                 elif isinstance(appitem, tuple):
@@ -157,7 +646,11 @@ class Plugin(object):
         plugin_prefs = self._get_func('plugin_prefs')
         if plugin_prefs:
             try:
+                start = perf_counter()
                 frame = plugin_prefs(parent, cmdr, is_beta)
+                if profiler:
+                    profiler.record(self.name, 'plugin_prefs', perf_counter() - start)
+
                 if not isinstance(frame, nb.Frame):
                     raise AssertionError
                 return frame
@@ -166,11 +659,158 @@ class Plugin(object):
         return None
 
 
+class _Hook(NamedTuple):
+    """The enabled plugins that provide a function."""
+
+    plugins: List[Tuple[Plugin, Callable]]  # (plugin, function), in PLUGINS order
+    by_name: Dict[str, Callable]  # Plugin name -> function, the first if more than one plugin has the same name
+
+
+# Function name -> _Hook.  Rebuilt by rebuild_hooks(), and filled in on first use for functions not in HOOKS.
+_hooks: Dict[str, _Hook] = {}
+# (plugin, journal_entries or journal_entry, whether batched), in PLUGINS order
+_journal_hook: List[Tuple[Plugin, Callable, bool]] = []
+# The plugins that take batches of journal entries, rather than one at a time
+_journal_batched: Set[Plugin] = set()
+# (hook, journal event) -> (plugin, function) for the plugins that want the event, in PLUGINS order.  Filled in on
+# first use.
+_journal_hook_by_event: Dict[Tuple[str, str], List[Tuple[Plugin, Callable]]] = {}
+
+
+def _build_hook(fn_name: str) -> _Hook:
+    plugins = []
+    by_name: Dict[str, Callable] = {}
+    for plugin in PLUGINS:
+        func = plugin._get_func(fn_name)
+        if func:
+            plugins.append((plugin, func))
+            by_name.setdefault(plugin.name, func)
+
+    return _Hook(plugins, by_name)
+
+
+def _hook(fn_name: str) -> _Hook:
+    """
+    Get the enabled plugins that provide a function.
+
+    :param fn_name: The function name.
+    :returns: The plugins and their functions.
+    """
+    hook = _hooks.get(fn_name)
+    if hook is None:
+        hook = _hooks[fn_name] = _build_hook(fn_name)
+
+    return hook
+
+
+def rebuild_hooks() -> None:
+    """
+    Rebuild the dispatch tables of which plugins provide which functions.
+
+    Must be called after PLUGINS changes, or after a plugin's module is set or cleared.
+    """
+    hooks = {fn_name: _build_hook(fn_name) for fn_name in HOOKS}
+    batched = dict(hooks['journal_entries'].plugins)
+    single = dict(hooks['journal_entry'].plugins)
+    _journal_hook[:] = [
+        (p, batched[p], True) if p in batched else (p, single[p], False)
+        for p in PLUGINS if p in batched or p in single
+    ]
+    _journal_batched.clear()
+    _journal_batched.update(batched)
+    _hooks.clear()
+    _hooks.update(hooks)
+    _journal_hook_by_event.clear()
+
+
+def _journal_event_hook(fn_name: str, event: str) -> List[Tuple[Plugin, Callable]]:
+    """
+    Get the plugins that want a journal event passed to their `journal_entry` or `journal_entry_async`.
+
+    :param fn_name: The function name.
+    :param event: The journal event name.
+    :returns: (plugin, function) for each plugin.
+    """
+    hook = _journal_hook_by_event.get((fn_name, event))
+    if hook is None:
+        hook = _journal_hook_by_event[(fn_name, event)] = [
+            (p, f) for p, f in _hook(fn_name).plugins if p.journal_events is None or event in p.journal_events
+        ]
+
+    return hook
+
+
+def _timed_import(name: str, loadfile: str) -> Tuple[float, float, Any]:
+    """
+    Import a plugin's load.py, in the background.
+
+    :param name: The plugin's folder name.
+    :param loadfile: The path of load.py.
+    :returns: perf_counter() when the import started, time taken in seconds, and the module.
+    """
+    started = perf_counter()
+    module = _import(name, loadfile)
+    return started, perf_counter() - started, module
+
+
+def _how_to_load(
+        name: str, loadfile: str, background: ThreadPoolExecutor
+) -> Union[None, Future, PluginManifest]:
+    """
+    Decide how to load a found plugin.
+
+    Plugins with UI hooks, and plugins that are packages, are imported on the main thread.  Plugins that declare
+    `LAZY = True` are imported when first used.  Other plugins are imported in the background.
+
+    :param name: The plugin's folder name.
+    :param loadfile: The path of its load.py.
+    :param background: Executor for background imports.
+    :returns: The `module` argument for `Plugin`.
+    """
+    try:
+        with open(loadfile, 'rb') as h:
+            source = h.read()
+
+    except OSError:
+        return None  # Let the import report the problem
+
+    if _RE_UI_HOOK.search(source):
+        return None
+
+    if _RE_LAZY.search(source):
+        manifest = _scan(source, loadfile)
+        if manifest and manifest.constants.get('LAZY'):
+            return manifest
+
+    if os.path.isfile(os.path.join(os.path.dirname(loadfile), '__init__.py')):
+        return None  # Other plugins may import it, so keep to the original order
+
+    return background.submit(_timed_import, name, loadfile)
+
+
+def timeline_report() -> str:
+    """
+    Format the startup timeline as a table.
+
+    :returns: The table.
+    """
+    lines = [f'{"Plugin":<24} {"Imported":<10} {"At ms":>8} {"Import ms":>10} {"Start ms":>9}']
+    for t in startup_timeline:
+        lines.append(
+            f'{t.name[:24]:<24} {t.how:<10} {t.start * 1000:>8.1f} {t.load * 1000:>10.1f} {t.start3 * 1000:>9.1f}'
+        )
+
+    return '\n'.join(lines)
+
+
 def load_plugins(master):
     """
     Find and load all plugins
     """
+    global _startup_time
+    _startup_time = perf_counter()
     last_error['root'] = master
+    set_profiling(bool(config.getint('plugin_profiling')), config.getint('plugin_slow_ms'))
 
     internal = []
     for name in sorted(os.listdir(config.internal_plugin_dir)):
@@ -187,28 +827,42 @@ def load_plugins(master):
     sys.path.append(config.plugin_dir)
 
     found = []
-    # Load any plugins that are also packages first
-    for name in sorted(os.listdir(config.plugin_dir),
-                       key = lambda n: (not os.path.isfile(os.path.join(config.plugin_dir, n, '__init__.py')), n.lower())):
-        if not os.path.isdir(os.path.join(config.plugin_dir, name)) or name[0] in ['.', '_']:
-            pass
-        elif name.endswith('.disabled'):
-            name, discard = name.rsplit('.', 1)
-            found.append(Plugin(name, None, logger))
-        else:
-            try:
-                # Add plugin's folder to load path in case plugin has internal package dependencies
-                sys.path.append(os.path.join(config.plugin_dir, name))
+    with ThreadPoolExecutor(1, thread_name_prefix='Plugin import') as background:
+        # Start any background imports, so that they run while other plugins are imported on the main thread
+        pending = []
+        # Load any plugins that are also packages first
+        for name in sorted(
+                os.listdir(config.plugin_dir),
+                key=lambda n: (not os.path.isfile(os.path.join(config.plugin_dir, n, '__init__.py')), n.lower())
+        ):
+            if not os.path.isdir(os.path.join(config.plugin_dir, name)) or name[0] in ['.', '_']:
+                pass
+            elif name.endswith('.disabled'):
+                name, discard = name.rsplit('.', 1)
+                pending.append((name, None, logger, None))
+            else:
+                try:
+                    # Add plugin's folder to load path in case plugin has internal package dependencies
+                    sys.path.append(os.path.join(config.plugin_dir, name))
+
+                    # Create a logger for this 'found' plugin.  Must be before the
+                    # load.py is loaded.
+                    plugin_logger = EDMCLogging.get_plugin_logger(f'{appname}.{name}')
 
-                # Create a logger for this 'found' plugin.  Must be before the
-                # load.py is loaded.
-                plugin_logger = EDMCLogging.get_plugin_logger(f'{appname}.{name}')
+                    loadfile = os.path.join(config.plugin_dir, name, 'load.py')
+                    pending.append((name, loadfile, plugin_logger, _how_to_load(name, loadfile, background)))
+                except Exception as e:
+                    logger.exception(f'Failure loading found Plugin "{name}"')
 
-                found.append(Plugin(name, os.path.join(config.plugin_dir, name, 'load.py'), plugin_logger))
+        for name, loadfile, plugin_logger, module in pending:
+            try:
+                found.append(Plugin(name, loadfile, plugin_logger, module))
             except Exception as e:
                 logger.exception(f'Failure loading found Plugin "{name}"')
                 pass
     PLUGINS.extend(sorted(found, key=lambda p: operator.attrgetter('name')(p).lower()))
+    rebuild_hooks()
+    logger.info(f'Loaded plugins in {(perf_counter() - _startup_time) * 1000:.0f}ms:\n{timeline_report()}')
 
 
 def provides(fn_name):
@@ -218,7 +872,7 @@ def provides(fn_name):
     :returns: list of names of plugins that provide this function
     .. versionadded:: 3.0.2
     """
-    return [p.name for p in PLUGINS if p._get_func(fn_name)]
+    return [p.name for p, _ in _hook(fn_name).plugins]
 
 def invoke(plugin_name, fallback, fn_name, *args):
     """
@@ -230,13 +884,90 @@ def invoke(plugin_name, fallback, fn_name, *args):
     :returns: return value from the function, or None if the function was not found
     .. versionadded:: 3.0.2
     """
-    for plugin in PLUGINS:
-        if plugin.name == plugin_name and plugin._get_func(fn_name):
-            return plugin._get_func(fn_name)(*args)
-    for plugin in PLUGINS:
-        if plugin.name == fallback:
-            assert plugin._get_func(fn_name), plugin.name	# fallback plugin should provide the function
-            return plugin._get_func(fn_name)(*args)
+    by_name = _hook(fn_name).by_name
+    func = by_name.get(plugin_name)
+    if not func and fallback is not None:
+        func = by_name.get(fallback)
+        # fallback plugin should provide the function
+        assert func or not any(p.name == fallback for p in PLUGINS), fallback
+
+    if func:
+        return func(*args)
+
+
+def _call(plugin: Plugin, hook: str, func: Callable, *args) -> Optional[str]:
+    """
+    Call one of a plugin's event hooks, on the plugin's worker thread if it has one.
+
+    :param plugin: The plugin.
+    :param hook: The name of the hook.
+    :param func: The plugin's function for the hook.
+    :param args: Its arguments.
+    :returns: Error message returned by the hook, if any.  Always None if called on the worker thread.
+    """
+    if plugin.worker:
+        plugin.worker.submit(hook, func, *args)
+        return None
+
+    timer = profiler  # In case profiling is turned on or off during the call
+    if timer:
+        start = perf_counter()
+
+    try:
+        return func(*args)
+
+    except Exception:
+        logger.exception(f'Plugin "{plugin.name}" failed')
+        return None
+
+    finally:
+        if timer:
+            timer.record(plugin.name, hook, perf_counter() - start)
+
+
+def _call_async(plugin: Plugin, hook: str, func: Callable, *args) -> None:
+    """
+    Start one of a plugin's async hooks on the shared event loop.
+
+    :param plugin: The plugin.
+    :param hook: The name of the hook.
+    :param func: The plugin's coroutine function for the hook.
+    :param args: Its arguments.
+    """
+    try:
+        coro = func(*args)
+
+    except Exception:
+        logger.exception(f'Plugin "{plugin.name}" failed')
+        return
+
+    if edmc_async.loop.stopping:
+        coro.close()
+        logger.debug(f'Not calling {hook} for plugin "{plugin.name}" while closing')
+        return
+
+    edmc_async.loop.submit(_await_hook(plugin, hook, coro))
+
+
+async def _await_hook(plugin: Plugin, hook: str, coro: Any) -> None:
+    """
+    Run one of a plugin's async hooks, on the shared event loop.
+
+    :param plugin: The plugin.
+    :param hook: The name of the hook.
+    :param coro: The coroutine returned by the hook.
+    """
+    timer = profiler
+    start = perf_counter()
+    try:
+        # Any error message is shown in the status line, via the <<PluginError>> event
+        show_error(await coro)
+
+    except Exception:
+        logger.exception(f'Plugin "{plugin.name}" failed')
+
+    if timer:
+        timer.record(plugin.name, hook, perf_counter() - start)
 
 
 def notify_stop():
@@ -245,15 +976,29 @@ def notify_stop():
     If your plugin uses threads then stop and join() them before returning.
     .. versionadded:: 2.3.7
     """
+    _watchdog_stop.set()
+    workers = [plugin.worker for plugin in PLUGINS if plugin.worker]
+    for worker in workers:
+        worker.stop()
+
+    deadline = monotonic() + PluginWorker.TIMEOUT
+    for worker in workers:
+        worker.join(deadline)
+
     error = None
-    for plugin in PLUGINS:
-        plugin_stop = plugin._get_func('plugin_stop')
-        if plugin_stop:
-            try:
-                newerror = plugin_stop()
-                error = error or newerror
-            except Exception as e:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+    for plugin, plugin_stop in _hook('plugin_stop').plugins:
+        if plugin.lazy:
+            continue  # Never used, so never loaded
+
+        try:
+            newerror = plugin_stop()
+            error = error or newerror
+        except Exception as e:
+            logger.exception(f'Plugin "{plugin.name}" failed')
+
+    # After plugin_stop, which may still use the loop, e.g. to flush what it has queued
+    edmc_async.loop.stop(PluginWorker.TIMEOUT)
+    save_profile()
     return error
 
 
@@ -264,13 +1009,11 @@ def notify_prefs_cmdr_changed(cmdr, is_beta):
     :param cmdr: current Cmdr name (or None).
     :param is_beta: whether the player is in a Beta universe.
     """
-    for plugin in PLUGINS:
-        prefs_cmdr_changed = plugin._get_func('prefs_cmdr_changed')
-        if prefs_cmdr_changed:
-            try:
-                prefs_cmdr_changed(cmdr, is_beta)
-            except Exception as e:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+    for plugin, prefs_cmdr_changed in _hook('prefs_cmdr_changed').plugins:
+        try:
+            prefs_cmdr_changed(cmdr, is_beta)
+        except Exception as e:
+            logger.exception(f'Plugin "{plugin.name}" failed')
 
 
 def notify_prefs_changed(cmdr, is_beta):
@@ -282,18 +1025,18 @@ def notify_prefs_changed(cmdr, is_beta):
     :param cmdr: current Cmdr name (or None).
     :param is_beta: whether the player is in a Beta universe.
     """
-    for plugin in PLUGINS:
-        prefs_changed = plugin._get_func('prefs_changed')
-        if prefs_changed:
-            try:
-                prefs_changed(cmdr, is_beta)
-            except Exception as e:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+    for plugin, prefs_changed in _hook('prefs_changed').plugins:
+        try:
+            prefs_changed(cmdr, is_beta)
+        except Exception as e:
+            logger.exception(f'Plugin "{plugin.name}" failed')
 
 
 def notify_journal_entry(cmdr, is_beta, system, station, entry, state):
     """
-    Send a journal entry to each plugin.
+    Send a journal entry to each plugin that wants it, except those that take batches of entries.
+
+    Plugins that implement `journal_entries` get the entry later, in a batch passed to notify_journal_entries().
     :param cmdr: The Cmdr name, or None if not yet known
     :param system: The current system, or None if not yet known
     :param station: The current station, or None if not docked or not yet known
@@ -303,15 +1046,45 @@ def notify_journal_entry(cmdr, is_beta, system, station, entry, state):
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        journal_entry = plugin._get_func('journal_entry')
-        if journal_entry:
-            try:
-                # Pass a copy of the journal entry in case the callee modifies it
-                newerror = journal_entry(cmdr, is_beta, system, station, dict(entry), dict(state))
+    for plugin, journal_entry in _journal_event_hook('journal_entry', entry['event']):
+        if plugin in _journal_batched:
+            continue
+
+        # Pass a copy of the journal entry in case the callee modifies it
+        newerror = _call(plugin, 'journal_entry', journal_entry, cmdr, is_beta, system, station, dict(entry), state)
+        error = error or newerror
+    for plugin, journal_entry_async in _journal_event_hook('journal_entry_async', entry['event']):
+        _call_async(
+            plugin, 'journal_entry_async', journal_entry_async, cmdr, is_beta, system, station, dict(entry), state
+        )
+    return error
+
+
+def notify_journal_entries(
+        cmdr: Optional[str], is_beta: bool,
+        batch: List[Tuple[Optional[str], Optional[str], Mapping[str, Any], Mapping[str, Any]]]
+) -> Optional[str]:
+    """
+    Send a batch of consecutive journal entries for the same Cmdr to each plugin that implements `journal_entries`.
+
+    Call this after notify_journal_entry() has been called for each of the entries, so that these plugins see entries
+    after the plugins that take them one at a time.  Plugins that declare `JOURNAL_EVENTS` only get the entries for
+    those events.
+    :param cmdr: The Cmdr name, or None if not yet known
+    :param is_beta: whether the player is in a Beta universe.
+    :param batch: (system, station, entry, state) as of each entry, in journal order
+    :returns: Error message from the first plugin that returns one (if any)
+    """
+    error = None
+    for plugin, func, batched in _journal_hook:
+        if batched:
+            events = plugin.journal_events
+            # Pass copies of the journal entries in case the callee modifies them. The state is read-only.
+            entries = [dict(entry) for _, _, entry, _ in batch if events is None or entry['event'] in events]
+            if entries:
+                newerror = _call(plugin, 'journal_entries', func, cmdr, is_beta, entries, batch[-1][3])
                 error = error or newerror
-            except Exception as e:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+
     return error
 
 
@@ -324,15 +1097,12 @@ def notify_dashboard_entry(cmdr, is_beta, entry):
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        status = plugin._get_func('dashboard_entry')
-        if status:
-            try:
-                # Pass a copy of the status entry in case the callee modifies it
-                newerror = status(cmdr, is_beta, dict(entry))
-                error = error or newerror
-            except Exception as e:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+    for plugin, status in _hook('dashboard_entry').plugins:
+        # Pass a copy of the status entry in case the callee modifies it
+        newerror = _call(plugin, 'dashboard_entry', status, cmdr, is_beta, dict(entry))
+        error = error or newerror
+    for plugin, dashboard_entry_async in _hook('dashboard_entry_async').plugins:
+        _call_async(plugin, 'dashboard_entry_async', dashboard_entry_async, cmdr, is_beta, dict(entry))
     return error
 
 
@@ -344,14 +1114,11 @@ def notify_newdata(data, is_beta):
     :returns: Error message from the first plugin that returns one (if any)
     """
     error = None
-    for plugin in PLUGINS:
-        cmdr_data = plugin._get_func('cmdr_data')
-        if cmdr_data:
-            try:
-                newerror = cmdr_data(data, is_beta)
-                error = error or newerror
-            except Exception as e:
-                logger.exception(f'Plugin "{plugin.name}" failed')
+    for plugin, cmdr_data in _hook('cmdr_data').plugins:
+        newerror = _call(plugin, 'cmdr_data', cmdr_data, data, is_beta)
+        error = error or newerror
+    for plugin, cmdr_data_async in _hook('cmdr_data_async').plugins:
+        _call_async(plugin, 'cmdr_data_async', cmdr_data_async, data, is_beta)
     return error
 
 
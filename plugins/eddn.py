@@ -1,25 +1,33 @@
 # Export to EDDN
 
+import asyncio
+import gzip
+import hashlib
 import itertools
-import json
 import logging
-import pathlib
+import os
 import re
 import sys
+import threading
 import tkinter as tk
-from collections import OrderedDict
-from os import SEEK_SET
-from os.path import exists, join
+from collections import OrderedDict, deque
+from concurrent.futures import Future
+from os.path import dirname, exists, join
 from platform import system
-from typing import TYPE_CHECKING, Any, AnyStr, Dict, Iterator, List, Mapping, MutableMapping, Optional
+from time import time
+from typing import TYPE_CHECKING, Any, AnyStr, BinaryIO, Callable, Deque, Dict, Iterator, List, Mapping, MutableMapping
+from typing import Optional
 from typing import OrderedDict as OrderedDictT
-from typing import Sequence, TextIO, Tuple, Union
+from typing import Sequence, Tuple, Union
 
 import requests
 
+import edmc_async
+import edmc_json
 import myNotebook as nb  # noqa: N813
 from companion import category_map
 from config import applongname, appname, appversion, config
+from monitor import monitor
 from myNotebook import Frame
 from prefs import prefsVersion
 from ttkHyperlinkLabel import HyperlinkLabel
@@ -41,14 +49,377 @@ this.systemaddress = None
 this.coordinates = None
 this.planet = None
 
-# Avoid duplicates
-this.marketId = None
-this.commodities = None
-this.outfitting: Optional[Tuple[bool, MutableMapping[str, Any]]] = None
-this.shipyard = None
-
 HORIZ_SKU = 'ELITE_HORIZONS_V_PLANETARY_LANDINGS'
 
+# The only journal events that journal_entry() looks at
+JOURNAL_EVENTS = {
+    'ApproachBody', 'CarrierJump', 'Docked', 'FSDJump', 'LeaveBody', 'Location', 'Market', 'Outfitting',
+    'SAASignalsFound', 'Scan', 'Shipyard', 'SupercruiseEntry',
+}
+
+
+class _Message:
+    """A message handed out by `ReplayLog.take()`."""
+
+    __slots__ = ('seq', 'line', 'segment', 'end', 'sent')
+
+    def __init__(self, seq: int, line: str, segment: int, end: int):
+        self.seq = seq
+        self.line = line
+        self.segment = segment  # Where it ends in the log
+        self.end = end
+        self.sent = False
+
+
+class ReplayLog:
+    """
+    Messages waiting to be sent to EDDN, kept on disk so that they survive restarts and crashes.
+
+    Messages are appended to numbered segment files in the 'replay' directory, and a pointer to the first message that
+    hasn't been sent is kept in the 'ack' file, so that neither adding nor sending a message rewrites the backlog.
+    Segments are deleted once all their messages have been sent.  A lock on the 'lock' file ensures that only one copy
+    of the app uses the directory.
+
+    Several messages can be sent at once: `take()` hands out messages in order, and they can be acknowledged with
+    `ack()` or `nack()` in any order, from any thread.  The pointer only moves past messages that have been sent, so
+    any that were being sent when the app stopped are sent again.
+    """
+
+    SEGMENT_SIZE = 1024 * 1024  # Start a new segment file once the last one is this big [bytes]
+    _RE_SEGMENT = re.compile(r'^(\d{10})\.jsonl$')
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._lock = threading.Lock()
+        self._lockfile: Optional[BinaryIO] = None
+        self._ackfile: Optional[BinaryIO] = None
+        self._ack_segment = 0  # Where the first message that hasn't been sent starts
+        self._ack_offset = 0
+        self._reader: Optional[BinaryIO] = None  # Reading the messages for take()
+        self._read_segment = 0
+        self._tail: Optional[BinaryIO] = None  # Appending to the last segment
+        self._tail_segment = 0
+        self._seq = itertools.count()
+        self._taken: Deque[_Message] = deque()  # Handed out by take(), in order, until they and those before are sent
+        self._outstanding: Dict[int, _Message] = {}  # Handed out by take() and not yet acknowledged, by seq
+        self._retry: Deque[_Message] = deque()  # Not sent, to be handed out again
+        self._count = 0  # Number of messages waiting
+
+    def __len__(self) -> int:
+        return self._count
+
+    def open(self) -> bool:
+        """
+        Lock the directory, moving any messages from an old 'replay.jsonl' into it, and find the messages to send.
+
+        :return: False if it couldn't be locked, e.g. because another copy of the app is running.
+        """
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._lockfile = open(join(self.directory, 'lock'), 'ab')
+            if sys.platform != 'win32':  # open for writing is automatically exclusive on Windows
+                lockf(self._lockfile, LOCK_EX | LOCK_NB)
+
+            self._migrate()
+
+        except Exception as e:
+            logger.debug(f'Failed opening "{self.directory}"', exc_info=e)
+            self.close()
+            return False
+
+        segments = self._segments()
+        try:
+            with open(join(self.directory, 'ack'), 'rb') as h:
+                head_segment, offset = (int(x) for x in h.read().split())
+
+        except Exception:
+            head_segment, offset = segments[0] if segments else 1, 0
+
+        if head_segment not in segments:
+            head_segment, offset = segments[0] if segments else head_segment, 0
+
+        for segment in segments:
+            if segment < head_segment:
+                os.remove(self._segment_path(segment))  # Crashed before it could be removed
+
+        self._tail_segment = max(segments[-1] if segments else 0, head_segment)
+        self._tail = open(self._segment_path(self._tail_segment), 'ab')
+        self._truncate_partial_line()
+
+        self._count = 0
+        for segment in range(head_segment, self._tail_segment + 1):
+            with open(self._segment_path(segment), 'rb') as h:
+                h.seek(offset if segment == head_segment else 0)
+                self._count += sum(1 for line in h if line.strip())
+
+        self._ackfile = open(join(self.directory, 'ack'), 'r+b' if exists(join(self.directory, 'ack')) else 'w+b')
+        self._ack_segment, self._ack_offset = head_segment, offset
+        self._write_ack()
+        self._open_reader(head_segment, offset)
+        return True
+
+    def close(self) -> None:
+        """Close the files, and release the lock."""
+        with self._lock:
+            for h in (self._reader, self._tail, self._ackfile, self._lockfile):
+                if h:
+                    h.close()
+
+            self._reader = self._tail = self._ackfile = self._lockfile = None
+
+    def append(self, line: str) -> None:
+        """
+        Add a message.
+
+        :param line: The message, as JSON.
+        """
+        with self._lock:
+            assert self._tail
+            if self._tail.tell() >= self.SEGMENT_SIZE:
+                self._tail.close()
+                self._tail_segment += 1
+                self._tail = open(self._segment_path(self._tail_segment), 'ab')
+
+            self._tail.write(line.encode('utf-8') + b'\n')
+            self._tail.flush()
+            self._count += 1
+
+    def take(self) -> Optional[Tuple[int, str]]:
+        """
+        Get the next message to send.  It stays in the log until acknowledged.
+
+        :return: (id for `ack()` or `nack()`, the message as JSON), or None if there are no more to send just now.
+        """
+        with self._lock:
+            if self._retry:
+                message = self._retry.popleft()
+                return message.seq, message.line
+
+            if not self._reader:
+                return None  # Closed
+
+            while True:
+                start = self._reader.tell()
+                line = self._reader.readline()
+                if line.strip() and line.endswith(b'\n'):
+                    break
+
+                elif line and not line.endswith(b'\n'):
+                    self._reader.seek(start)  # Still being written
+                    return None
+
+                elif not line:
+                    if self._read_segment >= self._tail_segment:
+                        return None
+
+                    self._open_reader(self._read_segment + 1, 0)
+
+            message = _Message(next(self._seq), line.decode('utf-8').strip(), self._read_segment, self._reader.tell())
+            self._taken.append(message)
+            self._outstanding[message.seq] = message
+            return message.seq, message.line
+
+    def ack(self, seq: int) -> None:
+        """
+        Remove a message, e.g. because it has been sent.
+
+        :param seq: The id from `take()`.
+        """
+        with self._lock:
+            message = self._outstanding.pop(seq, None)
+            if not message or not self._ackfile:
+                return  # Closed
+
+            message.sent = True
+            self._count -= 1
+            if not self._taken[0].sent:
+                return  # Still sending an earlier message
+
+            first_segment = self._ack_segment
+            while self._taken and self._taken[0].sent:
+                message = self._taken.popleft()
+                self._ack_segment, self._ack_offset = message.segment, message.end
+
+            self._write_ack()
+            for segment in range(first_segment, self._ack_segment):
+                os.remove(self._segment_path(segment))  # Finished with it
+
+    def nack(self, seq: int) -> None:
+        """
+        Keep a message to send again, e.g. because sending it failed.
+
+        :param seq: The id from `take()`.
+        """
+        with self._lock:
+            message = self._outstanding.get(seq)
+            if message:
+                self._retry.append(message)
+
+    def _open_reader(self, segment: int, offset: int) -> None:
+        if self._reader:
+            self._reader.close()
+
+        self._read_segment = segment
+        self._reader = open(self._segment_path(segment), 'rb')
+        self._reader.seek(offset)
+
+    def _write_ack(self) -> None:
+        # Fixed width, so that it can be overwritten in place
+        assert self._ackfile
+        self._ackfile.seek(0)
+        self._ackfile.write(f'{self._ack_segment:010d} {self._ack_offset:012d}\n'.encode('ascii'))
+        self._ackfile.flush()
+
+    def _segment_path(self, segment: int) -> str:
+        return join(self.directory, f'{segment:010d}.jsonl')
+
+    def _segments(self) -> List[int]:
+        return sorted(int(match.group(1)) for match in map(self._RE_SEGMENT.match, os.listdir(self.directory)) if match)
+
+    def _truncate_partial_line(self) -> None:
+        # Remove the end of a message that was being written when the app crashed
+        assert self._tail
+        size = self._tail.tell()
+        with open(self._segment_path(self._tail_segment), 'rb') as h:
+            end = h.read().rfind(b'\n') + 1
+
+        if end < size:
+            logger.warning(f'Removing partly written message from "{self._segment_path(self._tail_segment)}"')
+            self._tail.truncate(end)
+            self._tail.seek(end)
+
+    def _migrate(self) -> None:
+        # Move messages from 'replay.jsonl', used by earlier versions, to a new segment
+        filename = join(dirname(self.directory), 'replay.jsonl')
+        if not exists(filename):
+            return
+
+        with open(filename, 'r+b') as old:
+            if sys.platform != 'win32':
+                lockf(old, LOCK_EX | LOCK_NB)  # In case an earlier version is still running
+
+            lines = [line.strip() for line in old if line.strip()]
+            if lines:
+                segments = self._segments()
+                with open(self._segment_path(segments[-1] + 1 if segments else 1), 'wb') as new:
+                    new.write(b''.join(line + b'\n' for line in lines))
+                    new.flush()
+                    os.fsync(new.fileno())
+
+                logger.info(f'Moved {len(lines)} messages from "{filename}" to "{self.directory}"')
+
+        os.remove(filename)
+
+
+class SentCache:
+    """
+    What was last sent to EDDN for each station's market, outfitting and shipyard, so that unchanged data isn't sent
+    again, e.g. when trading between two stations.
+
+    Keeps a hash of the data sent for the SIZE most recently used stations, by MarketID.  Data is sent again once it's
+    older than 'eddn_dedup_ttl' seconds, or TTL by default, so that EDDN's listeners know it's still current.  Saved
+    shortly after each change, so that it survives a crash, and between runs.
+    """
+
+    SIZE = 256  # Max stations to remember
+    TTL = 3600  # Default time to remember what was sent [s]
+    SAVE_DELAY = 5000  # How long to wait after a change before saving, so that a burst of changes is saved once [ms]
+
+    def __init__(self, filename: Optional[str], after: Optional[Callable[[int, Callable], Any]] = None):
+        """
+        Load what was sent before.
+
+        :param filename: where to save it between runs, or None to not save it
+        :param after: schedules a call on the main thread, like tk's after(), for saving after a change. If None then
+            it's saved straight away
+        """
+        self.filename = filename
+        self.after = after
+        self._save_pending = False  # Whether a save has been scheduled
+        self.stations: OrderedDictT[int, Dict[str, Tuple[str, float]]] = OrderedDict()  # id -> kind -> (hash, time)
+        if filename:
+            try:
+                with open(filename, 'rb') as h:
+                    for market_id, kind, digest, when in edmc_json.load(h):
+                        self.stations.setdefault(market_id, {})[kind] = (digest, when)
+
+            except FileNotFoundError:
+                pass
+
+            except Exception as e:
+                logger.debug(f'Failed reading "{filename}"', exc_info=e)
+
+    @staticmethod
+    def digest(data: Any) -> str:
+        """
+        digest hashes data for comparison
+
+        :param data: the data to send
+        :return: the hash
+        """
+        return hashlib.sha1(edmc_json.dumpb(data)).hexdigest()
+
+    def unchanged(self, market_id: int, kind: str, data: Any) -> bool:
+        """
+        unchanged checks whether the same data was sent for this station recently
+
+        :param market_id: the station
+        :param kind: e.g. 'commodity'
+        :param data: the data to send
+        :return: True if it needn't be sent
+        """
+        sent = self.stations.get(market_id, {}).get(kind)
+        if not sent:
+            return False
+
+        self.stations.move_to_end(market_id)
+        return sent[0] == self.digest(data) and time() - sent[1] < (config.getint('eddn_dedup_ttl') or self.TTL)
+
+    def sent(self, market_id: int, kind: str, data: Any) -> None:
+        """
+        Remember that data was sent.
+
+        :param market_id: the station
+        :param kind: e.g. 'commodity'
+        :param data: the data sent
+        """
+        self.stations.setdefault(market_id, {})[kind] = (self.digest(data), time())
+        self.stations.move_to_end(market_id)
+        while len(self.stations) > self.SIZE:
+            self.stations.popitem(last=False)
+
+        if not self.filename:
+            return
+
+        if not self.after:
+            self.save()
+
+        elif not self._save_pending:
+            self._save_pending = True
+            self.after(self.SAVE_DELAY, self.save)
+
+    def save(self) -> None:
+        """Save it, without what's too old to be useful."""
+        self._save_pending = False
+        if not self.filename:
+            return
+
+        expiry = time() - (config.getint('eddn_dedup_ttl') or self.TTL)
+        try:
+            # Write then rename so a crash can't leave a truncated file behind
+            with open(f'{self.filename}.tmp', 'wb') as h:
+                h.write(edmc_json.dumpb([
+                    [market_id, kind, digest, when]
+                    for market_id, sent in self.stations.items()
+                    for kind, (digest, when) in sent.items()
+                    if when > expiry
+                ]))
+
+            os.replace(f'{self.filename}.tmp', self.filename)
+
+        except Exception as e:
+            logger.debug(f'Failed writing "{self.filename}"', exc_info=e)
+
 
 # TODO: a good few of these methods are static or could be classmethods. they should be created as such.
 
@@ -56,17 +427,29 @@ class EDDN:
     # SERVER = 'http://localhost:8081'	# testing
     SERVER = 'https://eddn.edcd.io:4430'
     UPLOAD = f'{SERVER}/upload/'
-    REPLAYPERIOD = 400  # Roughly two messages per second, accounting for send delays [ms]
-    REPLAYFLUSH = 20  # Update log on disk roughly every 10 seconds
+    COMPRESS_LEVEL = 6  # Default gzip level for uploads, 1-9. Can be overridden by 'eddn_compress_level'
+    COMPRESS_MIN = 512  # Smaller uploads aren't worth compressing [bytes]
+    CONCURRENCY = 4  # Default number of cached messages to send at once. Can be overridden by 'eddn_concurrency'
     TIMEOUT = 10  # requests timeout
     MODULE_RE = re.compile(r'^Hpt_|^Int_|Armour_', re.IGNORECASE)
     CANONICALISE_RE = re.compile(r'\$(.+)_name;')
+    # How the gateway describes a 400 for a body it couldn't decompress, rather than a message it rejected
+    UNDECODABLE_RE = re.compile(r'decod|encod|decompress|gzip|zlib|JSON parsing', re.IGNORECASE)
 
     def __init__(self, parent: tk.Tk):
         self.parent: tk.Tk = parent
         self.session = requests.Session()
-        self.replayfile: Optional[TextIO] = None  # For delayed messages
-        self.replaylog: List[str] = []
+        self.replaylog: Optional[ReplayLog] = None  # For delayed messages
+        self._replay_lock = threading.Lock()  # For the following
+        self._replay_sending = False  # Whether _send_replay() is running
+        self._replay_more = False  # Whether there may be new messages since _send_replay() last looked
+        self._replay_status_pending = False  # Whether there's a <<EDDNReplay>> event waiting to be handled
+        self._replay_error: Optional[str] = None  # Why sending stopped
+        self._replay_future: Optional[Future] = None  # The last _send_replay() started
+        self._replay_closing = False  # Set by close() to stop _send_replay() taking more messages
+        # To avoid sending duplicates
+        self.sent_cache = SentCache(join(config.app_dir, 'eddn_sent.json'), parent.after if parent else None)
+        self.gateway_gzip = True  # Whether EDDN accepts compressed uploads. Cleared if it only accepts uncompressed
 
     def load_journal_replay(self) -> bool:
         """
@@ -75,63 +458,126 @@ class EDDN:
         :return: a bool indicating success
         """
         # Try to obtain exclusive access to the journal cache
-        filename = join(config.app_dir, 'replay.jsonl')
-        try:
+        replaylog = ReplayLog(join(config.app_dir, 'replay'))
+        if not replaylog.open():
+            return False
+
+        self.replaylog = replaylog
+        return True
+
+    def close(self):
+        """
+        close stops sending cached messages, closes the replay log, and saves what was sent
+        """
+        self._replay_closing = True
+        if self._replay_future:
             try:
-                # Try to open existing file
-                self.replayfile = open(filename, 'r+', buffering=1)
+                self._replay_future.result(self.TIMEOUT + 1)  # Let the sends in progress finish, and be acked
 
-            except Exception:
-                if exists(filename):
-                    raise  # Couldn't open existing file
+            except Exception as e:
+                logger.debug('Failed waiting for background sending', exc_info=e)
 
-                else:
-                    self.replayfile = open(filename, 'w+', buffering=1)  # Create file
+        self.sent_cache.save()
+        if self.replaylog is not None:
+            self.replaylog.close()
 
-            if sys.platform != 'win32':  # open for writing is automatically exclusive on Windows
-                lockf(self.replayfile, LOCK_EX | LOCK_NB)
+        self.replaylog = None
 
-        except Exception as e:
-            logger.debug('Failed opening "replay.jsonl"', exc_info=e)
-            if self.replayfile:
-                self.replayfile.close()
+    def send(self, cmdr: str, msg: Mapping[str, Any]) -> None:
+        """
+        Send sends an update to EDDN
 
-            self.replayfile = None
-            return False
+        :param cmdr: the CMDR to use as the uploader ID
+        :param msg: the payload to send
+        """
+        data, headers = self.encode(cmdr, msg)
+        r = self.session.post(self.UPLOAD, data=data, headers=headers, timeout=self.TIMEOUT)
+        if headers and self.undecodable(r.status_code, r.text):
+            # A gateway that doesn't accept compressed uploads
+            data, headers = self.encode(cmdr, msg, compress=False)
+            r = self.session.post(self.UPLOAD, data=data, headers=headers, timeout=self.TIMEOUT)
+            if r.status_code == requests.codes.ok:
+                self.gzip_rejected()
 
-        self.replaylog = [line.strip() for line in self.replayfile]
-        return True
+        if r.status_code != requests.codes.ok:
+            logger.debug(f':\nStatus\t{r.status_code}URL\t{r.url}Headers\t{r.headers}Content:\n{r.text}')
 
-    def flush(self):
+        r.raise_for_status()
+
+    async def send_async(self, cmdr: str, msg: Mapping[str, Any]) -> None:
         """
-        flush flushes the replay file, clearing any data currently there that is not in the replaylog list
+        send_async sends an update to EDDN, on the shared event loop
+
+        :param cmdr: the CMDR to use as the uploader ID
+        :param msg: the payload to send
         """
-        self.replayfile.seek(0, SEEK_SET)
-        self.replayfile.truncate()
-        for line in self.replaylog:
-            self.replayfile.write(f'{line}\n')
+        data, headers = self.encode(cmdr, msg)
+        r = await edmc_async.http.post(self.UPLOAD, data=data, headers=headers, timeout=self.TIMEOUT)
+        if headers and self.undecodable(r.status, r.text):
+            # A gateway that doesn't accept compressed uploads
+            data, headers = self.encode(cmdr, msg, compress=False)
+            r = await edmc_async.http.post(self.UPLOAD, data=data, headers=headers, timeout=self.TIMEOUT)
+            if r.ok:
+                self.gzip_rejected()
+
+        if not r.ok:
+            logger.debug(f':\nStatus\t{r.status}URL\t{r.url}Headers\t{r.headers}Content:\n{r.text}')
 
-        self.replayfile.flush()
+        r.raise_for_status()
 
-    def close(self):
+    def encode(self, cmdr: str, msg: Mapping[str, Any], compress: bool = True) -> Tuple[bytes, Dict[str, str]]:
         """
-        close closes the replay file
+        encode makes the body of an upload, gzipped unless that's turned off or not worthwhile
+
+        :param cmdr: the CMDR to use as the uploader ID
+        :param msg: the payload to send
+        :param compress: whether to compress it if possible
+        :return: the body, and any extra headers it needs
         """
-        if self.replayfile:
-            self.replayfile.close()
+        data = edmc_json.dumpb(self.envelope(cmdr, msg))
+        if (
+            not compress or not self.gateway_gzip or len(data) < self.COMPRESS_MIN
+            or config.getint('eddn_no_compress')
+        ):
+            return data, {}
 
-        self.replayfile = None
+        level = min(max(config.getint('eddn_compress_level') or self.COMPRESS_LEVEL, 1), 9)
+        return gzip.compress(data, compresslevel=level, mtime=0), {'Content-Encoding': 'gzip'}
 
-    def send(self, cmdr: str, msg: Mapping[str, Any]) -> None:
+    def undecodable(self, status: int, text: str) -> bool:
         """
-        Send sends an update to EDDN
+        undecodable checks whether EDDN refused a compressed upload because it couldn't decompress it, rather than
+        because it rejected the message, which would be rejected uncompressed too
+
+        :param status: the response's HTTP status
+        :param text: the response's body
+        :return: True if it's worth sending again uncompressed
+        """
+        return status == requests.codes.unsupported_media_type or (
+            status == requests.codes.bad_request and bool(self.UNDECODABLE_RE.search(text))
+        )
+
+    def gzip_rejected(self) -> None:
+        """
+        gzip_rejected stops compressing uploads, because EDDN rejected a compressed upload but accepted it uncompressed
+        """
+        if self.gateway_gzip:
+            logger.info('EDDN doesn\'t accept compressed uploads, so sending them uncompressed')
+
+        self.gateway_gzip = False
+
+    @staticmethod
+    def envelope(cmdr: str, msg: Mapping[str, Any]) -> OrderedDictT[str, Any]:
+        """
+        envelope adds the EDDN header to a message
 
         :param cmdr: the CMDR to use as the uploader ID
         :param msg: the payload to send
+        :return: the message to upload
         """
         uploader_id = cmdr
 
-        to_send: OrderedDictT[str, str] = OrderedDict([
+        return OrderedDict([
             ('$schemaRef', msg['$schemaRef']),
             ('header', OrderedDict([
                 ('softwareName',    f'{applongname} [{system() if sys.platform != "darwin" else "Mac OS"}]'),
@@ -141,73 +587,130 @@ class EDDN:
             ('message', msg['message']),
         ])
 
-        r = self.session.post(self.UPLOAD, data=json.dumps(to_send), timeout=self.TIMEOUT)
-        if r.status_code != requests.codes.ok:
-            logger.debug(f':\nStatus\t{r.status_code}URL\t{r.url}Headers\t{r.headers}Content:\n{r.text}')
-
-        r.raise_for_status()
-
     def sendreplay(self) -> None:
         """
-        sendreplay updates EDDN with cached journal lines
+        sendreplay starts sending cached journal lines to EDDN in the background, if it isn't already
         """
-        if not self.replayfile:
+        if self.replaylog is None or self._replay_closing:
             return  # Probably closing app
 
+        with self._replay_lock:
+            self._replay_more = True
+            if self._replay_sending:
+                return  # It'll find the new lines
+
+            self._replay_sending = True
+            self._replay_error = None
+
+        self.replay_status()
+        self._replay_future = edmc_async.loop.submit(self._send_replay())
+
+    def replay_status(self, event=None) -> None:
+        """
+        replay_status shows progress sending cached journal lines. Must be called on the main thread
+        """
+        self._replay_status_pending = False
         status: Dict[str, Any] = self.parent.children['status']
+        pending = len(self.replaylog) if self.replaylog is not None else 0
+        if self._replay_error:
+            status['text'] = self._replay_error
 
-        if not self.replaylog:
+        elif not pending:
             status['text'] = ''
-            return
 
-        localized: str = _('Sending data to EDDN...')
-        if len(self.replaylog) == 1:
-            status['text'] = localized
+        elif pending == 1:
+            status['text'] = _('Sending data to EDDN...')
 
         else:
-            status['text'] = f'{localized.replace("...", "")} [{len(self.replaylog)}]'
+            status['text'] = f'{_("Sending data to EDDN...").replace("...", "")} [{pending}]'
+
+    @property
+    def _replay_stopping(self) -> bool:
+        # Whether _send_replay() should stop, because the plugin or the app is closing
+        return self._replay_closing or edmc_async.loop.stopping
+
+    def _notify_replay_status(self) -> None:
+        # Have the main thread update the status, unless it hasn't yet handled the last update or may be waiting for us
+        with self._replay_lock:
+            if self._replay_status_pending or self._replay_stopping:
+                return
+
+            self._replay_status_pending = True
 
-        self.parent.update_idletasks()
+        self.parent.event_generate('<<EDDNReplay>>', when='tail')
 
+    async def _send_replay(self) -> None:
+        # Runs on the shared event loop, until there's nothing left to send or sending fails
+        concurrency = min(max(config.getint('eddn_concurrency') or self.CONCURRENCY, 1), edmc_async.http.CONNECTIONS)
         try:
-            cmdr, msg = json.loads(self.replaylog[0], object_pairs_hook=OrderedDict)
+            while True:
+                with self._replay_lock:
+                    if not self._replay_more or self._replay_error or self._replay_stopping:
+                        self._replay_sending = False
+                        break
 
-        except json.JSONDecodeError as e:
-            # Couldn't decode - shouldn't happen!
-            logger.debug(f'\n{self.replaylog[0]}\n', exc_info=e)
-            # Discard and continue
-            self.replaylog.pop(0)
+                    self._replay_more = False
+
+                await asyncio.gather(*(self._replay_worker() for _ in range(concurrency)))
+
+        except BaseException:
+            with self._replay_lock:
+                self._replay_sending = False
+
+            raise
+
+        self._notify_replay_status()
+
+    async def _replay_worker(self) -> None:
+        # Send cached journal lines one at a time, alongside the other workers
+        replaylog = self.replaylog
+        while replaylog is not None and not self._replay_error and not self._replay_stopping:
+            item = replaylog.take()
+            if not item:
+                return  # Nothing more to send just now
+
+            seq, line = item
+            try:
+                cmdr, msg = edmc_json.loads(line)
+                schema = msg['$schemaRef']
+
+            except (ValueError, KeyError, TypeError) as e:
+                # Couldn't decode - shouldn't happen!
+                logger.debug(f'\n{line}\n', exc_info=e)
+                # Discard and continue
+                replaylog.ack(seq)
+                continue
 
-        else:
             # Rewrite old schema name
-            if msg['$schemaRef'].startswith('http://schemas.elite-markets.net/eddn/'):
+            if schema.startswith('http://schemas.elite-markets.net/eddn/'):
                 msg['$schemaRef'] = str(msg['$schemaRef']).replace(
                     'http://schemas.elite-markets.net/eddn/',
                     'https://eddn.edcd.io/schemas/'
                 )
 
             try:
-                self.send(cmdr, msg)
-                self.replaylog.pop(0)
-                if not len(self.replaylog) % self.REPLAYFLUSH:
-                    self.flush()
-
-            except requests.exceptions.RequestException as e:
-                logger.debug('Failed sending', exc_info=e)
-                status['text'] = _("Error: Can't connect to EDDN")
-                return  # stop sending
+                await self.send_async(cmdr, msg)
 
             except Exception as e:
                 logger.debug('Failed sending', exc_info=e)
-                status['text'] = str(e)
+                replaylog.nack(seq)
+                if isinstance(e, (edmc_async.HTTPError, requests.exceptions.RequestException, OSError,
+                                  asyncio.TimeoutError)):
+                    self._replay_error = _("Error: Can't connect to EDDN")
+
+                else:
+                    self._replay_error = str(e)
+
+                self._notify_replay_status()
                 return  # stop sending
 
-        self.parent.after(self.REPLAYPERIOD, self.sendreplay)
+            replaylog.ack(seq)
+            self._notify_replay_status()
 
     def export_commodities(self, data: Mapping[str, Any], is_beta: bool) -> None:
         """
         export_commodities updates EDDN with the commodities on the current (lastStarport) station.
-        Once the send is complete, this.commodities is updated with the new data.
+        Not sent if unchanged since last sent for this station, see SentCache.
 
         :param data: a dict containing the starport data
         :param is_beta: whether or not we're currently in beta mode
@@ -233,7 +736,9 @@ class EDDN:
 
         commodities.sort(key=lambda c: c['name'])
 
-        if commodities and this.commodities != commodities:  # Don't send empty commodities list - schema won't allow it
+        market_id = data['lastStarport']['id']
+        # Don't send empty commodities list - schema won't allow it
+        if commodities and not self.sent_cache.unchanged(market_id, 'commodity', commodities):
             message: OrderedDictT[str, Any] = OrderedDict([
                 ('timestamp',   data['timestamp']),
                 ('systemName',  data['lastSystem']['name']),
@@ -254,13 +759,12 @@ class EDDN:
                 '$schemaRef': f'https://eddn.edcd.io/schemas/commodity/3{"/test" if is_beta else ""}',
                 'message':    message,
             })
-
-        this.commodities = commodities
+            self.sent_cache.sent(market_id, 'commodity', commodities)
 
     def export_outfitting(self, data: Mapping[str, Any], is_beta: bool) -> None:
         """
         export_outfitting updates EDDN with the current (lastStarport) station's outfitting options, if any.
-        Once the send is complete, this.outfitting is updated with the given data.
+        Not sent if unchanged since last sent for this station, see SentCache.
 
         :param data: dict containing the outfitting data
         :param is_beta: whether or not we're currently in beta mode
@@ -285,7 +789,8 @@ class EDDN:
             self.MODULE_RE.sub(lambda match: match.group(0).capitalize(), mod['name'].lower()) for mod in to_search
         )
         # Don't send empty modules list - schema won't allow it
-        if outfitting and this.outfitting != (horizons, outfitting):
+        market_id = data['lastStarport']['id']
+        if outfitting and not self.sent_cache.unchanged(market_id, 'outfitting', [horizons, outfitting]):
             self.send(data['commander']['name'], {
                 '$schemaRef': f'https://eddn.edcd.io/schemas/outfitting/2{"/test" if is_beta else ""}',
                 'message': OrderedDict([
@@ -297,13 +802,12 @@ class EDDN:
                     ('modules',     outfitting),
                 ]),
             })
-
-        this.outfitting = (horizons, outfitting)
+            self.sent_cache.sent(market_id, 'outfitting', [horizons, outfitting])
 
     def export_shipyard(self, data: Dict[str, Any], is_beta: bool) -> None:
         """
         export_shipyard updates EDDN with the current (lastStarport) station's outfitting options, if any.
-        once the send is complete, this.shipyard is updated to the new data.
+        Not sent if unchanged since last sent for this station, see SentCache.
 
         :param data: dict containing the shipyard data
         :param is_beta: whether or not we are in beta mode
@@ -322,7 +826,8 @@ class EDDN:
             )
         )
         # Don't send empty ships list - shipyard data is only guaranteed present if user has visited the shipyard.
-        if shipyard and this.shipyard != (horizons, shipyard):
+        market_id = data['lastStarport']['id']
+        if shipyard and not self.sent_cache.unchanged(market_id, 'shipyard', [horizons, shipyard]):
             self.send(data['commander']['name'], {
                 '$schemaRef': f'https://eddn.edcd.io/schemas/shipyard/2{"/test" if is_beta else ""}',
                 'message': OrderedDict([
@@ -334,13 +839,12 @@ class EDDN:
                     ('ships',       shipyard),
                 ]),
             })
-
-        this.shipyard = (horizons, shipyard)
+            self.sent_cache.sent(market_id, 'shipyard', [horizons, shipyard])
 
     def export_journal_commodities(self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]) -> None:
         """
         export_journal_commodities updates EDDN with the commodities list on the current station (lastStarport) from
-        data in the journal. As a side effect, it also updates this.commodities with the data
+        data in the journal, if it has changed since last sent for this station
 
         :param cmdr: The commander to send data under
         :param is_beta: whether or not we're in beta mode
@@ -358,7 +862,8 @@ class EDDN:
             ('demandBracket', commodity['DemandBracket']),
         ]) for commodity in items), key=lambda c: c['name'])
 
-        if commodities and this.commodities != commodities:  # Don't send empty commodities list - schema won't allow it
+        # Don't send empty commodities list - schema won't allow it
+        if commodities and not self.sent_cache.unchanged(entry['MarketID'], 'commodity', commodities):
             self.send(cmdr, {
                 '$schemaRef': f'https://eddn.edcd.io/schemas/commodity/3{"/test" if is_beta else ""}',
                 'message': OrderedDict([
@@ -369,13 +874,12 @@ class EDDN:
                     ('commodities', commodities),
                 ]),
             })
-
-        this.commodities: OrderedDictT[str, Any] = commodities
+            self.sent_cache.sent(entry['MarketID'], 'commodity', commodities)
 
     def export_journal_outfitting(self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]) -> None:
         """
-        export_journal_outfitting updates EDDN with station outfitting based on a journal entry. As a side effect,
-        it also updates this.outfitting with the data
+        export_journal_outfitting updates EDDN with station outfitting based on a journal entry, if it has changed
+        since last sent for this station
 
         :param cmdr: The commander to send data under
         :param is_beta: Whether or not we're in beta mode
@@ -390,7 +894,7 @@ class EDDN:
             filter(lambda m: m['Name'] != 'int_planetapproachsuite', modules)
         )
         # Don't send empty modules list - schema won't allow it
-        if outfitting and this.outfitting != (horizons, outfitting):
+        if outfitting and not self.sent_cache.unchanged(entry['MarketID'], 'outfitting', [horizons, outfitting]):
             self.send(cmdr, {
                 '$schemaRef': f'https://eddn.edcd.io/schemas/outfitting/2{"/test" if is_beta else ""}',
                 'message': OrderedDict([
@@ -402,13 +906,12 @@ class EDDN:
                     ('modules',     outfitting),
                 ]),
             })
-
-        this.outfitting = (horizons, outfitting)
+            self.sent_cache.sent(entry['MarketID'], 'outfitting', [horizons, outfitting])
 
     def export_journal_shipyard(self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]) -> None:
         """
-        export_journal_shipyard updates EDDN with station shipyard data based on a journal entry. As a side effect,
-        this.shipyard is updated with the data.
+        export_journal_shipyard updates EDDN with station shipyard data based on a journal entry, if it has changed
+        since last sent for this station
 
         :param cmdr: the commander to send this update under
         :param is_beta: Whether or not we're in beta mode
@@ -418,7 +921,7 @@ class EDDN:
         horizons: bool = entry.get('Horizons', False)
         shipyard = sorted(ship['ShipType'] for ship in ships)
         # Don't send empty ships list - shipyard data is only guaranteed present if user has visited the shipyard.
-        if shipyard and this.shipyard != (horizons, shipyard):
+        if shipyard and not self.sent_cache.unchanged(entry['MarketID'], 'shipyard', [horizons, shipyard]):
             self.send(cmdr, {
                 '$schemaRef': f'https://eddn.edcd.io/schemas/shipyard/2{"/test" if is_beta else ""}',
                 'message': OrderedDict([
@@ -430,8 +933,7 @@ class EDDN:
                     ('ships',       shipyard),
                 ]),
             })
-
-        this.shipyard = (horizons, shipyard)
+            self.sent_cache.sent(entry['MarketID'], 'shipyard', [horizons, shipyard])
 
     def export_journal_entry(self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]) -> None:
         """
@@ -447,16 +949,15 @@ class EDDN:
             'message': entry
         }
 
-        if self.replayfile or self.load_journal_replay():
+        if self.replaylog is not None or self.load_journal_replay():
             # Store the entry
-            self.replaylog.append(json.dumps([cmdr, msg]))
-            self.replayfile.write(f'{self.replaylog[-1]}\n')
+            self.replaylog.append(edmc_json.dumps([cmdr, msg]))
 
             if (
                 entry['event'] == 'Docked' or (entry['event'] == 'Location' and entry['Docked']) or not
                 (config.getint('output') & config.OUT_SYS_DELAY)
             ):
-                self.parent.after(self.REPLAYPERIOD, self.sendreplay)  # Try to send this and previous entries
+                self.sendreplay()  # Try to send this and previous entries
 
         else:
             # Can't access replay file! Send immediately.
@@ -480,6 +981,7 @@ def plugin_start3(plugin_dir: str) -> str:
 def plugin_app(parent: tk.Tk) -> None:
     this.parent = parent
     this.eddn = EDDN(parent)
+    parent.bind_all('<<EDDNReplay>>', this.eddn.replay_status)
     # Try to obtain exclusive lock on journal cache, even if we don't need it yet
     if not this.eddn.load_journal_replay():
         # Shouldn't happen - don't bother localizing
@@ -534,13 +1036,23 @@ def plugin_prefs(parent, cmdr: str, is_beta: bool) -> Frame:
     )
     this.eddn_delay_button.grid(padx=BUTTONX, sticky=tk.W)
 
+    this.eddn_compress = tk.IntVar(value=not config.getint('eddn_no_compress'))
+    this.eddn_compress_button = nb.Checkbutton(
+        eddnframe,
+        text=_('Compress data sent to the Elite Dangerous Data Network'),
+        variable=this.eddn_compress
+    )  # Output setting
+    this.eddn_compress_button.grid(padx=BUTTONX, pady=(5, 0), sticky=tk.W)
+
     return eddnframe
 
 
 def prefsvarchanged(event=None) -> None:
     this.eddn_station_button['state'] = tk.NORMAL
     this.eddn_system_button['state'] = tk.NORMAL
-    this.eddn_delay_button['state'] = this.eddn.replayfile and this.eddn_system.get() and tk.NORMAL or tk.DISABLED
+    this.eddn_delay_button['state'] = (
+        this.eddn.replaylog is not None and this.eddn_system.get() and tk.NORMAL or tk.DISABLED
+    )
 
 
 def prefs_changed(cmdr: str, is_beta: bool) -> None:
@@ -551,6 +1063,7 @@ def prefs_changed(cmdr: str, is_beta: bool) -> None:
         (this.eddn_system.get() and config.OUT_SYS_EDDN) +
         (this.eddn_delay.get() and config.OUT_SYS_DELAY)
     )
+    config.set('eddn_no_compress', int(not this.eddn_compress.get()))
 
 
 def plugin_stop() -> None:
@@ -673,21 +1186,19 @@ def journal_entry(
             entry['event'] in ('Market', 'Outfitting', 'Shipyard')):
 
         try:
-            if this.marketId != entry['MarketID']:
-                this.commodities = this.outfitting = this.shipyard = None
-                this.marketId = entry['MarketID']
+            # From the journal directory that the entry came from. Shared with other plugins, so only read once.
+            side_file = monitor.side_file(entry, state['Source'])
+            if not side_file:
+                logger.debug(f'No {entry["event"]}.json for {state["Source"] or "the journal"}')
 
-            path = pathlib.Path(str(config.get('journaldir') or config.default_journal_dir)) / f'{entry["event"]}.json'
-            with path.open('rb') as f:
-                entry = json.load(f)
-                if entry['event'] == 'Market':
-                    this.eddn.export_journal_commodities(cmdr, is_beta, entry)
+            elif side_file['event'] == 'Market':
+                this.eddn.export_journal_commodities(cmdr, is_beta, side_file)
 
-                elif entry['event'] == 'Outfitting':
-                    this.eddn.export_journal_outfitting(cmdr, is_beta, entry)
+            elif side_file['event'] == 'Outfitting':
+                this.eddn.export_journal_outfitting(cmdr, is_beta, side_file)
 
-                elif entry['event'] == 'Shipyard':
-                    this.eddn.export_journal_shipyard(cmdr, is_beta, entry)
+            elif side_file['event'] == 'Shipyard':
+                this.eddn.export_journal_shipyard(cmdr, is_beta, side_file)
 
         except requests.exceptions.RequestException as e:
             logger.debug(f'Failed exporting {entry["event"]}', exc_info=e)
@@ -701,10 +1212,6 @@ def journal_entry(
 def cmdr_data(data: Mapping[str, Any], is_beta: bool) -> str:
     if data['commander'].get('docked') and config.getint('output') & config.OUT_MKT_EDDN:
         try:
-            if this.marketId != data['lastStarport']['id']:
-                this.commodities = this.outfitting = this.shipyard = None
-                this.marketId = data['lastStarport']['id']
-
             status = this.parent.children['status']
             old_status = status['text']
             if not old_status:
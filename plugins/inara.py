@@ -19,6 +19,7 @@ from typing import Sequence, Union
 
 import requests
 
+import edmc_json
 import myNotebook as nb  # noqa: N813
 import plug
 import timeout_session
@@ -1225,7 +1226,7 @@ def send_data(url: str, data: Mapping[str, Any]) -> bool:
     :param data: the data to POST
     :return: success state
     """
-    r = this.session.post(url, data=json.dumps(data, separators=(',', ':')), timeout=_TIMEOUT)
+    r = this.session.post(url, data=edmc_json.dumpb(data), timeout=_TIMEOUT)
     r.raise_for_status()
     reply = r.json()
     status = reply['header']['eventStatus']
@@ -1241,7 +1242,7 @@ def send_data(url: str, data: Mapping[str, Any]) -> bool:
         for data_event, reply_event in zip(data['events'], reply['events']):
             if reply_event['eventStatus'] != 200:
                 logger.warning(f'Inara\t{status} {reply_event.get("eventStatusText", "")}')
-                logger.debug(f'JSON data:\n{json.dumps(data_event)}')
+                logger.debug(f'JSON data:\n{edmc_json.dumps(data_event)}')
                 if reply_event['eventStatus'] // 100 != 2:
                     plug.show_error(_('Error: Inara {MSG}').format(
                         MSG=f'{data_event["eventName"]},'
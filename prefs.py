@@ -206,7 +206,7 @@ class PreferencesDialog(tk.Toplevel):
 
         # build plugin prefs tabs
         for plugin in plug.PLUGINS:
-            plugframe = plugin.get_prefs(notebook, monitor.cmdr, monitor.is_beta)
+            plugframe = plugin.get_prefs(notebook, monitor.snapshot['cmdr'], monitor.snapshot['is_beta'])
             if plugframe:
                 notebook.add(plugframe, text=plugin.name)
 
@@ -259,6 +259,11 @@ class PreferencesDialog(tk.Toplevel):
         self.disable_autoappupdatecheckingame_btn = nb.Checkbutton(configframe, text=_('Disable Automatic Application Updates Check when in-game'), variable=self.disable_autoappupdatecheckingame, command=self.disable_autoappupdatecheckingame_changed)
         self.disable_autoappupdatecheckingame_btn.grid(columnspan=4, padx=PADX, sticky=tk.W)
 
+        # Option to index journal events for plugins and EDMC.py to query
+        self.journal_index = tk.IntVar(value = config.getint('journal_index'))
+        self.journal_index_btn = nb.Checkbutton(configframe, text=_('Keep a searchable index of journal events'), variable=self.journal_index)
+        self.journal_index_btn.grid(columnspan=4, padx=PADX, sticky=tk.W)
+
 
         ttk.Separator(configframe, orient=tk.HORIZONTAL).grid(columnspan=4, padx=PADX, pady=PADY*4, sticky=tk.EW)
         nb.Label(configframe, text=_('Preferred websites')).grid(row=30, columnspan=4, padx=PADX, sticky=tk.W)	# Settings prompt for preferred ship loadout, system and station info websites
@@ -346,7 +351,16 @@ class PreferencesDialog(tk.Toplevel):
         nb.Label(plugsframe, text=_("Tip: You can disable a plugin by{CR}adding '{EXT}' to its folder name").format(EXT='.disabled')).grid(	# Help text in settings
             columnspan=2, padx=PADX, pady=10, sticky=tk.NSEW)
 
-        enabled_plugins = [x for x in plug.PLUGINS if x.folder and x.module]
+        self.plugin_profiling = tk.IntVar(value = config.getint('plugin_profiling'))
+        nb.Checkbutton(plugsframe, text=_('Time plugins'), variable=self.plugin_profiling).grid(columnspan=2, padx=PADX, sticky=tk.W)	# Settings checkbox
+        nb.Label(plugsframe, text=_('Log plugin calls slower than (ms)')+':').grid(padx=PADX*2, sticky=tk.W)	# Settings label, for a number of milliseconds
+        self.plugin_slow_ms = tk.StringVar(value = str(config.getint('plugin_slow_ms') or plug.PROFILE_SLOW_MS))
+        row = plugsframe.grid_size()[1] - 1
+        nb.Entry(plugsframe, textvariable=self.plugin_slow_ms, width=6, justify=tk.RIGHT).grid(row=row, column=1, padx=(0,PADX), sticky=tk.W)
+        nb.Button(plugsframe, text=_('Show timings'), command=self.plugin_profile_show,	# Button that opens a report of plugin timings
+                  state=tk.NORMAL if plug.profiler else tk.DISABLED).grid(columnspan=2, padx=PADX*2, pady=PADY, sticky=tk.W)
+
+        enabled_plugins = [x for x in plug.PLUGINS if x.folder and (x.module or x.lazy)]
         if len(enabled_plugins):
             ttk.Separator(plugsframe, orient=tk.HORIZONTAL).grid(columnspan=3, padx=PADX, pady=PADY * 8, sticky=tk.EW)
             nb.Label(plugsframe, text=_('Enabled Plugins')+':').grid(padx=PADX, sticky=tk.W)	# List of plugins in settings
@@ -373,7 +387,7 @@ class PreferencesDialog(tk.Toplevel):
             ).grid(columnspan=2, padx=PADX, sticky=tk.W)
         ############################################################
 
-        disabled_plugins = [x for x in plug.PLUGINS if x.folder and not x.module]
+        disabled_plugins = [x for x in plug.PLUGINS if x.folder and not (x.module or x.lazy)]
         if len(disabled_plugins):
             ttk.Separator(plugsframe, orient=tk.HORIZONTAL).grid(columnspan=3, padx=PADX, pady=PADY * 8, sticky=tk.EW)
             nb.Label(plugsframe, text=_('Disabled Plugins')+':').grid(padx=PADX, sticky=tk.W)	# List of plugins in settings
@@ -416,13 +430,26 @@ class PreferencesDialog(tk.Toplevel):
                                             0x10000, None, position):
                 self.geometry("+%d+%d" % (position.left, position.top))
 
+    def plugin_profile_show(self):
+        if not plug.profiler:
+            return
+
+        filename = join(config.app_dir, 'plugin_stats.txt')
+        with open(filename, 'w', encoding='utf-8') as h:
+            h.write(plug.profile_report(plug.profiler.summary()) + '\n\n')
+            h.write(plug.timeline_report() + '\n')
+
+        plug.save_profile()
+        webbrowser.open('file:///%s' % filename)
+
     def cmdrchanged(self, event=None):
-        if self.cmdr != monitor.cmdr or self.is_beta != monitor.is_beta:
+        cmdr, is_beta = monitor.snapshot['cmdr'], monitor.snapshot['is_beta']
+        if self.cmdr != cmdr or self.is_beta != is_beta:
             # Cmdr has changed - update settings
             if self.cmdr is not False:		# Don't notify on first run
-                plug.notify_prefs_cmdr_changed(monitor.cmdr, monitor.is_beta)
-            self.cmdr = monitor.cmdr
-            self.is_beta = monitor.is_beta
+                plug.notify_prefs_cmdr_changed(cmdr, is_beta)
+            self.cmdr = cmdr
+            self.is_beta = is_beta
 
         # Poll
         self.cmdrchanged_alarm = self.after(1000, self.cmdrchanged)
@@ -603,6 +630,13 @@ class PreferencesDialog(tk.Toplevel):
             config.set('hotkey_mods', self.hotkey_mods)
             config.set('hotkey_always', int(not self.hotkey_only.get()))
             config.set('hotkey_mute', int(not self.hotkey_play.get()))
+        config.set('journal_index', self.journal_index.get())
+        try:
+            config.set('plugin_slow_ms', max(int(self.plugin_slow_ms.get()), 0))
+        except ValueError:
+            pass
+        config.set('plugin_profiling', self.plugin_profiling.get())
+        plug.set_profiling(bool(self.plugin_profiling.get()), config.getint('plugin_slow_ms'))
         config.set('shipyard_provider', self.shipyard_provider.get())
         config.set('system_provider', self.system_provider.get())
         config.set('station_provider', self.station_provider.get())
@@ -620,7 +654,7 @@ class PreferencesDialog(tk.Toplevel):
         # Notify
         if self.callback:
             self.callback()
-        plug.notify_prefs_changed(monitor.cmdr, monitor.is_beta)
+        plug.notify_prefs_changed(monitor.snapshot['cmdr'], monitor.snapshot['is_beta'])
 
         self._destroy()
 
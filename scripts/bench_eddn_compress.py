@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Measure how much gzipping EDDN uploads saves on the wire, and what it costs in CPU time, for each type of message.
+
+Usage: python scripts/bench_eddn_compress.py [--journal FILE_OR_DIR] [--level N ...]
+
+Messages are made by the EDDN plugin from the same synthetic data as benchmarks.py, or from a real journal.  Sizes are
+the average upload body per message, and times the best of REPEAT runs per message, for encoding the body as JSON and
+for compressing it.  Uploads smaller than EDDN.COMPRESS_MIN are sent uncompressed, whatever the level.
+"""
+
+import argparse
+import gzip
+import sys
+from collections import defaultdict
+from os.path import dirname
+from timeit import repeat
+from typing import Any, Dict, List, Mapping, Tuple
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import benchmarks  # noqa: E402 # Also sets up the paths and imports the EDDN plugin
+import companion  # noqa: E402
+import edmc_json  # noqa: E402
+import headless  # noqa: E402
+import outfitting  # noqa: E402
+from benchmarks import eddn  # noqa: E402
+from config import config  # noqa: E402
+
+REPEAT = 5
+
+
+class Capture(eddn.EDDN):
+    """Makes the messages, but keeps them instead of sending them."""
+
+    def __init__(self):
+        super().__init__(headless.HeadlessWidget(headless.Scheduler(), 'frame'))
+        self.sent_cache = eddn.SentCache(None)  # Not the user's
+        self.messages: Dict[str, List[Tuple[str, Mapping[str, Any]]]] = defaultdict(list)  # type -> (cmdr, msg)
+
+    def send(self, cmdr: str, msg: Mapping[str, Any]) -> None:
+        """Keep a message, by its schema, or event for journal messages."""
+        schema = msg['$schemaRef'].split('/')[-2]
+        self.messages[msg['message']['event'] if schema == 'journal' else schema].append((cmdr, msg))
+
+    def export_journal_entry(self, cmdr: str, is_beta: bool, entry: Mapping[str, Any]) -> None:
+        """Keep a journal message, rather than queueing it."""
+        self.send(cmdr, {'$schemaRef': 'https://eddn.edcd.io/schemas/journal/1', 'message': entry})
+
+
+def station_data(market: Dict[str, Any]) -> Dict[str, Any]:
+    """Add modules and ships to a cAPI market, so that it makes all three kinds of station message."""
+    outfitting.lookup({'id': 1, 'name': 'Int_Engine_Size2_Class1'}, companion.ship_map)  # Load moduledata
+    symbols = sorted(s for s in outfitting.moduledata if eddn.EDDN.MODULE_RE.search(s))
+    data = companion.fixup(market)
+    data['lastStarport']['modules'] = {str(i): {'id': i, 'name': s} for i, s in enumerate(symbols[:250])}
+    data['lastStarport']['ships'] = {
+        'shipyard_list': {name: {'id': i, 'name': name} for i, name in enumerate(sorted(companion.ship_map)[:20])},
+        'unavailable_list': [],
+    }
+    return data
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Measure the size and CPU cost of compressed EDDN uploads.')
+    parser.add_argument('--journal', metavar='FILE_OR_DIR', help='use this journal instead of a synthetic one')
+    parser.add_argument('--level', metavar='N', type=int, action='append', choices=range(1, 10),
+                        help=f'gzip level - can be repeated (default 1, {eddn.EDDN.COMPRESS_LEVEL} and 9)')
+    args = parser.parse_args()
+    levels = args.level or sorted({1, eddn.EDDN.COMPRESS_LEVEL, 9})
+
+    capture = Capture()
+    eddn.this.eddn = capture
+    lines = benchmarks.journal_lines(args.journal) if args.journal else benchmarks.synthetic_journal(2000)
+    parser_ = benchmarks.EDLogs()
+    with benchmarks.settings(output=config.OUT_SYS_EDDN):
+        for line in lines:
+            entry = parser_.parse_entry(line)
+            if entry['event']:
+                eddn.journal_entry('Bench', False, parser_.system, parser_.station, entry, parser_.state)
+
+    data = station_data(benchmarks.synthetic_market())
+    capture.export_commodities(data, False)
+    capture.export_outfitting(data, False)
+    capture.export_shipyard(data, False)
+
+    print(f'{"Message":<16} {"Count":>6} {"Bytes":>7} {"JSON us":>8}', end='')
+    for level in levels:
+        print(f' {f"gzip {level} bytes":>13} {"us":>7}', end='')
+
+    print()
+    total: Dict[Any, int] = defaultdict(int)
+    for name, messages in sorted(capture.messages.items(), key=lambda x: -len(x[1])):
+        bodies = [edmc_json.dumpb(capture.envelope(cmdr, msg)) for cmdr, msg in messages]
+        size = sum(map(len, bodies))
+        encode = min(repeat(
+            lambda: [edmc_json.dumpb(capture.envelope(cmdr, msg)) for cmdr, msg in messages], number=1, repeat=REPEAT
+        ))
+        total[None] += size
+        count = len(messages)
+        print(f'{name:<16} {count:>6} {size / count:>7.0f} {encode / count * 1e6:>8.1f}', end='')
+        for level in levels:
+            compressed = sum(len(gzip.compress(body, level, mtime=0)) for body in bodies)
+            took = min(repeat(
+                lambda: [gzip.compress(body, level, mtime=0) for body in bodies], number=1, repeat=REPEAT
+            ))
+            total[level] += compressed
+            print(f' {compressed / count:>7.0f} {compressed / size:>5.0%} {took / count * 1e6:>7.1f}', end='')
+
+        print()
+
+    print(f'{"All, total":<24} {total[None]:>7} {"":>8}', end='')
+    for level in levels:
+        print(f' {total[level]:>7} {total[level] / total[None]:>5.0%} {"":>7}', end='')
+
+    print()
+
+
+if __name__ == '__main__':
+    main()
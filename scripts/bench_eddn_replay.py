@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""
+Time how fast the EDDN plugin drains a backlog of cached journal messages, against a local stand-in for the gateway.
+
+Usage: python scripts/bench_eddn_replay.py [--messages N] [--latency MS] [--concurrency N ...] [--serial]
+
+The stand-in gateway accepts every upload after a fixed delay, to stand for the round trip to the real one.  --serial
+also times the previous way of sending, one message per 400ms main loop tick, which takes a while.
+"""
+
+import argparse
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from os.path import dirname, join
+from time import perf_counter, sleep
+from typing import List
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import l10n  # noqa: E402
+l10n.Translations.install_dummy()
+
+import edmc_async  # noqa: E402
+import edmc_json  # noqa: E402
+import headless  # noqa: E402
+from config import config  # noqa: E402
+
+sys.path.append(config.internal_plugin_dir)
+import eddn  # noqa: E402
+
+SERIAL_PERIOD = 400  # The previous delay between messages [ms]
+
+
+class Gateway(BaseHTTPRequestHandler):
+    """Accepts uploads, like EDDN's gateway, after a delay."""
+
+    protocol_version = 'HTTP/1.1'  # Keep-alive
+    disable_nagle_algorithm = True  # Else the response body waits for the client to acknowledge the headers
+    latency = 0.0
+    received = 0
+
+    def do_POST(self):  # noqa: N802 # Required name
+        """Accept an upload."""
+        self.rfile.read(int(self.headers['Content-Length']))
+        sleep(self.latency)
+        Gateway.received += 1
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'OK')
+
+    def log_message(self, *args):
+        """Don't log every request."""
+
+
+def messages(count: int) -> List[str]:
+    """Make cached journal messages."""
+    return [
+        edmc_json.dumps(['Bench', {
+            '$schemaRef': 'https://eddn.edcd.io/schemas/journal/1/test',
+            'message': {'timestamp': '2020-08-01T10:00:00Z', 'event': 'FSDJump', 'StarSystem': f'System {i}',
+                        'SystemAddress': i, 'StarPos': [float(i), 0.0, 0.0], 'Population': 0},
+        }])
+        for i in range(count)
+    ]
+
+
+def drain(lines: List[str], concurrency: int, serial: bool) -> float:
+    """
+    Send a backlog through the EDDN plugin.
+
+    :param lines: The cached messages.
+    :param concurrency: How many to send at once.
+    :param serial: Send them the previous way instead.
+    :return: Time taken, in seconds.
+    """
+    with tempfile.TemporaryDirectory(prefix='edmc-bench-') as directory:
+        replaylog = eddn.ReplayLog(join(directory, 'replay'))
+        assert replaylog.open()
+        for line in lines:
+            replaylog.append(line)
+
+        scheduler = headless.Scheduler()
+        frame = headless.HeadlessWidget(scheduler, 'frame')
+        sender = eddn.EDDN(frame)
+        sender.replaylog = replaylog
+        sender.CONCURRENCY = concurrency
+        scheduler.bind_all('<<EDDNReplay>>', sender.replay_status)
+
+        def serial_send() -> None:
+            item = replaylog.take()
+            if item:
+                cmdr, msg = edmc_json.loads(item[1])
+                sender.send(cmdr, msg)
+                replaylog.ack(item[0])
+                scheduler.after(SERIAL_PERIOD, serial_send)
+
+        def check() -> None:
+            if not len(replaylog):
+                scheduler.quit()
+
+            else:
+                scheduler.after(10, check)
+
+        start = perf_counter()
+        scheduler.after(0, serial_send if serial else sender.sendreplay)
+        scheduler.after(10, check)
+        scheduler.mainloop()
+        elapsed = perf_counter() - start
+        if sender._replay_error:
+            sys.exit(f'Failed: {sender._replay_error}')
+
+        replaylog.close()
+        return elapsed
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Time draining the EDDN backlog against a local stand-in gateway.')
+    parser.add_argument('--messages', metavar='N', type=int, default=1000, help='backlog size (default 1000)')
+    parser.add_argument('--latency', metavar='MS', type=float, default=50, help='gateway delay (default 50ms)')
+    parser.add_argument('--concurrency', metavar='N', type=int, action='append',
+                        help=f'messages to send at once - can be repeated (default 1 and {eddn.EDDN.CONCURRENCY})')
+    parser.add_argument('--serial', action='store_true', help='also time sending one message per main loop tick')
+    args = parser.parse_args()
+
+    Gateway.latency = args.latency / 1000
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Gateway)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='Gateway', daemon=True).start()
+    eddn.EDDN.UPLOAD = f'http://127.0.0.1:{server.server_port}/upload/'
+    lines = messages(args.messages)
+    print(f'{args.messages} messages, {args.latency:.0f}ms gateway latency, {edmc_async.backend} HTTP client')
+
+    print(f'{"Sender":<16} {"Seconds":>8} {"Msgs/s":>8}')
+    runs = [(f'concurrency {n}', n, False) for n in args.concurrency or [1, eddn.EDDN.CONCURRENCY]]
+    if args.serial:
+        runs.append(('serial', 1, True))
+
+    for name, concurrency, serial in runs:
+        Gateway.received = 0
+        elapsed = drain(lines, concurrency, serial)
+        assert Gateway.received == args.messages, Gateway.received
+        print(f'{name:<16} {elapsed:>8.2f} {args.messages / elapsed:>8.1f}')
+
+    edmc_async.loop.stop(1)
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
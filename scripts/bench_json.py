@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Compare JSON decode/encode throughput on journal lines.
+
+Usage: python scripts/bench_json.py [<journal file or directory>]
+
+Defaults to the journals in the current journal directory.
+"""
+
+import json
+import sys
+from collections import OrderedDict
+from glob import glob
+from os.path import dirname, isdir, join
+from timeit import repeat
+from typing import Callable, List
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import edmc_json  # noqa: E402
+from config import config  # noqa: E402
+
+REPEAT = 5
+
+
+def journal_lines(path: str) -> List[bytes]:
+    """
+    Read the lines of a journal file, or of all the journal files in a directory.
+
+    :param path: File or directory.
+    :return: The lines.
+    """
+    files = sorted(glob(join(path, 'Journal*.log'))) if isdir(path) else [path]
+    lines = []
+    for filename in files:
+        with open(filename, 'rb') as h:
+            lines.extend(line for line in h if line.strip())
+
+    return lines
+
+
+def throughput(func: Callable, items: list) -> str:
+    """
+    Time a function over every item.
+
+    :param func: Function to time.
+    :param items: Its arguments.
+    :return: Description of the best of REPEAT runs.
+    """
+    best = min(repeat(lambda: [func(x) for x in items], number=1, repeat=REPEAT))
+    return f'{len(items) / best:10,.0f} lines/s  {best / len(items) * 1e6:6.2f} us/line'
+
+
+def main() -> None:
+    """Run the benchmark."""
+    path = sys.argv[1] if len(sys.argv) > 1 else str(config.get('journaldir') or config.default_journal_dir)
+    lines = journal_lines(path)
+    if not lines:
+        sys.exit(f'No journal lines in {path}')
+
+    texts = [line.decode('utf-8') for line in lines]
+    entries = [json.loads(line) for line in lines]
+    print(f'{len(lines)} lines, {sum(map(len, lines)) / len(lines):.0f} bytes average, backend {edmc_json.backend}')
+
+    print('decode')
+    print(f'  json.loads(object_pairs_hook=OrderedDict) {throughput(lambda x: json.loads(x, object_pairs_hook=OrderedDict), texts)}')  # noqa: E501
+    print(f'  json.loads                                {throughput(json.loads, texts)}')
+    print(f'  edmc_json.loads                           {throughput(edmc_json.loads, lines)}')
+
+    print('encode')
+    print(f'  json.dumps                                {throughput(json.dumps, entries)}')
+    print(f'  edmc_json.dumps                           {throughput(edmc_json.dumps, entries)}')
+    print(f'  edmc_json.dumpb                           {throughput(edmc_json.dumpb, entries)}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Time EDLogs.parse_entry per journal event type.
+
+Usage: python scripts/bench_parse.py [--top N] [<journal file or directory>]
+
+Defaults to the journals in the current journal directory.  Every line is parsed in order, with one EDLogs per run as
+the journal worker would, and each call is timed.  Reports the best of REPEAT runs for each event type, both for the
+whole of parse_entry and for the JSON decode alone, so that the difference is the cost of the event's handler.
+"""
+
+import argparse
+import sys
+from collections import defaultdict
+from glob import glob
+from os.path import dirname, isdir, join
+from time import perf_counter_ns
+from typing import Dict, List, Optional, Tuple
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import edmc_json  # noqa: E402
+from config import config  # noqa: E402
+from monitor import EDLogs  # noqa: E402
+
+REPEAT = 5
+
+Timings = Dict[Optional[str], int]  # Total nanoseconds by event type
+
+
+def journal_lines(path: str) -> List[bytes]:
+    """
+    Read the lines of a journal file, or of all the journal files in a directory.
+
+    :param path: File or directory.
+    :return: The lines.
+    """
+    files = sorted(glob(join(path, 'Journal*.log'))) if isdir(path) else [path]
+    lines = []
+    for filename in files:
+        with open(filename, 'rb') as h:
+            lines.extend(line for line in h if line.strip())
+
+    return lines
+
+
+def event_name(line: bytes) -> Optional[str]:
+    """Get the event type of a journal line, or None if it isn't a usable entry."""
+    try:
+        return edmc_json.loads(line).get('event')
+
+    except Exception:
+        return None
+
+
+def time_run(lines: List[bytes], events: List[Optional[str]]) -> Tuple[Timings, Timings]:
+    """
+    Parse every line in order, as the journal worker would, and time decoding each line on its own alongside.
+
+    :param lines: The journal's lines.
+    :param events: The event type of each line.
+    :return: Total nanoseconds spent in parse_entry, and in decoding, for each event type.
+    """
+    parser = EDLogs()
+    parse: Timings = defaultdict(int)
+    decode: Timings = defaultdict(int)
+    for line, event in zip(lines, events):
+        start = perf_counter_ns()
+        edmc_json.loads(line)
+        decoded = perf_counter_ns()
+        parser.parse_entry(line)
+        parse[event] += perf_counter_ns() - decoded
+        decode[event] += decoded - start
+
+    return parse, decode
+
+
+def main() -> None:
+    """Run the benchmark."""
+    parser = argparse.ArgumentParser(description='Time EDLogs.parse_entry per journal event type.')
+    parser.add_argument('--top', metavar='N', type=int, help='only show the N event types with the most time')
+    parser.add_argument('journal', nargs='?', metavar='FILE_OR_DIR', help='journal file or directory')
+    args = parser.parse_args()
+
+    path = args.journal or str(config.get('journaldir') or config.default_journal_dir)
+    lines = journal_lines(path)
+    if not lines:
+        sys.exit(f'No journal lines in {path}')
+
+    events = [event_name(line) for line in lines]
+    counts: Dict[Optional[str], int] = defaultdict(int)
+    for event in events:
+        counts[event] += 1
+
+    runs = [time_run(lines, events) for _ in range(REPEAT)]
+    parse = {event: min(run[0][event] for run in runs) for event in counts}
+    decode = {event: min(run[1][event] for run in runs) for event in counts}
+    print(f'{len(lines)} lines, {len(counts)} event types, backend {edmc_json.backend}')
+    print(f'Total {sum(parse.values()) / 1e6:.1f} ms, of which decode {sum(decode.values()) / 1e6:.1f} ms')
+
+    print(f'{"Event":<32} {"Count":>7} {"us/event":>9} {"decode":>8} {"handler":>8} {"Share":>6}')
+    total = sum(parse.values())
+    ranked = sorted(parse, key=parse.__getitem__, reverse=True)
+    for event in ranked[:args.top] if args.top else ranked:
+        count = counts[event]
+        per_event = parse[event] / count / 1e3
+        per_decode = decode[event] / count / 1e3
+        print(
+            f'{event or "(invalid)":<32} {count:>7} {per_event:>9.2f} {per_decode:>8.2f} '
+            f'{per_event - per_decode:>8.2f} {parse[event] / total:>6.1%}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+Compare plugin dispatch by scanning PLUGINS on every call with dispatch through plug's precomputed hook tables.
+
+Usage: python scripts/bench_plugins.py [<number of plugins>]
+
+Uses synthetic plugins, of which a quarter implement journal_entry - half of those only wanting FSDJump and Docked
+events - and one in eight implement each of dashboard_entry and edsm_notify_system.  Defaults to 32 plugins.
+"""
+
+import sys
+from os.path import dirname
+from timeit import repeat
+from types import ModuleType
+from typing import Callable
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import plug  # noqa: E402
+
+REPEAT = 5
+NUMBER = 10000
+
+
+def make_plugins(count: int) -> None:
+    """
+    Install synthetic plugins in plug.PLUGINS.
+
+    :param count: Number of plugins.
+    """
+    for i in range(count):
+        module = ModuleType(f'plugin_bench{i}')
+        if i % 4 == 0:
+            module.journal_entry = lambda cmdr, is_beta, system, station, entry, state: None  # type: ignore
+            if i % 8 == 4:
+                module.JOURNAL_EVENTS = {'FSDJump', 'Docked'}  # type: ignore
+
+        if i % 8 == 1:
+            module.dashboard_entry = lambda cmdr, is_beta, entry: None  # type: ignore
+
+        if i % 8 == 2:
+            module.edsm_notify_system = lambda reply: None  # type: ignore
+
+        plugin = plug.Plugin(f'bench{i}', None, None)
+        plugin.module = module
+        plugin.journal_events = plugin._get_journal_events()
+        plug.PLUGINS.append(plugin)
+
+    plug.rebuild_hooks()
+
+
+# How plug.py dispatched before it had hook tables
+
+def scan_journal_entry(cmdr, is_beta, system, station, entry, state):
+    """Scan PLUGINS for journal_entry."""
+    for plugin in plug.PLUGINS:
+        journal_entry = plugin._get_func('journal_entry')
+        if journal_entry:
+            journal_entry(cmdr, is_beta, system, station, dict(entry), state)
+
+
+def scan_provides(fn_name):
+    """Scan PLUGINS for a function."""
+    return [p.name for p in plug.PLUGINS if p._get_func(fn_name)]
+
+
+def scan_invoke(plugin_name, fallback, fn_name, *args):
+    """Scan PLUGINS for a named plugin's function."""
+    for plugin in plug.PLUGINS:
+        if plugin.name == plugin_name and plugin._get_func(fn_name):
+            return plugin._get_func(fn_name)(*args)
+
+    for plugin in plug.PLUGINS:
+        if plugin.name == fallback:
+            return plugin._get_func(fn_name)(*args)
+
+
+def timed(func: Callable) -> str:
+    """
+    Time a call.
+
+    :param func: Function to time.
+    :return: Description of the best of REPEAT runs.
+    """
+    best = min(repeat(func, number=NUMBER, repeat=REPEAT))
+    return f'{best / NUMBER * 1e6:7.2f} us/call'
+
+
+def main() -> None:
+    """Run the benchmark."""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 32
+    make_plugins(count)
+    entry = {'timestamp': '2020-08-01T10:00:00Z', 'event': 'Music', 'MusicTrack': 'Exploration'}
+    state: dict = {}
+    last = f'bench{count - 1}'
+    print(f'{count} plugins')
+
+    print('notify_journal_entry(<Music event>)')
+    print(f'  scan   {timed(lambda: scan_journal_entry("Cmdr", False, "Sol", None, entry, state))}')
+    print(f'  table  {timed(lambda: plug.notify_journal_entry("Cmdr", False, "Sol", None, entry, state))}')
+    plug.set_profiling(True, 1000)
+    print(f'  timed  {timed(lambda: plug.notify_journal_entry("Cmdr", False, "Sol", None, entry, state))}')
+    plug.set_profiling(False)
+
+    print('provides("edsm_notify_system")')
+    print(f'  scan   {timed(lambda: scan_provides("edsm_notify_system"))}')
+    print(f'  table  {timed(lambda: plug.provides("edsm_notify_system"))}')
+
+    print('invoke(<last plugin>, <first plugin>, "journal_entry")')
+    print(f'  scan   {timed(lambda: scan_invoke(last, "bench0", "journal_entry", "Cmdr", False, "Sol", None, entry, state))}')  # noqa: E501
+    print(f'  table  {timed(lambda: plug.invoke(last, "bench0", "journal_entry", "Cmdr", False, "Sol", None, entry, state))}')  # noqa: E501
+
+
+if __name__ == '__main__':
+    main()
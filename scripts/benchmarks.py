@@ -0,0 +1,472 @@
+#!/usr/bin/env python3
+"""
+Time EDMC's hot paths, and keep a history of the results so that regressions show up.
+
+Usage: python scripts/benchmarks.py [--journal FILE_OR_DIR] [--only NAME] [--save] [--history FILE]
+
+Uses synthetic fixture data, made the same way every run, unless --journal is given.  Each benchmark reports the best of
+REPEAT runs, per item, and the change since the last saved run on the same machine and Python version.  --save adds this
+run to the history file, scripts/benchmarks.jsonl by default, with the git revision, Python version and platform.
+"""
+
+import argparse
+import csv
+import logging
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from glob import glob
+from os.path import dirname, isdir, join
+from timeit import repeat
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import l10n  # noqa: E402
+l10n.Translations.install_dummy()
+
+import commodity  # noqa: E402
+import companion  # noqa: E402
+import edmc_json  # noqa: E402
+import EDMCLogging  # noqa: E402
+import outfitting  # noqa: E402
+import td  # noqa: E402
+from config import config  # noqa: E402
+from monitor import EDLogs  # noqa: E402
+
+sys.path.append(config.internal_plugin_dir)
+import eddn  # noqa: E402
+
+REPEAT = 5
+HISTORY = join(dirname(__file__), 'benchmarks.jsonl')
+REGRESSION = 1.1  # Flag benchmarks that are this much slower than last time
+
+BENCHMARKS: Dict[str, Callable[['Fixtures'], Tuple[Callable[[], Any], int]]] = {}
+
+
+def benchmark(name: str) -> Callable:
+    """
+    Register a benchmark.
+
+    The decorated function is given the fixtures and returns a function to time, and how many items that function
+    handles per call.
+
+    :param name: The benchmark's name in the report and the history.
+    """
+    def register(func: Callable[['Fixtures'], Tuple[Callable[[], Any], int]]) -> Callable:
+        BENCHMARKS[name] = func
+        return func
+
+    return register
+
+
+@contextmanager
+def settings(**values: Any) -> Iterator[None]:
+    """
+    Override some settings for the duration.
+
+    The overrides are only held in memory, by shadowing `config.get()` and `config.getint()`, so that the user's own
+    settings are never written to, even if the benchmark is interrupted.
+    """
+    get, getint = config.get, config.getint
+    config.get = lambda key: values[key] if key in values else get(key)  # type: ignore
+    config.getint = lambda key: values[key] if key in values else getint(key)  # type: ignore
+    try:
+        yield
+
+    finally:
+        # Back to the methods, or to whatever an enclosing settings() had put in their place
+        for name, func in (('get', get), ('getint', getint)):
+            if getattr(func, '__self__', None) is config:
+                delattr(config, name)
+
+            else:
+                setattr(config, name, func)
+
+
+# Fixture data
+
+def localised(symbol: str) -> Dict[str, str]:
+    """A journal name with its localised version, as the game writes them."""
+    return {'Name': f'${symbol}_name;', 'Name_Localised': symbol.replace('_', ' ').title()}
+
+
+def synthetic_journal(count: int) -> List[bytes]:
+    """
+    Make a journal of a Cmdr exploring and trading, with lots of the nested and localised properties that cost time.
+
+    :param count: Number of entries after the startup entries.
+    :return: The journal's lines.
+    """
+    rng = random.Random(0)
+    when = datetime(2020, 8, 1, 10, tzinfo=timezone.utc)
+    factions = [
+        {'Name': f'Faction {i}', 'FactionState': 'Boom', 'Government': 'Democracy', 'Influence': 0.2,
+         'Allegiance': 'Federation', 'Happiness': '$Faction_HappinessBand2;', 'Happiness_Localised': 'Happy',
+         'MyReputation': 10.0, 'ActiveStates': [{'State': 'Boom'}]}
+        for i in range(5)
+    ]
+    entries: List[Dict[str, Any]] = [
+        {'event': 'Fileheader', 'part': 1, 'language': 'English/UK', 'gameversion': '3.7.0.500', 'build': 'r1'},
+        {'event': 'Commander', 'FID': 'F123', 'Name': 'Bench'},
+        {'event': 'LoadGame', 'FID': 'F123', 'Commander': 'Bench', 'Horizons': True, 'Ship': 'Python',
+         'Ship_Localised': 'Python', 'ShipID': 1, 'ShipName': 'x', 'ShipIdent': 'Y', 'FuelLevel': 32,
+         'FuelCapacity': 32, 'GameMode': 'Solo', 'Credits': 1000, 'Loan': 0},
+        {'event': 'Location', 'Docked': False, 'StarSystem': 'Sol', 'SystemAddress': 10477373803,
+         'StarPos': [0.0, 0.0, 0.0], 'Population': 0, 'Factions': factions},
+    ]
+    for i in range(count):
+        kind = i % 8
+        system = f'System {i // 8}'
+        address = 1000 + i // 8
+        if kind == 0:
+            entry = {'event': 'FSDJump', 'StarSystem': system, 'SystemAddress': address,
+                     'StarPos': [rng.uniform(-1000, 1000) for _ in range(3)], 'JumpDist': 20.0, 'FuelUsed': 2.0,
+                     'FuelLevel': 30.0, 'SystemEconomy': '$economy_Industrial;',
+                     'SystemEconomy_Localised': 'Industrial', 'Population': 1000, 'Factions': factions}
+
+        elif kind in (1, 2):
+            entry = {'event': 'Scan', 'ScanType': 'Detailed', 'BodyName': f'{system} {i % 8}', 'BodyID': i % 8,
+                     'StarSystem': system, 'SystemAddress': address, 'DistanceFromArrivalLS': 100.0,
+                     'PlanetClass': 'High metal content body', 'Atmosphere': '', 'Volcanism': '',
+                     'Materials': [{'Name': m, 'Name_Localised': m.title(), 'Percent': 10.0}
+                                   for m in ('iron', 'nickel', 'sulphur', 'carbon', 'chromium')],
+                     'Composition': {'Ice': 0.0, 'Rock': 0.7, 'Metal': 0.3}, 'WasDiscovered': True}
+
+        elif kind == 3:
+            entry = {'event': 'Docked', 'StationName': f'Port {i}', 'StationType': 'Coriolis',
+                     'StarSystem': system, 'SystemAddress': address, 'MarketID': 3000000 + i,
+                     'StationEconomies': [dict(localised('economy_Industrial'), Proportion=1.0)],
+                     'StationServices': ['dock', 'autodock', 'commodities', 'contacts', 'outfitting', 'shipyard'],
+                     'StationFaction': {'Name': 'Faction 0', 'FactionState': 'Boom'}, 'DistFromStarLS': 100.0}
+
+        elif kind == 4:
+            entry = dict(localised('Gold'), event='MarketBuy', MarketID=3000000 + i, Type='gold', Count=4,
+                         BuyPrice=9000, TotalCost=36000)
+
+        elif kind == 5:
+            entry = dict(localised('Iron'), event='MaterialCollected', Category='Raw', Count=3)
+
+        elif kind == 6:
+            entry = {'event': 'ReceiveText', 'From': '', 'Message': '$COMMS_entered:#name=Sol;',
+                     'Message_Localised': f'Entered Channel: {system}', 'Channel': 'npc'}
+
+        else:
+            entry = {'event': 'Music', 'MusicTrack': 'Exploration'}
+
+        entries.append(entry)
+
+    lines = []
+    for entry in entries:
+        when += timedelta(seconds=1)
+        lines.append(edmc_json.dumpb(dict(timestamp=when.strftime('%Y-%m-%dT%H:%M:%SZ'), **entry)) + b'\n')
+
+    return lines
+
+
+def journal_lines(path: str) -> List[bytes]:
+    """
+    Read the lines of a journal file, or of all the journal files in a directory.
+
+    :param path: File or directory.
+    :return: The lines.
+    """
+    files = sorted(glob(join(path, 'Journal*.log'))) if isdir(path) else [path]
+    lines = []
+    for filename in files:
+        with open(filename, 'rb') as h:
+            lines.extend(line for line in h if line.strip())
+
+    return lines
+
+
+def synthetic_market() -> Dict[str, Any]:
+    """Make a cAPI market with every known commodity, and a few that fixup() should leave out."""
+    rng = random.Random(0)
+    commodities = []
+    for filename in ('commodity.csv', 'rare_commodity.csv'):
+        with open(join(config.respath, filename), 'r') as h:
+            for row in csv.DictReader(h):
+                stock = rng.randrange(4)
+                commodities.append({
+                    'id': int(row['id']), 'name': row['symbol'], 'categoryname': row['category'],
+                    'buyPrice': rng.randrange(100, 10000), 'sellPrice': rng.randrange(100, 10000),
+                    'meanPrice': rng.randrange(100, 10000), 'demand': rng.randrange(10000), 'demandBracket': 3 - stock,
+                    'stock': rng.randrange(10000), 'stockBracket': stock, 'statusFlags': [],
+                })
+
+    commodities.append(dict(commodities[0], name='Drones', categoryname='NonMarketable'))  # Limpets
+    commodities.append(dict(commodities[0], name='Broken', demandBracket=''))  # Phantom commodity
+
+    return {
+        'timestamp': '2020-08-01T10:00:00Z',
+        'commander': {'name': 'Bench', 'docked': True},
+        'lastSystem': {'name': 'Sol'},
+        'lastStarport': {'name': 'Abraham Lincoln', 'id': 128016640, 'commodities': commodities},
+    }
+
+
+class Fixtures(NamedTuple):
+    """Data for the benchmarks."""
+
+    lines: List[bytes]  # A long journal
+    entries: List[Tuple[Optional[str], Optional[str], Dict[str, Any], Any]]  # (system, station, entry, state)
+    market: Dict[str, Any]  # A large cAPI market
+    outdir: str  # Somewhere to export to
+
+
+def make_fixtures(journal: Optional[str], outdir: str) -> Fixtures:
+    """
+    Make the benchmarks' data.
+
+    :param journal: Journal file or directory to use, else make a synthetic journal.
+    :param outdir: A scratch directory.
+    """
+    lines = journal_lines(journal) if journal else synthetic_journal(20000)
+    parser = EDLogs()
+    entries = []
+    for line in lines:
+        entry = parser.parse_entry(line)
+        if entry['event']:
+            entries.append((parser.system, parser.station, entry, parser._snapshot()['state']))
+
+    return Fixtures(lines, entries, synthetic_market(), outdir)
+
+
+# Benchmarks
+
+@benchmark('EDLogs.parse_entry')
+def bench_parse_entry(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Parse every line of the journal."""
+    def run():
+        parser = EDLogs()
+        for line in fixtures.lines:
+            parser.parse_entry(line)
+
+    return run, len(fixtures.lines)
+
+
+class _EDDNSink:
+    """Stands in for the EDDN sender, so that nothing is queued or sent."""
+
+    def export_journal_entry(self, cmdr: str, is_beta: bool, entry: Any) -> None:
+        pass
+
+
+@benchmark('eddn.journal_entry')
+def bench_eddn_journal_entry(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Pass every journal entry to the EDDN plugin, which filters and strips the ones it sends."""
+    eddn.this.eddn = _EDDNSink()
+
+    def run():
+        with settings(output=config.OUT_SYS_EDDN):
+            for system, station, entry, state in fixtures.entries:
+                eddn.journal_entry('Bench', False, system, station, dict(entry), state)
+
+    return run, len(fixtures.entries)
+
+
+@benchmark('outfitting.lookup')
+def bench_outfitting_lookup(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Look up every module symbol that outfitting knows about."""
+    outfitting.lookup({'id': 1, 'name': 'Int_Engine_Size2_Class1'}, companion.ship_map)  # Load moduledata
+    modules = []
+    for i, symbol in enumerate(sorted(outfitting.moduledata)):
+        module = {'id': i, 'name': symbol}
+        try:
+            outfitting.lookup(module, companion.ship_map, True)
+            modules.append(module)
+
+        except Exception:
+            pass  # Not all of them are modules that can be looked up, e.g. ship hulls
+
+    def run():
+        for module in modules:
+            outfitting.lookup(module, companion.ship_map, True)
+
+    return run, len(modules)
+
+
+@benchmark('companion.fixup')
+def bench_fixup(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Clean up a large market."""
+    companion.fixup(fixtures.market)  # Load commodity_map
+    return lambda: companion.fixup(fixtures.market), len(fixtures.market['lastStarport']['commodities'])
+
+
+@benchmark('commodity.export')
+def bench_commodity_export(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Export a large market as CSV."""
+    data = companion.fixup(fixtures.market)
+    filename = join(fixtures.outdir, 'market.csv')
+    return (
+        lambda: commodity.export(data, commodity.COMMODITY_DEFAULT, filename),
+        len(data['lastStarport']['commodities'])
+    )
+
+
+@benchmark('td.export')
+def bench_td_export(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Export a large market for Trade Dangerous."""
+    data = companion.fixup(fixtures.market)
+
+    def run():
+        with settings(outdir=fixtures.outdir):
+            td.export(data)
+
+    return run, len(data['lastStarport']['commodities'])
+
+
+class _LoggingCaller:
+    """Logs from a method, like most of EDMC, so that EDMCContextFilter has a class to find."""
+
+    def __init__(self):
+        self.logger = logging.getLogger('edmc-benchmark')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.logger.addHandler(logging.NullHandler())
+        self.logger.addFilter(EDMCLogging.EDMCContextFilter())
+
+    def log(self) -> None:
+        self.logger.debug('Benchmark')
+
+
+@benchmark('EDMCContextFilter.filter')
+def bench_logging_filter(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Log 1000 messages through the context filter."""
+    caller = _LoggingCaller()
+
+    def run():
+        for _ in range(1000):
+            caller.log()
+
+    return run, 1000
+
+
+@benchmark('config.get')
+def bench_config_get(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Read 1000 string settings, some of them missing."""
+    keys = ['outdir', 'journaldir', 'system_provider', 'no_such_setting'] * 250
+
+    def run():
+        for key in keys:
+            config.get(key)
+
+    return run, len(keys)
+
+
+@benchmark('config.getint')
+def bench_config_getint(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Read 1000 integer settings, some of them missing."""
+    keys = ['output', 'hotkey_code', 'journal_index', 'no_such_setting'] * 250
+
+    def run():
+        for key in keys:
+            config.getint(key)
+
+    return run, len(keys)
+
+
+@benchmark('l10n.Translations.translate')
+def bench_translate(fixtures: Fixtures) -> Tuple[Callable[[], Any], int]:
+    """Translate every string that has a German translation."""
+    translations = type(l10n.Translations)()  # A separate instance, leaving the installed translations alone
+    translations.translations = {None: translations.contents('de')}
+    strings = list(translations.translations[None])
+
+    def run():
+        for string in strings:
+            translations.translate(string)
+
+    return run, len(strings)
+
+
+# Results
+
+def revision() -> Optional[str]:
+    """Get the git revision being benchmarked, if it can be found."""
+    try:
+        return subprocess.run(
+            ['git', 'describe', '--always', '--dirty'], cwd=dirname(__file__), capture_output=True, check=True,
+            text=True
+        ).stdout.strip()
+
+    except Exception:
+        return None
+
+
+def environment() -> Dict[str, str]:
+    """Describe what the benchmarks ran on, so that only like results are compared."""
+    return {
+        'python':   platform.python_version(),
+        'platform': platform.platform(terse=True),
+        'machine':  platform.machine(),
+        'json':     edmc_json.backend,
+    }
+
+
+def load_history(filename: str) -> List[Dict[str, Any]]:
+    """
+    Read the saved runs.
+
+    :param filename: The history file.
+    :return: The runs, oldest first.
+    """
+    try:
+        with open(filename, 'rb') as h:
+            return [edmc_json.loads(line) for line in h if line.strip()]
+
+    except FileNotFoundError:
+        return []
+
+
+def main() -> None:
+    """Run the benchmarks."""
+    parser = argparse.ArgumentParser(description='Time EDMC\'s hot paths and compare with earlier runs.')
+    parser.add_argument('--journal', metavar='FILE_OR_DIR', help='use this journal instead of a synthetic one')
+    parser.add_argument('--only', metavar='NAME', action='append', choices=sorted(BENCHMARKS),
+                        help='only run this benchmark - can be repeated')
+    parser.add_argument('--save', action='store_true', help='add the results to the history')
+    parser.add_argument('--history', metavar='FILE', default=HISTORY, help=f'history file (default {HISTORY})')
+    args = parser.parse_args()
+
+    env = environment()
+    history = load_history(args.history)
+    previous = next((run for run in reversed(history) if run['environment'] == env), None)
+
+    results: Dict[str, float] = {}
+    with tempfile.TemporaryDirectory(prefix='edmc-bench-') as outdir:
+        fixtures = make_fixtures(args.journal, outdir)
+        print(f'{len(fixtures.lines)} journal lines, {len(fixtures.market["lastStarport"]["commodities"])} commodities')
+        if previous:
+            print(f'Compared with {previous["revision"]} at {previous["when"]}')
+
+        print(f'{"Benchmark":<30} {"Items":>6} {"us/item":>9} {"Change":>8}')
+        for name in args.only or BENCHMARKS:
+            func, items = BENCHMARKS[name](fixtures)
+            results[name] = min(repeat(func, number=1, repeat=REPEAT)) / items * 1e6
+            change = ''
+            if previous and name in previous['results']:
+                ratio = results[name] / previous['results'][name]
+                change = f'{ratio - 1:+7.1%}' + (' SLOWER' if ratio > REGRESSION else '')
+
+            print(f'{name:<30} {items:>6} {results[name]:>9.3f} {change:>8}')
+
+    if args.save:
+        with open(args.history, 'ab') as h:
+            h.write(edmc_json.dumpb({
+                'when':        datetime.now(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ'),
+                'revision':    revision(),
+                'environment': env,
+                'results':     {name: round(result, 4) for name, result in results.items()},
+            }) + b'\n')
+
+        print(f'Saved to {args.history}')
+
+
+if __name__ == '__main__':
+    main()
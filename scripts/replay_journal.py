@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Replay a recorded journal directory into a scratch journal directory, keeping the gaps between entries, and measure how
+long each entry takes to get from the file to the plugins.
+
+Usage: python scripts/replay_journal.py RECORDING [--speed N | --max-speed] [--max-gap SECONDS] [--dir DIR]
+                                        [--plugins | --write-only]
+
+RECORDING holds Journal.*.log files and any of the game's other files, such as Status.json and Market.json.  A file
+called e.g. Status.jsonl holds a series of Status.json contents, one per line, to be written in turn.  Everything is
+written in timestamp order, at real-time, N times real-time or as fast as possible.
+
+Unless --write-only is given, the scratch directory is monitored in this process, as by `EDMC.py serve`, and a probe
+plugin notes when each entry reaches it.  With --plugins the installed plugins are loaded too, and the probe comes
+after them.  Entries that the monitors or headless app don't pass on, e.g. the entries before LoadGame, aren't counted.
+"""
+
+import argparse
+import glob
+import shutil
+import sys
+import tempfile
+import threading
+from calendar import timegm
+from collections import defaultdict, deque
+from os import listdir, makedirs
+from os.path import dirname, join, splitext
+from statistics import median
+from time import perf_counter, sleep, strptime
+from types import ModuleType
+from typing import Deque, Dict, List, NamedTuple, Optional, Tuple
+
+sys.path.insert(0, dirname(dirname(__file__)))
+
+import edmc_json  # noqa: E402
+import headless  # noqa: E402
+import plug  # noqa: E402
+from monitor import EDLogs  # noqa: E402
+
+SETTLE = 3  # Seconds to wait after the last write for the last entries to arrive. Status.json is polled every second.
+
+
+class Write(NamedTuple):
+    """One line or file to write to the scratch directory."""
+
+    at: float  # Seconds since the first timestamp in the recording
+    side: bool  # Whether this is a whole side file, e.g. Status.json, rather than a journal line
+    seq: int  # Order in the recording, to keep writes with the same timestamp in order
+    filename: str
+    data: bytes
+    key: Optional[Tuple[str, str, str]]  # (file, timestamp, event) to match up with what the plugins get
+
+
+def timestamp(entry: dict) -> float:
+    """
+    Get the time of a journal entry or side file.
+
+    :param entry: The parsed JSON.
+    :return: Seconds since the epoch.
+    """
+    return timegm(strptime(entry['timestamp'], '%Y-%m-%dT%H:%M:%SZ'))
+
+
+def load(recording: str, max_gap: Optional[float]) -> List[Write]:
+    """
+    Read a recorded journal directory.
+
+    :param recording: The directory.
+    :param max_gap: Maximum gap between writes, in seconds, so that e.g. the time between sessions isn't replayed.
+    :return: What to write, in order.
+    """
+    items: List[Tuple[float, bool, int, str, bytes, dict]] = []
+    for path in sorted(listdir(recording)):
+        name, ext = splitext(path)
+        if EDLogs._RE_LOGFILE.search(path):
+            filename, side = path, False
+
+        elif ext == '.jsonl':
+            filename, side = f'{name}.json', True
+
+        elif ext == '.json':
+            filename, side = path, True
+
+        else:
+            continue
+
+        with open(join(recording, path), 'rb') as h:
+            lines = h.read().splitlines(keepends=True) if ext != '.json' else [h.read()]
+
+        for line in lines:
+            try:
+                entry = edmc_json.loads(line)
+                items.append((timestamp(entry), side, len(items), filename, line, entry))
+
+            except Exception:
+                print(f'Skipping unreadable line in {path}: {line[:80]!r}', file=sys.stderr)
+
+    # Side files are written before the journal entries that announce them
+    items.sort(key=lambda x: (x[0], not x[1], x[2]))
+    writes = []
+    at = 0.0
+    for i, (when, side, seq, filename, data, entry) in enumerate(items):
+        if i:
+            gap = when - items[i - 1][0]
+            at += min(gap, max_gap) if max_gap is not None else gap
+
+        if not side:
+            key: Optional[Tuple[str, str, str]] = ('Journal', entry['timestamp'], entry['event'])
+
+        elif filename == 'Status.json':
+            key = ('Status.json', entry['timestamp'], entry.get('event', ''))
+
+        else:
+            key = None  # Plugins read e.g. Market.json when they get the journal entry, so it isn't timed separately
+
+        writes.append(Write(at, side, seq, filename, data, key))
+
+    return writes
+
+
+class Probe:
+    """A plugin that notes when each journal entry and status reaches it."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.written: Dict[Tuple[str, str, str], Deque[float]] = defaultdict(deque)  # key -> perf_counter() of writes
+        self.latency: Dict[str, List[float]] = defaultdict(list)  # event -> latencies in seconds
+
+    def wrote(self, key: Tuple[str, str, str]) -> None:
+        """Note that an entry has been written."""
+        with self.lock:
+            self.written[key].append(perf_counter())
+
+    def arrived(self, key: Tuple[str, str, str], event: str) -> None:
+        """Note that an entry has reached the plugins."""
+        now = perf_counter()
+        with self.lock:
+            pending = self.written.get(key)
+            if pending:
+                self.latency[event].append(now - pending.popleft())
+
+    def journal_entry(self, cmdr, is_beta, system, station, entry, state):
+        """Plugin hook."""
+        self.arrived(('Journal', entry['timestamp'], entry['event']), entry['event'])
+
+    def dashboard_entry(self, cmdr, is_beta, entry):
+        """Plugin hook."""
+        self.arrived(('Status.json', entry['timestamp'], entry.get('event', '')), 'Status')
+
+    def install(self) -> None:
+        """Add this to the end of plug.PLUGINS."""
+        module = ModuleType('plugin_replay_probe')
+        module.journal_entry = self.journal_entry  # type: ignore
+        module.dashboard_entry = self.dashboard_entry  # type: ignore
+        plugin = plug.Plugin('replay_probe', None, None)
+        plugin.module = module
+        plug.PLUGINS.append(plugin)
+        plug.rebuild_hooks()
+
+
+def replay(writes: List[Write], scratch: str, speed: float, probe: Optional[Probe]) -> float:
+    """
+    Write to the scratch directory in time.
+
+    :param writes: What to write.
+    :param scratch: The scratch journal directory.
+    :param speed: Multiple of real-time, or 0 for as fast as possible.
+    :param probe: Told about each write, just before it is made.
+    :return: Time taken, in seconds.
+    """
+    journals: Dict[str, object] = {}
+    start = perf_counter()
+    try:
+        for write in writes:
+            if speed:
+                delay = start + write.at / speed - perf_counter()
+                if delay > 0:
+                    sleep(delay)
+
+            if not write.side and write.filename not in journals:
+                journals[write.filename] = open(join(scratch, write.filename), 'ab', 0)  # unbuffered
+
+            # Noted before writing, since the monitor may see the write before this thread runs again
+            if probe and write.key:
+                probe.wrote(write.key)
+
+            if write.side:
+                # Like the game, rewrite the whole file in place
+                with open(join(scratch, write.filename), 'wb') as h:
+                    h.write(write.data)
+
+            else:
+                h = journals[write.filename]
+                h.write(write.data if write.data.endswith(b'\n') else write.data + b'\n')  # type: ignore
+
+    finally:
+        for h in journals.values():
+            h.close()  # type: ignore
+
+    return perf_counter() - start
+
+
+def report(probe: Probe, writes: List[Write], elapsed: float) -> None:
+    """Print the latencies."""
+    def row(name: str, latencies: List[float]) -> str:
+        latencies = sorted(latencies)
+        return (f'{name:<24} {len(latencies):>7} {median(latencies) * 1000:>9.2f} '
+                f'{latencies[int(len(latencies) * 0.99)] * 1000:>9.2f} {latencies[-1] * 1000:>9.2f}')
+
+    everything = [x for latencies in probe.latency.values() for x in latencies]
+    print(f'Wrote {len(writes)} lines and files in {elapsed:.2f}s, {len(everything)} reached the plugins')
+    if not everything:
+        return
+
+    print(f'{"Event":<24} {"Count":>7} {"p50 ms":>9} {"p99 ms":>9} {"Max ms":>9}')
+    for event, latencies in sorted(probe.latency.items(), key=lambda x: -len(x[1])):
+        print(row(event, latencies))
+
+    print(row('All', everything))
+
+
+def main() -> None:
+    """Run the replay."""
+    parser = argparse.ArgumentParser(
+        description='Replay a recorded journal directory and report how long entries take to reach the plugins.'
+    )
+    parser.add_argument('recording', metavar='RECORDING', help='directory holding the recorded files')
+    parser.add_argument('--speed', metavar='N', type=float, default=1, help='replay at N times real-time')
+    parser.add_argument('--max-speed', action='store_true', help='replay as fast as possible')
+    parser.add_argument('--max-gap', metavar='SECONDS', type=float, default=10,
+                        help='shorten longer gaps between entries to this (default 10)')
+    parser.add_argument('--dir', metavar='DIR', help='scratch journal directory (default a new temporary directory)')
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--plugins', action='store_true', help='run the installed plugins too')
+    group.add_argument('--write-only', action='store_true',
+                       help='just write the files, e.g. for EDMC.py serve --journal-dir replay=DIR')
+    args = parser.parse_args()
+
+    writes = load(args.recording, args.max_gap)
+    scratch = args.dir or tempfile.mkdtemp(prefix='edmc-replay-')
+    makedirs(scratch, exist_ok=True)
+    if glob.glob(join(scratch, 'Journal*.log')):
+        sys.exit(f'{scratch} already has Journal files in it')
+
+    speed = 0 if args.max_speed else args.speed
+    duration = writes[-1].at if writes else 0
+    print(f'Replaying {len(writes)} lines and files, {duration:.0f}s of game time, into {scratch}')
+    try:
+        if args.write_only:
+            print(f'Wrote {len(writes)} lines and files in {replay(writes, scratch, speed, None):.2f}s')
+            return
+
+        probe = Probe()
+        app = headless.HeadlessApp({'replay': scratch}, load_plugins=args.plugins)
+        probe.install()
+        elapsed = 0.0
+
+        def writer() -> None:
+            nonlocal elapsed
+            elapsed = replay(writes, scratch, speed, probe)
+            sleep(SETTLE)
+            app.w.quit()
+
+        app.w.after(0, threading.Thread(target=writer, name='Replay writer', daemon=True).start)
+        app.run()
+        report(probe, writes, elapsed)
+
+    finally:
+        if not args.dir:
+            shutil.rmtree(scratch, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()